@@ -0,0 +1,183 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, validator
+
+from app.database import get_db
+from app.models.dividend import DividendDistribution
+from app.models.property import Property
+from app.models.user import User
+from app.services.dividends import claim_dividends, distribute_dividends, get_user_dividends, serialize_distribution
+from app.services.idempotency import idempotency_store
+from app.services.transaction_builder import transaction_builder
+
+router = APIRouter()
+
+# Pydantic models
+class DistributionRequest(BaseModel):
+    property_id: int
+    amount: int  # Wei, as sent to PropertyToken.distributeDividends
+    transaction_hash: Optional[str] = None
+
+    @validator('amount')
+    def validate_amount(cls, v):
+        if v <= 0:
+            raise ValueError('Amount must be positive')
+        return v
+
+class ClaimRequest(BaseModel):
+    transaction_hash: Optional[str] = None
+
+# API endpoints
+@router.post("/distributions")
+async def create_distribution(
+    distribution_request: DistributionRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Record a dividend distribution and every holder's share of it (admin only)"""
+    async def handler():
+        try:
+            distribution = distribute_dividends(
+                db,
+                distribution_request.property_id,
+                distribution_request.amount,
+                distribution_request.transaction_hash
+            )
+            db.commit()
+            db.refresh(distribution)
+
+            return serialize_distribution(distribution)
+
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Distribution failed: {str(e)}")
+
+    return await idempotency_store.run(
+        "dividend-distribution",
+        current_user.id,
+        idempotency_key,
+        distribution_request.dict(),
+        handler
+    )
+
+@router.get("/distributions/{property_id}")
+async def get_distributions(
+    property_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """A property's dividend distributions, newest first"""
+    distributions = db.query(DividendDistribution).filter(
+        DividendDistribution.property_id == property_id
+    ).order_by(DividendDistribution.id.desc()).limit(limit).all()
+
+    return {
+        "property_id": property_id,
+        "distributions": [serialize_distribution(distribution) for distribution in distributions]
+    }
+
+@router.get("/user")
+async def get_user_claimable(
+    property_id: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Earned, claimed and claimable dividends per property, in wei, without a blockchain call"""
+    try:
+        accounts = get_user_dividends(db, current_user.id, property_id)
+        return {
+            "user_id": current_user.id,
+            "claimable": str(sum(int(account["claimable"]) for account in accounts)),
+            "properties": accounts
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get dividends: {str(e)}")
+
+@router.get("/{property_id}/claim/prepare")
+async def prepare_claim_transaction(
+    property_id: int,
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Unsigned claimDividends transaction with gas and EIP-1559 fees filled in, for the wallet to sign"""
+    try:
+        property = db.query(Property).filter(Property.id == property_id).first()
+        if not property:
+            raise HTTPException(status_code=404, detail="Property not found")
+
+        return await transaction_builder.prepare_dividend_claim(db, current_user, property)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to prepare claim: {str(e)}")
+
+@router.post("/{property_id}/claim")
+async def claim_property_dividends(
+    property_id: int,
+    claim_request: ClaimRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Record a claimDividends transaction, marking the claimable amount as claimed"""
+    async def handler():
+        try:
+            amount = claim_dividends(db, current_user.id, property_id)
+            db.commit()
+
+            return {
+                "success": True,
+                "property_id": property_id,
+                "amount": str(amount),
+                "transaction_hash": claim_request.transaction_hash
+            }
+
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Claim failed: {str(e)}")
+
+    return await idempotency_store.run(
+        "dividend-claim",
+        current_user.id,
+        idempotency_key,
+        {"property_id": property_id, **claim_request.dict()},
+        handler
+    )
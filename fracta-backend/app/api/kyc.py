@@ -1,5 +1,6 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, validator
 from datetime import datetime, timedelta
@@ -8,6 +9,7 @@ from app.database import get_db
 from app.models.user import User
 from app.models.kyc import KYCRecord
 from app.api.auth import get_current_user
+from app.services.etag import etag_headers, etag_matches, make_etag, not_modified
 
 router = APIRouter()
 
@@ -94,11 +96,36 @@ async def test_kyc_endpoint():
 
 @router.get("/status", response_model=KYCStatusResponse)
 async def get_kyc_status(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's KYC status"""
     
+    # Version of the latest KYC record, checked before building the response
+    latest_version = db.query(
+        KYCRecord.id,
+        KYCRecord.status,
+        KYCRecord.updated_at,
+        KYCRecord.annual_review_due
+    ).filter(
+        KYCRecord.user_id == current_user.id
+    ).order_by(KYCRecord.created_at.desc()).first()
+    
+    # Renewal is date dependent, so the tag also rolls over daily
+    etag = make_etag(
+        "kyc:status",
+        datetime.utcnow().date(),
+        current_user.id,
+        current_user.kyc_status,
+        current_user.kyc_jurisdiction,
+        tuple(latest_version) if latest_version else None
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag, private=True)
+    response.headers.update(etag_headers(etag, private=True))
+    
     # Get latest KYC record
     latest_kyc = db.query(KYCRecord).filter(
         KYCRecord.user_id == current_user.id
@@ -345,11 +372,26 @@ async def submit_international_verification(
 
 @router.get("/records", response_model=List[KYCResponse])
 async def get_kyc_records(
+    request: Request,
+    response: Response,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get user's KYC records"""
     
+    version = db.query(
+        func.count(KYCRecord.id),
+        func.max(KYCRecord.id),
+        func.max(func.coalesce(KYCRecord.updated_at, KYCRecord.created_at))
+    ).filter(
+        KYCRecord.user_id == current_user.id
+    ).one()
+    
+    etag = make_etag("kyc:records", current_user.id, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag, private=True)
+    response.headers.update(etag_headers(etag, private=True))
+    
     records = db.query(KYCRecord).filter(
         KYCRecord.user_id == current_user.id
     ).order_by(KYCRecord.created_at.desc()).all()
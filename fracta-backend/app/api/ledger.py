@@ -0,0 +1,277 @@
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, validator
+
+from app.database import get_db
+from app.models.user import User
+from app.services.idempotency import idempotency_store
+from app.services.ledger import (
+    current_period,
+    distribute_income,
+    get_account_entries,
+    get_property_balances,
+    get_property_statement,
+    get_user_ledger,
+    pay_out_holders,
+    record_expense,
+    record_rent,
+    run_monthly,
+)
+
+router = APIRouter()
+
+MAX_RUN_ITEMS = 5000
+
+# Pydantic models
+class LedgerPostingRequest(BaseModel):
+    property_id: int
+    amount_cents: int
+    description: Optional[str] = None
+    reference: Optional[str] = None
+
+    @validator('amount_cents')
+    def validate_amount(cls, v):
+        if v <= 0:
+            raise ValueError('Amount must be positive')
+        return v
+
+class DistributionRequest(BaseModel):
+    property_id: int
+    amount_cents: Optional[int] = None  # Defaults to all available cash
+    description: Optional[str] = None
+
+    @validator('amount_cents')
+    def validate_amount(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError('Amount must be positive')
+        return v
+
+class PayoutRequest(BaseModel):
+    property_id: int
+    reference: Optional[str] = None
+
+class MonthlyRunItem(BaseModel):
+    property_id: int
+    rent_cents: int = 0
+    expense_cents: int = 0
+    distribute: bool = True
+
+    @validator('rent_cents', 'expense_cents')
+    def validate_amount(cls, v):
+        if v < 0:
+            raise ValueError('Amounts cannot be negative')
+        return v
+
+class MonthlyRunRequest(BaseModel):
+    items: List[MonthlyRunItem]
+    description: Optional[str] = None
+
+    @validator('items')
+    def validate_items(cls, v):
+        if not v:
+            raise ValueError('At least one item is required')
+        if len(v) > MAX_RUN_ITEMS:
+            raise ValueError(f'At most {MAX_RUN_ITEMS} items per run')
+        return v
+
+
+def parse_period(month: Optional[str]) -> date:
+    """YYYY-MM to the first day of that month; the current month by default"""
+    if month is None:
+        return current_period()
+    try:
+        return datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc).date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Month must be YYYY-MM")
+
+
+async def run_posting(scope: str, user_id: int, idempotency_key: Optional[str], payload: dict, db: Session, post, failure: str):
+    """Run a ledger write once per idempotency key, committing on success"""
+    async def handler():
+        try:
+            result = post()
+            db.commit()
+            return result
+
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"{failure}: {str(e)}")
+
+    return await idempotency_store.run(scope, user_id, idempotency_key, payload, handler)
+
+# API endpoints
+@router.post("/rent")
+async def post_rent(
+    posting_request: LedgerPostingRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Record rent received for a property (admin only)"""
+    def post():
+        transaction_id = record_rent(
+            db,
+            posting_request.property_id,
+            posting_request.amount_cents,
+            posting_request.description,
+            posting_request.reference
+        )
+        return {"success": True, "transaction_id": transaction_id}
+
+    return await run_posting(
+        "ledger-rent", current_user.id, idempotency_key, posting_request.dict(), db, post, "Rent posting failed"
+    )
+
+@router.post("/expenses")
+async def post_expense(
+    posting_request: LedgerPostingRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Record an expense paid from a property's cash (admin only)"""
+    def post():
+        transaction_id = record_expense(
+            db,
+            posting_request.property_id,
+            posting_request.amount_cents,
+            posting_request.description,
+            posting_request.reference
+        )
+        return {"success": True, "transaction_id": transaction_id}
+
+    return await run_posting(
+        "ledger-expense", current_user.id, idempotency_key, posting_request.dict(), db, post, "Expense posting failed"
+    )
+
+@router.post("/distributions")
+async def post_distribution(
+    distribution_request: DistributionRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Allocate a property's cash to its token holders pro rata (admin only)"""
+    def post():
+        return {
+            "success": True,
+            **distribute_income(
+                db,
+                distribution_request.property_id,
+                distribution_request.amount_cents,
+                distribution_request.description
+            )
+        }
+
+    return await run_posting(
+        "ledger-distribution", current_user.id, idempotency_key, distribution_request.dict(), db, post, "Distribution failed"
+    )
+
+@router.post("/payouts")
+async def post_payout(
+    payout_request: PayoutRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Pay every holder of a property what they are owed (admin only)"""
+    def post():
+        return {"success": True, **pay_out_holders(db, payout_request.property_id, payout_request.reference)}
+
+    return await run_posting(
+        "ledger-payout", current_user.id, idempotency_key, payout_request.dict(), db, post, "Payout failed"
+    )
+
+@router.post("/runs")
+async def post_monthly_run(
+    run_request: MonthlyRunRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Post a monthly run: rent, expenses and distributions for many properties in one batch (admin only)"""
+    def post():
+        results = run_monthly(db, [item.dict() for item in run_request.items], run_request.description)
+        return {"success": True, "properties": results}
+
+    return await run_posting(
+        "ledger-run", current_user.id, idempotency_key, run_request.dict(), db, post, "Ledger run failed"
+    )
+
+@router.get("/properties/{property_id}")
+async def get_balances(property_id: int, db: Session = Depends(get_db)):
+    """Current balance of each of a property's accounts, in cents"""
+    return get_property_balances(db, property_id)
+
+@router.get("/properties/{property_id}/statement")
+async def get_statement(
+    property_id: int,
+    month: Optional[str] = Query(None, description="YYYY-MM, default the current month"),
+    db: Session = Depends(get_db)
+):
+    """Monthly statement: opening, debits, credits and closing per account kind, in cents"""
+    return get_property_statement(db, property_id, parse_period(month))
+
+@router.get("/accounts/{account_id}/entries")
+async def get_entries(
+    account_id: int,
+    month: Optional[str] = Query(None, description="YYYY-MM, default the current month"),
+    after_sequence: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """An account's postings in a month with running balances; page with next_sequence"""
+    return get_account_entries(db, account_id, parse_period(month), after_sequence, limit)
+
+@router.get("/user")
+async def get_user_balances(db: Session = Depends(get_db)):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Rental income owed to the user per property, in cents"""
+    return get_user_ledger(db, current_user.id)
@@ -1,5 +1,8 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import io
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, UploadFile, File
+from fastapi.responses import ORJSONResponse, Response
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, validator
 from datetime import datetime
@@ -9,6 +12,30 @@ from app.models.property import Property
 from app.models.user import User
 from app.api.auth import get_current_user
 from app.services.blockchain import blockchain_service
+from app.services.cache import (
+    PROPERTY_LIST_TAG,
+    property_tag,
+    property_tags,
+    render_json,
+    response_cache,
+)
+from app.services.compliance_mirror import check_can_invest, check_can_transfer, check_user_kyc_status
+from app.services.eligibility import ELIGIBILITY_COLUMNS, EligibilityEngine
+from app.services.etag import etag_headers, etag_matches, make_etag, not_modified
+from app.services.holder_snapshots import holder_snapshots
+from app.services.property_facets import property_facets_service
+from app.services.property_feed import property_feed_service
+from app.services.property_import import PropertyImporter, detect_format, iter_records
+from app.services.property_serializer import (
+    query_property_list_version,
+    query_property_rows,
+    query_property_version,
+    serialize_property,
+    serialize_property_row,
+    serialize_property_rows,
+)
+from app.services.waiting_room import waiting_room
+from app.services.yield_simulation import DEFAULT_PATHS, DEFAULT_YEARS, MAX_PATHS, MAX_YEARS, YIELD_SIM_MAX_PATH_YEARS, yield_simulator
 
 router = APIRouter()
 
@@ -87,22 +114,16 @@ class PropertyUpdate(BaseModel):
             raise ValueError('Status must be live, coming-soon, sold-out, or closed')
         return v
 
-@router.get("/", response_model=PropertyListResponse)
-async def get_properties(
-    page: int = Query(1, ge=1),
-    size: int = Query(20, ge=1, le=100),
-    jurisdiction: Optional[str] = Query(None),
-    status: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    featured_only: bool = Query(False),
-    db: Session = Depends(get_db)
+def apply_property_filters(
+    query,
+    jurisdiction: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None,
+    featured_only: bool = False
 ):
-    """Get list of properties with pagination and filters"""
+    """Apply the catalogue filters shared by the list endpoints"""
+    query = query.filter(Property.is_active == True)
     
-    # Build query
-    query = db.query(Property).filter(Property.is_active == True)
-    
-    # Apply filters
     if jurisdiction:
         query = query.filter(Property.jurisdiction == jurisdiction)
     
@@ -119,60 +140,176 @@ async def get_properties(
     if featured_only:
         query = query.filter(Property.is_featured == True)
     
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination
-    offset = (page - 1) * size
-    properties = query.order_by(Property.created_at.desc()).offset(offset).limit(size).all()
-    
-    # Calculate computed properties
-    property_responses = []
-    for prop in properties:
-        prop_dict = {
-            **PropertyResponse.from_orm(prop).dict(),
-            'tokens_remaining': prop.tokens_remaining,
-            'funding_percentage': prop.funding_percentage,
-            'is_fully_funded': prop.is_fully_funded,
-            'minimum_investment': prop.minimum_investment,
-            'requires_prospera_permit': prop.requires_prospera_permit
-        }
-        property_responses.append(PropertyResponse(**prop_dict))
-    
-    return PropertyListResponse(
-        properties=property_responses,
-        total=total,
-        page=page,
-        size=size,
-        has_next=offset + size < total
+    return query
+
+@router.get("/", response_model=PropertyListResponse)
+async def get_properties(
+    request: Request,
+    page: int = Query(1, ge=1),
+    size: int = Query(20, ge=1, le=100),
+    jurisdiction: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    featured_only: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """Get list of properties with pagination and filters"""
+    
+    filters = {
+        "jurisdiction": jurisdiction,
+        "status": status,
+        "search": search,
+        "featured_only": featured_only
+    }
+    
+    # Version fingerprint of the filtered set, checked before any serialization
+    version = apply_property_filters(query_property_list_version(db), **filters).one()
+    total = version[0]
+    etag = make_etag("properties", page, size, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    def load() -> bytes:
+        # Apply pagination
+        offset = (page - 1) * size
+        rows = apply_property_filters(query_property_rows(db), **filters).order_by(
+            Property.created_at.desc()
+        ).offset(offset).limit(size).all()
+        
+        return render_json({
+            "properties": serialize_property_rows(rows),
+            "total": total,
+            "page": page,
+            "size": size,
+            "has_next": offset + size < total
+        })
+    
+    body = await response_cache.get_or_load(
+        "properties:list",
+        {"page": page, "size": size, "etag": etag, **filters},
+        tags=[PROPERTY_LIST_TAG],
+        loader=load
     )
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
+
+@router.get("/facets")
+async def get_property_facets(
+    jurisdiction: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    property_type: Optional[List[str]] = Query(None),
+    price_band: Optional[List[str]] = Query(None),
+    featured_only: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """Get facet counts and price/yield ranges for the catalogue filters
+    
+    Each facet's counts ignore that facet's own selection, so the sidebar can
+    show how many properties every alternative value would match.
+    """
+    
+    return ORJSONResponse(property_facets_service.get_facets(
+        db,
+        jurisdiction=jurisdiction,
+        status=status,
+        property_type=property_type,
+        price_band=price_band,
+        featured_only=featured_only
+    ))
+
+@router.get("/eligibility")
+async def get_investment_eligibility(
+    ids: Optional[List[int]] = Query(None, max_length=200),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Check if current user can invest in several properties at once
+    
+    Evaluates the listed property ids (or every active property when none are
+    given) with a single query.
+    """
+    
+    query = db.query(*ELIGIBILITY_COLUMNS).filter(Property.is_active == True)
+    if ids:
+        query = query.filter(Property.id.in_(ids))
+    rows = query.order_by(Property.id).all()
+    
+    engine = EligibilityEngine(current_user)
+    found = {row.id for row in rows}
+    
+    return ORJSONResponse({
+        "results": [result.to_dict() for result in engine.evaluate_many(rows)],
+        "not_found": [property_id for property_id in dict.fromkeys(ids or []) if property_id not in found],
+        "user_kyc_status": current_user.kyc_status,
+        "user_jurisdiction": current_user.kyc_jurisdiction
+    })
+
+@router.get("/yield-simulation")
+async def simulate_property_yields(
+    ids: List[int] = Query(..., max_length=50),
+    paths: int = Query(DEFAULT_PATHS, ge=100, le=MAX_PATHS),
+    years: int = Query(DEFAULT_YEARS, ge=1, le=MAX_YEARS),
+    db: Session = Depends(get_db)
+):
+    """Simulated yield and occupancy percentile bands for several properties at once
+    
+    Properties without cached bands for their current inputs are simulated
+    together in one vectorized run, off the event loop. A request may ask
+    for at most YIELD_SIM_MAX_PATH_YEARS properties x paths x years.
+    """
+    
+    if len(set(ids)) * paths * years > YIELD_SIM_MAX_PATH_YEARS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too much work requested: properties x paths x years must be at most {YIELD_SIM_MAX_PATH_YEARS}"
+        )
+    
+    results = await asyncio.to_thread(yield_simulator.simulate_many, db, ids, paths, years)
+    
+    return ORJSONResponse({
+        "results": [results[property_id] for property_id in sorted(results)],
+        "not_found": [property_id for property_id in dict.fromkeys(ids) if property_id not in results]
+    })
 
 @router.get("/{property_id}", response_model=PropertyResponse)
-async def get_property(property_id: int, db: Session = Depends(get_db)):
+async def get_property(property_id: int, request: Request, db: Session = Depends(get_db)):
     """Get specific property by ID"""
     
-    property = db.query(Property).filter(
+    version = query_property_version(db).filter(
         Property.id == property_id,
         Property.is_active == True
     ).first()
     
-    if not property:
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Property not found"
         )
     
-    # Include computed properties
-    prop_dict = {
-        **PropertyResponse.from_orm(property).dict(),
-        'tokens_remaining': property.tokens_remaining,
-        'funding_percentage': property.funding_percentage,
-        'is_fully_funded': property.is_fully_funded,
-        'minimum_investment': property.minimum_investment,
-        'requires_prospera_permit': property.requires_prospera_permit
-    }
+    etag = make_etag("property", property_id, *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    def load() -> bytes:
+        row = query_property_rows(db).filter(
+            Property.id == property_id,
+            Property.is_active == True
+        ).first()
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Property not found"
+            )
+        
+        return render_json(serialize_property_row(row))
     
-    return PropertyResponse(**prop_dict)
+    body = await response_cache.get_or_load(
+        "properties:detail",
+        {"id": property_id, "etag": etag},
+        tags=[property_tag(property_id)],
+        loader=load
+    )
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
 
 @router.post("/", response_model=PropertyResponse)
 async def create_property(
@@ -204,17 +341,47 @@ async def create_property(
     db.commit()
     db.refresh(property)
     
-    # Include computed properties
-    prop_dict = {
-        **PropertyResponse.from_orm(property).dict(),
-        'tokens_remaining': property.tokens_remaining,
-        'funding_percentage': property.funding_percentage,
-        'is_fully_funded': property.is_fully_funded,
-        'minimum_investment': property.minimum_investment,
-        'requires_prospera_permit': property.requires_prospera_permit
-    }
+    await response_cache.invalidate([PROPERTY_LIST_TAG])
+    property_facets_service.schedule_refresh()
     
-    return PropertyResponse(**prop_dict)
+    return ORJSONResponse(serialize_property(property))
+
+@router.post("/bulk-import")
+async def bulk_import_properties(
+    file: UploadFile = File(...),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$"),
+    db: Session = Depends(get_db)
+):
+    """Bulk import properties from a CSV or NDJSON file (admin only)
+    
+    Rows are validated with the PropertyCreate rules and loaded in chunks;
+    invalid or duplicate rows are reported without aborting the batch.
+    """
+    
+    # Check if user is admin (temporarily disabled for testing)
+    # if not current_user.is_admin:
+    #     raise HTTPException(
+    #         status_code=status.HTTP_403_FORBIDDEN,
+    #         detail="Only administrators can import properties"
+    #     )
+    
+    fmt = file_format or detect_format(file.filename, file.content_type)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = PropertyImporter(PropertyCreate).run(db, iter_records(stream, fmt))
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Import file must be UTF-8 encoded"
+        )
+    finally:
+        stream.detach()
+    
+    if report["imported"]:
+        await response_cache.invalidate([PROPERTY_LIST_TAG])
+        property_facets_service.schedule_refresh()
+    
+    return report
 
 @router.put("/{property_id}", response_model=PropertyResponse)
 async def update_property(
@@ -255,17 +422,17 @@ async def update_property(
     db.commit()
     db.refresh(property)
     
-    # Include computed properties
-    prop_dict = {
-        **PropertyResponse.from_orm(property).dict(),
-        'tokens_remaining': property.tokens_remaining,
-        'funding_percentage': property.funding_percentage,
-        'is_fully_funded': property.is_fully_funded,
-        'minimum_investment': property.minimum_investment,
-        'requires_prospera_permit': property.requires_prospera_permit
-    }
+    await response_cache.invalidate(property_tags(property.id))
+    property_facets_service.schedule_refresh()
     
-    return PropertyResponse(**prop_dict)
+    # Launching a sale puts its purchase paths behind the waiting room
+    if "status" in update_data:
+        if property.status == "live":
+            await waiting_room.open(property.id)
+        else:
+            await waiting_room.close(property.id)
+    
+    return ORJSONResponse(serialize_property(property))
 
 @router.get("/{property_id}/can-invest")
 async def can_user_invest(
@@ -287,40 +454,12 @@ async def can_user_invest(
             detail="Property not found"
         )
     
-    # Check various conditions
-    can_invest = True
-    reasons = []
-    
-    # Check property status
-    if property.status != "live":
-        can_invest = False
-        reasons.append(f"Property is {property.status}")
-    
-    # Check if fully funded
-    if property.is_fully_funded:
-        can_invest = False
-        reasons.append("Property is fully funded")
-    
-    # Check KYC requirements
-    if property.requires_prospera_permit and not current_user.can_invest_in_prospera:
-        can_invest = False
-        if current_user.kyc_status != "approved":
-            reasons.append("KYC verification required")
-        elif current_user.kyc_jurisdiction != "prospera":
-            reasons.append("Prospera permit required for this property")
-    elif not property.requires_prospera_permit and not current_user.can_invest_international:
-        can_invest = False
-        if current_user.kyc_status != "approved":
-            reasons.append("KYC verification required")
-    
-    # Check user account status
-    if not current_user.is_active:
-        can_invest = False
-        reasons.append("Account is inactive")
+    result = EligibilityEngine(current_user).evaluate(property)
     
     return {
-        "can_invest": can_invest,
-        "reasons": reasons,
+        "can_invest": result.eligible,
+        "reasons": result.reasons,
+        "reason_codes": result.codes,
         "property_status": property.status,
         "tokens_remaining": property.tokens_remaining,
         "minimum_investment": property.minimum_investment,
@@ -328,29 +467,71 @@ async def can_user_invest(
         "user_jurisdiction": current_user.kyc_jurisdiction
     }
 
+@router.get("/{property_id}/holders")
+async def get_property_holders(
+    property_id: int,
+    block: Optional[int] = Query(None, ge=0),
+    db: Session = Depends(get_db)
+):
+    """On-chain cap table of a property at the end of a block (default: the latest indexed block)
+    
+    Built from balance checkpoints indexed from the token's Transfer and
+    PropertyTokensIssued events; token amounts are strings.
+    """
+    try:
+        cap_table = holder_snapshots.cap_table(db, property_id, block)
+        db.commit()
+        return ORJSONResponse(cap_table)
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to get holders: {str(e)}")
+
+@router.get("/{property_id}/yield-simulation")
+async def simulate_property_yield(
+    property_id: int,
+    paths: int = Query(DEFAULT_PATHS, ge=100, le=MAX_PATHS),
+    years: int = Query(DEFAULT_YEARS, ge=1, le=MAX_YEARS),
+    db: Session = Depends(get_db)
+):
+    """Monte Carlo yield and occupancy percentile bands per year, from rent growth, occupancy shocks and vacancies"""
+    
+    results = await asyncio.to_thread(yield_simulator.simulate_many, db, [property_id], paths, years)
+    if property_id not in results:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+    
+    return ORJSONResponse(results[property_id])
+
 @router.get("/featured/list", response_model=List[PropertyResponse])
-async def get_featured_properties(db: Session = Depends(get_db)):
+async def get_featured_properties(request: Request, db: Session = Depends(get_db)):
     """Get featured properties for homepage"""
     
-    properties = db.query(Property).filter(
-        Property.is_active == True,
-        Property.is_featured == True
-    ).order_by(Property.created_at.desc()).limit(6).all()
-    
-    # Include computed properties
-    property_responses = []
-    for prop in properties:
-        prop_dict = {
-            **PropertyResponse.from_orm(prop).dict(),
-            'tokens_remaining': prop.tokens_remaining,
-            'funding_percentage': prop.funding_percentage,
-            'is_fully_funded': prop.is_fully_funded,
-            'minimum_investment': prop.minimum_investment,
-            'requires_prospera_permit': prop.requires_prospera_permit
-        }
-        property_responses.append(PropertyResponse(**prop_dict))
+    version = apply_property_filters(query_property_list_version(db), featured_only=True).one()
+    etag = make_etag("properties:featured", *version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    def load() -> bytes:
+        rows = query_property_rows(db).filter(
+            Property.is_active == True,
+            Property.is_featured == True
+        ).order_by(Property.created_at.desc()).limit(6).all()
+        
+        return render_json(serialize_property_rows(rows))
     
-    return property_responses
+    body = await response_cache.get_or_load(
+        "properties:featured",
+        {"etag": etag},
+        tags=[PROPERTY_LIST_TAG],
+        loader=load
+    )
+    return Response(content=body, media_type="application/json", headers=etag_headers(etag))
 
 # NEW BLOCKCHAIN-INTEGRATED ENDPOINTS
 
@@ -430,8 +611,8 @@ async def get_user_blockchain_kyc(wallet_address: str):
                 }
             }
         
-        # For other addresses, check the blockchain
-        kyc_status = await blockchain_service.check_user_kyc_status(wallet_address)
+        # For other addresses, check the mirrored ComplianceManager state (or the blockchain)
+        kyc_status = await check_user_kyc_status(wallet_address)
         return {
             "success": True,
             "wallet_address": wallet_address,
@@ -451,6 +632,41 @@ async def get_user_blockchain_kyc(wallet_address: str):
             }
         }
 
+@router.get("/blockchain/compliance/can-invest")
+async def check_investment_compliance(
+    wallet_address: str,
+    property_address: str,
+    amount: int = Query(1, ge=0)
+):
+    """ComplianceManager.canInvest, answered from the local mirror when it is current"""
+    for address in (wallet_address, property_address):
+        if not blockchain_service.is_valid_address(address):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid address: {address}"
+            )
+    
+    allowed, reason = await check_can_invest(wallet_address, property_address, amount)
+    return {"allowed": allowed, "reason": reason}
+
+@router.get("/blockchain/compliance/can-transfer")
+async def check_transfer_compliance(
+    from_address: str,
+    to_address: str,
+    property_address: str,
+    amount: int = Query(1, ge=0)
+):
+    """ComplianceManager.canTransfer, answered from the local mirror when it is current"""
+    for address in (from_address, to_address, property_address):
+        if not blockchain_service.is_valid_address(address):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid address: {address}"
+            )
+    
+    allowed, reason = await check_can_transfer(from_address, to_address, property_address, amount)
+    return {"allowed": allowed, "reason": reason}
+
 @router.get("/blockchain/user/{wallet_address}/balance")
 async def get_user_token_balance(wallet_address: str):
     """Get user's Duna Studio token balance from blockchain"""
@@ -478,77 +694,18 @@ async def get_user_token_balance(wallet_address: str):
         }
 
 @router.get("/blockchain/live-properties")
-async def get_live_blockchain_properties():
-    """Get all live properties with real blockchain data"""
+async def get_live_blockchain_properties(db: Session = Depends(get_db)):
+    """Get all tokenized properties merged with live blockchain sale data"""
     try:
-        # Get Duna Studio from blockchain
-        duna_data = await blockchain_service.get_duna_studio_property()
-        
-        # Mock data for other properties (until they're deployed)
-        mock_properties = [
-            {
-                "id": "las-verandas",
-                "name": "Las Verandas Villa",
-                "location": "Roatán, Prospera ZEDE",
-                "jurisdiction": "prospera",
-                "fullPrice": 950000,
-                "tokenPrice": 950,
-                "totalTokens": 1000,
-                "tokensSold": 0,
-                "tokensRemaining": 1000,
-                "expectedYield": 7.2,
-                "image": "/images/lasVerandas/lasVerandas_twoStory_twoBedroom.png",
-                "kycRequired": "prospera-permit",
-                "status": "coming-soon",
-                "contractAddress": None
-            },
-            {
-                "id": "duna-two-bedroom",
-                "name": "Duna Residences, Two Bedroom",
-                "location": "Roatán, Prospera ZEDE", 
-                "jurisdiction": "prospera",
-                "fullPrice": 239500,
-                "tokenPrice": 240,
-                "totalTokens": 1000,
-                "tokensSold": 0,
-                "tokensRemaining": 1000,
-                "expectedYield": 8.1,
-                "image": "/images/dunaResidences/duna_twoBedroom_birdsView.png",
-                "kycRequired": "prospera-permit",
-                "status": "coming-soon",
-                "contractAddress": None
-            },
-            {
-                "id": "pristine-bay-villa",
-                "name": "Pristine Bay, Villa 1111",
-                "location": "Roatán, Prospera ZEDE",
-                "jurisdiction": "prospera", 
-                "fullPrice": 890000,
-                "tokenPrice": 890,
-                "totalTokens": 1000,
-                "tokensSold": 0,
-                "tokensRemaining": 1000,
-                "expectedYield": 6.8,
-                "image": "/images/pristineBay/PB_1111_1.png",
-                "kycRequired": "prospera-permit",
-                "status": "coming-soon",
-                "contractAddress": None
-            }
-        ]
-        
-        # Combine blockchain data with mock data
-        all_properties = [duna_data] + mock_properties
+        feed = await property_feed_service.get_live_properties(db)
         
         return {
             "success": True,
-            "properties": all_properties,
-            "blockchain_properties": 1,
-            "mock_properties": len(mock_properties),
-            "network": blockchain_service.get_network_info()
+            **feed
         }
     except Exception as e:
         return {
             "success": False,
             "error": str(e),
             "properties": []
-        } 
\ No newline at end of file
+        } 
@@ -1,15 +1,43 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import update
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, validator
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
 
 from app.database import get_db
 from app.models.user import User
 from app.models.property import Property
-from app.models.kyc import Investment, Token
+from app.models.kyc import CashDeposit, Investment, TokenReservation
 from app.api.auth import get_current_user
 from app.services.blockchain import blockchain_service
+from app.services.cache import property_tags, render_json, response_cache
+from app.services.eligibility import ensure_can_hold, ensure_eligible
+from app.services.etag import etag_headers, etag_matches, make_etag, not_modified
+from app.services.idempotency import idempotency_store
+from app.services.order_book import BUY, SELL, order_book_service, settle_trades
+from app.services.portfolio_rollups import get_portfolio_summary, record_transfer
+from app.services.portfolio_valuation import portfolio_valuation
+from app.services.token_listings import get_listing_summary
+from app.services.token_allocation import MAX_MINT_QUANTITY, allocate_owned_range
+from app.services.token_ownership import get_cap_table, get_holdings, page_property_tokens, transfer_tokens
+from app.services.transaction_builder import transaction_builder
+from app.services.token_reservations import (
+    confirm_reservation,
+    create_investment,
+    release_reservation,
+    reserve_tokens,
+    serialize_reservation,
+)
+from app.services.transaction_history import (
+    get_transaction_page,
+    iter_transactions_csv,
+    iter_transactions_ndjson,
+)
+from app.services.waiting_room import TICKET_HEADER, waiting_room
 
 router = APIRouter()
 
@@ -18,6 +46,12 @@ class PurchaseRequest(BaseModel):
     property_id: int
     token_amount: int
     
+    @validator('token_amount')
+    def validate_token_amount(cls, v):
+        if v < 1:
+            raise ValueError('Token amount must be at least 1')
+        return v
+    
     class Config:
         from_attributes = True
 
@@ -27,24 +61,135 @@ class MintTokenRequest(BaseModel):
     class Config:
         from_attributes = True
 
+class MintTokensRequest(BaseModel):
+    property_id: int
+    quantity: int
+    
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v < 1 or v > MAX_MINT_QUANTITY:
+            raise ValueError(f'Quantity must be between 1 and {MAX_MINT_QUANTITY}')
+        return v
+    
+    class Config:
+        from_attributes = True
+
 class TokenResponse(BaseModel):
-    id: int
     token_number: int
     property_id: int
     owner_id: int
     mint_price: float
-    current_price: Optional[float] = None
-    is_for_sale: bool
-    minted_at: datetime
     
     class Config:
         from_attributes = True
 
+class MintTokensResponse(BaseModel):
+    property_id: int
+    quantity: int
+    first_token_number: int
+    last_token_number: int
+    tokens: List[TokenResponse]
+
+class ReservationRequest(BaseModel):
+    property_id: int
+    token_amount: int
+    
+    @validator('token_amount')
+    def validate_token_amount(cls, v):
+        if v < 1:
+            raise ValueError('Token amount must be at least 1')
+        return v
+
+class ReservationConfirmRequest(BaseModel):
+    transaction_hash: Optional[str] = None
+
+class ReservationResponse(BaseModel):
+    reservation_id: str
+    property_id: int
+    quantity: int
+    price_per_token: float
+    total_cost: float
+    status: str
+    expires_at: datetime
+    transaction_hash: Optional[str] = None
+    investment_id: Optional[int] = None
+
+class TransferRequest(BaseModel):
+    property_id: int
+    to_wallet_address: str
+    quantity: int
+    
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v < 1:
+            raise ValueError('Quantity must be at least 1')
+        return v
+
+class TransferResponse(BaseModel):
+    success: bool
+    property_id: int
+    to_owner_id: int
+    quantity: int
+    token_ranges: List[List[int]]
+
+class ListingRequest(BaseModel):
+    property_id: int
+    quantity: int
+    price: float
+    
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v < 1:
+            raise ValueError('Quantity must be at least 1')
+        return v
+    
+    @validator('price')
+    def validate_price(cls, v):
+        if v <= 0:
+            raise ValueError('Price must be positive')
+        return v
+
+class OrderRequest(BaseModel):
+    property_id: int
+    side: str
+    price: float
+    quantity: int
+    
+    @validator('side')
+    def validate_side(cls, v):
+        if v not in (BUY, SELL):
+            raise ValueError('Side must be buy or sell')
+        return v
+    
+    @validator('price')
+    def validate_price(cls, v):
+        if v <= 0:
+            raise ValueError('Price must be positive')
+        return v
+    
+    @validator('quantity')
+    def validate_quantity(cls, v):
+        if v < 1:
+            raise ValueError('Quantity must be at least 1')
+        return v
+
+class DepositRequest(BaseModel):
+    amount: float
+    payment_method: Optional[str] = None
+    reference: Optional[str] = None
+    
+    @validator('amount')
+    def validate_amount(cls, v):
+        if v <= 0:
+            raise ValueError('Amount must be positive')
+        return v
+
 class PurchaseResponse(BaseModel):
     success: bool
     transaction_hash: Optional[str] = None
     tokens_purchased: Optional[int] = None
     total_cost: Optional[float] = None
+    token_range: Optional[List[int]] = None
     error: Optional[str] = None
     
     class Config:
@@ -74,9 +219,76 @@ class UserTransaction(BaseModel):
     class Config:
         from_attributes = True
 
+class UserTransactionPage(BaseModel):
+    transactions: List[UserTransaction]
+    next_cursor: Optional[str] = None
+    has_next: bool
+    limit: int
+
+def ensure_unencumbered(db: Session, user_id: int, property_id: int, quantity: int):
+    """Reject moving or offering tokens that open sell orders already commit"""
+    holdings = get_holdings(db, user_id, property_id=property_id)
+    held = holdings[0]["token_count"] if holdings else 0
+    if held - order_book_service.open_sell_quantity(property_id, user_id) < quantity:
+        raise HTTPException(status_code=400, detail="Not enough tokens outside open sell orders")
+
+def ensure_funds(db: Session, user_id: int, amount: int):
+    """Reject bids (in cents) beyond the user's cash less what their open bids commit"""
+    balance = db.query(User.cash_balance).filter(User.id == user_id).scalar() or 0
+    available = int(balance * 100) - order_book_service.open_buy_value(user_id)
+    if available < amount:
+        raise HTTPException(status_code=400, detail="Insufficient funds outside open buy orders")
+
+async def mint_property_tokens(
+    db: Session,
+    current_user: User,
+    property_id: int,
+    quantity: int,
+    ticket: Optional[str] = None
+) -> List[TokenResponse]:
+    """Mint a block of tokens for the user in one transaction"""
+    try:
+        # Sale launches admit buyers through the waiting room
+        await waiting_room.require_admission(property_id, current_user.id, ticket)
+        
+        # Get the property
+        property = db.query(Property).filter(Property.id == property_id).first()
+        if not property:
+            raise HTTPException(status_code=404, detail="Property not found")
+        
+        # Check status, funding and KYC rules
+        ensure_eligible(current_user, property, token_amount=quantity)
+        
+        # Allocate token numbers atomically; ownership is recorded as one range
+        first_number, last_number = allocate_owned_range(db, property.id, current_user.id, quantity)
+        record_transfer(db, property.id, None, current_user.id, quantity, property.token_price * quantity)
+        db.commit()
+        
+        await response_cache.invalidate(property_tags(property_id))
+        await waiting_room.complete(property_id, ticket, property.total_tokens - property.tokens_sold)
+        
+        return [
+            TokenResponse(
+                token_number=token_number,
+                property_id=property.id,
+                owner_id=current_user.id,
+                mint_price=float(property.token_price)
+            )
+            for token_number in range(first_number, last_number + 1)
+        ]
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Token minting failed: {str(e)}")
+
 @router.post("/mint-token", response_model=TokenResponse)
 async def mint_token(
     mint_request: MintTokenRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    waiting_room_ticket: Optional[str] = Header(None, alias=TICKET_HEADER, max_length=64),
     db: Session = Depends(get_db)
 ):
     # For testing, use a mock user
@@ -88,100 +300,283 @@ async def mint_token(
         prospera_permit_id="TEST123"
     )
     """Mint a new token for a property"""
-    try:
-        # Get the property
-        property = db.query(Property).filter(Property.id == mint_request.property_id).first()
-        if not property:
-            raise HTTPException(status_code=404, detail="Property not found")
-        
-        # Check if property is live
-        if property.status != 'live':
-            raise HTTPException(status_code=400, detail="Property is not available for minting")
-        
-        # Check if user has valid KYC
-        if not current_user.kyc_status == 'approved':
-            raise HTTPException(status_code=403, detail="KYC verification required")
-        
-        # Check if property requires Prospera permit
-        if property.kyc_required == 'prospera-permit':
-            if not current_user.can_invest_in_prospera:
-                raise HTTPException(status_code=403, detail="Prospera permit required for this property")
-        
-        # Get the next token number for this property
-        last_token = db.query(Token).filter(
-            Token.property_id == mint_request.property_id
-        ).order_by(Token.token_number.desc()).first()
-        
-        next_token_number = (last_token.token_number + 1) if last_token else 1
-        
-        # Check if we haven't exceeded total tokens
-        if next_token_number > property.total_tokens:
-            raise HTTPException(status_code=400, detail="All tokens have been minted")
+    async def handler():
+        tokens = await mint_property_tokens(db, current_user, mint_request.property_id, 1, waiting_room_ticket)
+        return tokens[0]
+    
+    return await idempotency_store.run(
+        "mint-token",
+        current_user.id,
+        idempotency_key,
+        mint_request.dict(),
+        handler
+    )
+
+@router.post("/mint-tokens", response_model=MintTokensResponse)
+async def mint_token_batch(
+    mint_request: MintTokensRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    waiting_room_ticket: Optional[str] = Header(None, alias=TICKET_HEADER, max_length=64),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Mint several consecutive tokens for a property in one request"""
+    async def handler():
+        tokens = await mint_property_tokens(
+            db,
+            current_user,
+            mint_request.property_id,
+            mint_request.quantity,
+            waiting_room_ticket
+        )
         
-        # Create the token
-        token = Token(
-            token_number=next_token_number,
+        return MintTokensResponse(
             property_id=mint_request.property_id,
-            owner_id=current_user.id,
-            mint_price=property.token_price,
-            is_for_sale=False
+            quantity=len(tokens),
+            first_token_number=tokens[0].token_number,
+            last_token_number=tokens[-1].token_number,
+            tokens=tokens
         )
+    
+    return await idempotency_store.run(
+        "mint-tokens",
+        current_user.id,
+        idempotency_key,
+        mint_request.dict(),
+        handler
+    )
+
+@router.get("/tokens/{property_id}")
+async def get_property_tokens(
+    property_id: int,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    owner_id: Optional[int] = Query(None),
+    format: str = Query("json", pattern="^(json|compact)$"),
+    db: Session = Depends(get_db)
+):
+    """Get a property's tokens by token number, a page at a time
+
+    Pass ``next_after`` back as ``after`` for the next page. ``format=compact``
+    returns ``fields`` once and each token as an array.
+    """
+    try:
+        page = page_property_tokens(
+            db,
+            property_id,
+            after=after,
+            limit=limit,
+            owner_id=owner_id,
+            compact=format == "compact"
+        )
+        return Response(content=render_json(page), media_type="application/json")
         
-        # Update property tokens sold
-        property.tokens_sold += 1
-        
-        db.add(token)
-        db.commit()
-        db.refresh(token)
-        
-        return TokenResponse(
-            id=token.id,
-            token_number=token.token_number,
-            property_id=token.property_id,
-            owner_id=token.owner_id,
-            mint_price=float(token.mint_price),
-            current_price=float(token.current_price) if token.current_price else None,
-            is_for_sale=token.is_for_sale,
-            minted_at=token.minted_at
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get tokens: {str(e)}")
+
+@router.get("/listings/{property_id}")
+async def get_property_listings(
+    property_id: int,
+    best: int = Query(20, ge=1, le=200),
+    buckets: int = Query(10, ge=1, le=50)
+):
+    """Floor price, cheapest asks and a price histogram of a property's listed tokens
+
+    Listings are the sell orders resting in the property's order book.
+    """
+    return Response(
+        content=render_json(get_listing_summary(property_id, best=best, buckets=buckets)),
+        media_type="application/json"
+    )
+
+@router.post("/listings")
+async def list_property_tokens(
+    listing_request: ListingRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """List the user's tokens for sale at a price
+
+    A listing is a sell order: it fills at once against bids at or above the
+    price, and the rest is offered in the order book until it fills or is
+    delisted.
+    """
+    async def handler():
+        return await submit_order(
+            db, current_user, listing_request.property_id, SELL, listing_request.price, listing_request.quantity
         )
+    
+    return await idempotency_store.run(
+        "listing",
+        current_user.id,
+        idempotency_key,
+        listing_request.dict(),
+        handler
+    )
+
+@router.delete("/listings/{property_id}")
+async def delist_property_tokens(property_id: int):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Withdraw the user's tokens from sale by cancelling their sell orders for the property"""
+    try:
+        orders = [
+            await asyncio.to_thread(order_book_service.cancel, order.order_id, current_user.id)
+            for order in order_book_service.user_orders(current_user.id, property_id)
+            if order.side == SELL
+        ]
+        
+        return {"success": True, "property_id": property_id, "orders": [order.to_dict() for order in orders]}
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=f"Token minting failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Delisting failed: {str(e)}")
 
-@router.get("/tokens/{property_id}", response_model=List[TokenResponse])
-async def get_property_tokens(
+@router.get("/holdings")
+async def get_user_holdings(
+    property_id: Optional[int] = None,
+    include_ranges: bool = False,
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Get the user's token holdings per property from ownership ranges"""
+    try:
+        holdings = get_holdings(db, current_user.id, property_id=property_id, include_ranges=include_ranges)
+        
+        return {
+            "owner_id": current_user.id,
+            "total_tokens": sum(holding["token_count"] for holding in holdings),
+            "holdings": holdings
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get holdings: {str(e)}")
+
+@router.get("/cap-table/{property_id}")
+async def get_property_cap_table(
     property_id: int,
     db: Session = Depends(get_db)
 ):
-    """Get all tokens for a property"""
+    """Get token ownership per holder for a property"""
+    property = db.query(Property.id, Property.total_tokens, Property.tokens_minted).filter(
+        Property.id == property_id
+    ).first()
+    if not property:
+        raise HTTPException(status_code=404, detail="Property not found")
+    
     try:
-        tokens = db.query(Token).filter(
-            Token.property_id == property_id
-        ).order_by(Token.token_number).all()
+        holders = get_cap_table(db, property_id)
+        held = sum(holder["token_count"] for holder in holders)
+        for holder in holders:
+            holder["percentage"] = round(holder["token_count"] / held * 100, 4) if held else 0
         
-        return [
-            TokenResponse(
-                id=token.id,
-                token_number=token.token_number,
-                property_id=token.property_id,
-                owner_id=token.owner_id,
-                mint_price=float(token.mint_price),
-                current_price=float(token.current_price) if token.current_price else None,
-                is_for_sale=token.is_for_sale,
-                minted_at=token.minted_at
-            )
-            for token in tokens
-        ]
+        return {
+            "property_id": property_id,
+            "total_tokens": property.total_tokens,
+            "tokens_minted": property.tokens_minted,
+            "holder_count": len(holders),
+            "holders": holders
+        }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get tokens: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to get cap table: {str(e)}")
+
+@router.post("/transfer", response_model=TransferResponse)
+async def transfer_property_tokens(
+    transfer_request: TransferRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Transfer tokens of a property to another user"""
+    async def handler():
+        try:
+            property = db.query(Property).filter(Property.id == transfer_request.property_id).first()
+            if not property:
+                raise HTTPException(status_code=404, detail="Property not found")
+            
+            recipient = db.query(User).filter(
+                User.wallet_address == transfer_request.to_wallet_address
+            ).first()
+            if not recipient:
+                raise HTTPException(status_code=404, detail="Recipient not found")
+            if recipient.id == current_user.id:
+                raise HTTPException(status_code=400, detail="Cannot transfer tokens to yourself")
+            
+            # Recipient must pass the same KYC rules as an investor
+            ensure_can_hold(recipient, property)
+            
+            # Tokens offered in open sell orders stay put until those orders are cancelled
+            ensure_unencumbered(db, current_user.id, property.id, transfer_request.quantity)
+            
+            runs = transfer_tokens(db, property.id, current_user.id, recipient.id, transfer_request.quantity)
+            record_transfer(db, property.id, current_user.id, recipient.id, transfer_request.quantity)
+            db.commit()
+            
+            return TransferResponse(
+                success=True,
+                property_id=property.id,
+                to_owner_id=recipient.id,
+                quantity=transfer_request.quantity,
+                token_ranges=[list(run) for run in runs]
+            )
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Transfer failed: {str(e)}")
+    
+    return await idempotency_store.run(
+        "transfer",
+        current_user.id,
+        idempotency_key,
+        transfer_request.dict(),
+        handler
+    )
 
 @router.post("/purchase", response_model=PurchaseResponse)
 async def purchase_tokens(
     purchase_request: PurchaseRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    waiting_room_ticket: Optional[str] = Header(None, alias=TICKET_HEADER, max_length=64),
     db: Session = Depends(get_db)
 ):
     # For testing, use a mock user
@@ -193,65 +588,466 @@ async def purchase_tokens(
         prospera_permit_id="TEST123"
     )
     """Purchase tokens for a property"""
+    async def handler():
+        try:
+            # Sale launches admit buyers through the waiting room
+            await waiting_room.require_admission(purchase_request.property_id, current_user.id, waiting_room_ticket)
+            
+            # Get the property
+            property = db.query(Property).filter(Property.id == purchase_request.property_id).first()
+            if not property:
+                raise HTTPException(status_code=404, detail="Property not found")
+            
+            # Check status, funding, KYC and token availability rules
+            ensure_eligible(current_user, property, token_amount=purchase_request.token_amount)
+            
+            # Calculate total cost
+            total_cost = purchase_request.token_amount * property.token_price
+            
+            # For now, simulate a successful transaction
+            # In a real implementation, this would call the blockchain service
+            transaction_hash = f"0x{hash(f'{current_user.id}{property.id}{datetime.now()}') % 10**64:064x}"
+            
+            # Atomically take tokens from unreserved inventory and assign their numbers
+            token_range = allocate_owned_range(db, property.id, current_user.id, purchase_request.token_amount)
+            
+            # Create investment record
+            create_investment(
+                db,
+                current_user.id,
+                property.id,
+                purchase_request.token_amount,
+                property.token_price,
+                transaction_hash
+            )
+            db.commit()
+            
+            await response_cache.invalidate(property_tags(property.id))
+            await waiting_room.complete(property.id, waiting_room_ticket, property.total_tokens - property.tokens_sold)
+            
+            return PurchaseResponse(
+                success=True,
+                transaction_hash=transaction_hash,
+                tokens_purchased=purchase_request.token_amount,
+                total_cost=total_cost,
+                token_range=list(token_range)
+            )
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Purchase failed: {str(e)}")
+    
+    return await idempotency_store.run(
+        "purchase",
+        current_user.id,
+        idempotency_key,
+        purchase_request.dict(),
+        handler
+    )
+
+@router.get("/prepare/purchase")
+async def prepare_purchase_transaction(
+    property_id: int,
+    token_amount: int = Query(..., ge=1),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Unsigned purchaseTokens transaction with value, gas and EIP-1559 fees filled in, for the wallet to sign"""
     try:
-        # Get the property
-        property = db.query(Property).filter(Property.id == purchase_request.property_id).first()
+        property = db.query(Property).filter(Property.id == property_id).first()
         if not property:
             raise HTTPException(status_code=404, detail="Property not found")
         
-        # Check if property is live
-        if property.status != 'live':
-            raise HTTPException(status_code=400, detail="Property is not available for purchase")
-        
-        # Check if user has valid KYC
-        if not current_user.kyc_status == 'approved':
-            raise HTTPException(status_code=403, detail="KYC verification required")
-        
-        # Check if property requires Prospera permit
-        if property.kyc_required == 'prospera-permit':
-            if not current_user.can_invest_in_prospera:
-                raise HTTPException(status_code=403, detail="Prospera permit required for this property")
-        
-        # Check if enough tokens are available
-        if property.tokens_sold + purchase_request.token_amount > property.total_tokens:
-            raise HTTPException(status_code=400, detail="Not enough tokens available")
-        
-        # Calculate total cost
-        total_cost = purchase_request.token_amount * property.token_price
-        
-        # For now, simulate a successful transaction
-        # In a real implementation, this would call the blockchain service
-        transaction_hash = f"0x{hash(f'{current_user.id}{property.id}{datetime.now()}') % 10**64:064x}"
-        
-        # Create investment record
-        investment = Investment(
-            user_id=current_user.id,
-            property_id=property.id,
-            tokens_purchased=purchase_request.token_amount,
-            token_price_at_purchase=str(property.token_price),
-            total_amount=str(total_cost),
-            transaction_hash=transaction_hash,
-            status="confirmed"
-        )
-        
-        # Update property tokens sold
-        property.tokens_sold += purchase_request.token_amount
+        return await transaction_builder.prepare_purchase(current_user, property, token_amount)
         
-        db.add(investment)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to prepare purchase: {str(e)}")
+
+@router.post("/reservations", response_model=ReservationResponse)
+async def create_reservation(
+    reservation_request: ReservationRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    waiting_room_ticket: Optional[str] = Header(None, alias=TICKET_HEADER, max_length=64),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Hold tokens while the wallet signs the on-chain purchase"""
+    async def handler():
+        try:
+            # Sale launches admit buyers through the waiting room
+            await waiting_room.require_admission(reservation_request.property_id, current_user.id, waiting_room_ticket)
+            
+            property = db.query(Property).filter(Property.id == reservation_request.property_id).first()
+            if not property:
+                raise HTTPException(status_code=404, detail="Property not found")
+            
+            # Check status, funding, KYC and token availability rules
+            ensure_eligible(current_user, property, token_amount=reservation_request.token_amount)
+            
+            reservation = reserve_tokens(db, current_user.id, property, reservation_request.token_amount)
+            db.commit()
+            
+            # The hold now protects the buyer's tokens, so the admission slot can go to the next in line
+            await waiting_room.complete(property.id, waiting_room_ticket)
+            
+            return serialize_reservation(reservation)
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Reservation failed: {str(e)}")
+    
+    return await idempotency_store.run(
+        "reservation",
+        current_user.id,
+        idempotency_key,
+        reservation_request.dict(),
+        handler
+    )
+
+@router.get("/reservations/{reservation_id}", response_model=ReservationResponse)
+async def get_reservation(
+    reservation_id: str,
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Get a reservation"""
+    reservation = db.query(TokenReservation).filter(
+        TokenReservation.reference == reservation_id,
+        TokenReservation.user_id == current_user.id
+    ).first()
+    if not reservation:
+        raise HTTPException(status_code=404, detail="Reservation not found")
+    
+    return serialize_reservation(reservation)
+
+@router.post("/reservations/{reservation_id}/confirm", response_model=PurchaseResponse)
+async def confirm_token_reservation(
+    reservation_id: str,
+    confirm_request: ReservationConfirmRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Complete a purchase for held tokens"""
+    async def handler():
+        try:
+            purchase = confirm_reservation(db, reservation_id, current_user.id, confirm_request.transaction_hash)
+            db.commit()
+            
+            await response_cache.invalidate(property_tags(purchase["property_id"]))
+            
+            property = db.query(Property.total_tokens, Property.tokens_sold).filter(
+                Property.id == purchase["property_id"]
+            ).one()
+            await waiting_room.complete(purchase["property_id"], None, property.total_tokens - property.tokens_sold)
+            
+            return PurchaseResponse(
+                success=True,
+                transaction_hash=confirm_request.transaction_hash,
+                tokens_purchased=purchase["quantity"],
+                total_cost=purchase["total_cost"],
+                token_range=purchase["token_range"]
+            )
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Confirmation failed: {str(e)}")
+    
+    return await idempotency_store.run(
+        "reservation-confirm",
+        current_user.id,
+        idempotency_key,
+        {"reservation_id": reservation_id, **confirm_request.dict()},
+        handler
+    )
+
+@router.delete("/reservations/{reservation_id}")
+async def release_token_reservation(
+    reservation_id: str,
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Release held tokens back to inventory"""
+    try:
+        release_reservation(db, reservation_id, current_user.id)
         db.commit()
         
-        return PurchaseResponse(
-            success=True,
-            transaction_hash=transaction_hash,
-            tokens_purchased=purchase_request.token_amount,
-            total_cost=total_cost
+        return {"success": True, "reservation_id": reservation_id, "status": "released"}
+        
+    except HTTPException:
+        db.rollback()
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Release failed: {str(e)}")
+
+async def submit_order(
+    db: Session,
+    current_user: User,
+    property_id: int,
+    side: str,
+    price: float,
+    quantity: int
+) -> dict:
+    """Match a limit order against the property's book, settling any fills"""
+    try:
+        property = db.query(Property).filter(Property.id == property_id).first()
+        if not property:
+            raise HTTPException(status_code=404, detail="Property not found")
+        
+        price = int((Decimal(str(price)) * 100).to_integral_value())
+        if side == BUY:
+            ensure_can_hold(current_user, property)
+            ensure_funds(db, current_user.id, price * quantity)
+        else:
+            ensure_unencumbered(db, current_user.id, property.id, quantity)
+        
+        # Fills are committed before the book applies them
+        def settle(order, trades):
+            settle_trades(db, order, trades)
+            db.commit()
+        
+        # Settlement waits on the property's lock and the database, so it runs off the event loop
+        order, trades = await asyncio.to_thread(
+            order_book_service.place, property.id, current_user.id, side, price, quantity, settle
         )
         
+        if trades:
+            await response_cache.invalidate(property_tags(property.id))
+        
+        return {
+            "success": True,
+            "order": order.to_dict(),
+            "trades": [trade.to_dict() for trade in trades]
+        }
+        
     except HTTPException:
+        db.rollback()
         raise
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Purchase failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Order failed: {str(e)}")
+
+@router.post("/orders")
+async def place_order(
+    order_request: OrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Place a limit order on a property's secondary market
+
+    The order is matched at once against the property's order book; fills
+    move tokens from seller to buyer and cash from buyer to seller, and any
+    remainder rests in the book. Bids commit the buyer's cash until they
+    fill or are cancelled.
+    """
+    async def handler():
+        return await submit_order(
+            db,
+            current_user,
+            order_request.property_id,
+            order_request.side,
+            order_request.price,
+            order_request.quantity
+        )
+    
+    return await idempotency_store.run(
+        "order",
+        current_user.id,
+        idempotency_key,
+        order_request.dict(),
+        handler
+    )
+
+@router.get("/orders/{order_id}")
+async def get_order(order_id: int):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Get one of the user's open orders"""
+    order = order_book_service.get_order(order_id)
+    if not order or order.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Open order not found")
+    
+    return order.to_dict()
+
+@router.delete("/orders/{order_id}")
+async def cancel_order(order_id: int):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Cancel the unfilled remainder of an open order"""
+    try:
+        # A cancel waits for any placement settling against the same book
+        order = await asyncio.to_thread(order_book_service.cancel, order_id, current_user.id)
+        return {"success": True, "order": order.to_dict()}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Cancel failed: {str(e)}")
+
+@router.get("/order-book/{property_id}")
+async def get_order_book(
+    property_id: int,
+    depth: int = Query(20, ge=1, le=500)
+):
+    """Aggregated bids and asks for a property, best prices first"""
+    return {"property_id": property_id, **order_book_service.depth(property_id, depth)}
+
+@router.get("/user/orders")
+async def get_user_orders(property_id: Optional[int] = None):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Get the user's open orders"""
+    orders = order_book_service.user_orders(current_user.id, property_id)
+    
+    return {"orders": [order.to_dict() for order in sorted(orders, key=lambda order: order.order_id)]}
+
+def cash_balances(balance: Decimal, user_id: int) -> dict:
+    """The user's cash balance, and what is left of it outside their open bids"""
+    committed = Decimal(order_book_service.open_buy_value(user_id)) / 100
+    return {"cash_balance": float(balance), "available_balance": float(balance - committed)}
+
+@router.post("/deposits")
+async def deposit_cash(
+    deposit_request: DepositRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Credit money to the user's cash balance, which pays for order book bids"""
+    async def handler():
+        try:
+            amount = Decimal(str(deposit_request.amount)).quantize(Decimal("0.01"))
+            deposit = CashDeposit(
+                user_id=current_user.id,
+                amount=amount,
+                payment_method=deposit_request.payment_method,
+                reference=deposit_request.reference
+            )
+            db.add(deposit)
+            balance = db.execute(
+                update(User)
+                .where(User.id == current_user.id)
+                .values(cash_balance=User.cash_balance + amount)
+                .returning(User.cash_balance)
+                .execution_options(synchronize_session=False)
+            ).scalar()
+            if balance is None:
+                raise HTTPException(status_code=404, detail="User not found")
+            db.commit()
+            
+            return {"success": True, "deposit_id": deposit.id, "amount": float(amount), **cash_balances(balance, current_user.id)}
+            
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Deposit failed: {str(e)}")
+    
+    return await idempotency_store.run(
+        "deposit",
+        current_user.id,
+        idempotency_key,
+        deposit_request.dict(),
+        handler
+    )
+
+@router.get("/user/balance")
+async def get_user_balance(db: Session = Depends(get_db)):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Get the user's cash balance and how much of it open bids leave available"""
+    balance = db.query(User.cash_balance).filter(User.id == current_user.id).scalar()
+    if balance is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return cash_balances(balance, current_user.id)
 
 @router.get("/status/{transaction_hash}", response_model=TransactionStatus)
 async def get_transaction_status(
@@ -291,8 +1087,11 @@ async def get_transaction_status(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get transaction status: {str(e)}")
 
-@router.get("/user/transactions", response_model=List[UserTransaction])
+@router.get("/user/transactions", response_model=UserTransactionPage)
 async def get_user_transactions(
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
     db: Session = Depends(get_db)
 ):
     # For testing, use a mock user
@@ -303,41 +1102,32 @@ async def get_user_transactions(
         kyc_jurisdiction="prospera",
         prospera_permit_id="TEST123"
     )
-    """Get all transactions for the current user"""
+    """Get the current user's transactions, newest first
+
+    JSON responses are pages linked by ``next_cursor``. ``format=ndjson`` or
+    ``format=csv`` streams the full history instead.
+    """
+    if format == "ndjson":
+        return StreamingResponse(iter_transactions_ndjson(current_user.id), media_type="application/x-ndjson")
+    if format == "csv":
+        return StreamingResponse(
+            iter_transactions_csv(current_user.id),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="transactions.csv"'}
+        )
+    
     try:
-        # Get user's investments with property details
-        investments = db.query(
-            Investment,
-            Property.name.label('property_name')
-        ).join(
-            Property, Investment.property_id == Property.id
-        ).filter(
-            Investment.user_id == current_user.id
-        ).order_by(
-            Investment.created_at.desc()
-        ).all()
-        
-        transactions = []
-        for investment, property_name in investments:
-            transactions.append(UserTransaction(
-                id=investment.id,
-                property_id=investment.property_id,
-                property_name=property_name,
-                tokens_purchased=investment.tokens_purchased,
-                token_price_at_purchase=float(investment.token_price_at_purchase),
-                total_cost=float(investment.total_amount),
-                transaction_hash=investment.transaction_hash,
-                purchase_date=investment.created_at,
-                status='completed'  # Simulated
-            ))
-        
-        return transactions
+        return get_transaction_page(db, current_user.id, cursor, limit)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get user transactions: {str(e)}")
 
 @router.get("/user/portfolio")
 async def get_user_portfolio(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     # For testing, use a mock user
@@ -350,26 +1140,73 @@ async def get_user_portfolio(
     )
     """Get user's investment portfolio summary"""
     try:
-        # Get user's investments
-        investments = db.query(Investment).filter(
-            Investment.user_id == current_user.id
-        ).all()
+        # Single-row read of the rollup kept current by every purchase, mint, transfer and sale
+        summary = get_portfolio_summary(db, current_user.id)
+        
+        # The ETag comes from the rollup and a fingerprint of holdings, prices and the valuation date,
+        # so a 304 never pays for the valuation
+        etag = make_etag(
+            "portfolio",
+            current_user.id,
+            summary["investment_count"],
+            summary["total_invested"],
+            summary["updated_at"],
+            *portfolio_valuation.user_version(db, current_user.id)
+        )
+        if etag_matches(request, etag):
+            return not_modified(etag, private=True)
+        response.headers.update(etag_headers(etag, private=True))
         
-        total_invested = sum(float(inv.total_amount) for inv in investments)
-        total_tokens = sum(inv.tokens_purchased for inv in investments)
-        properties_count = len(set(inv.property_id for inv in investments))
+        # Holdings priced at current token prices, plus income accrued since the first snapshot.
+        # The rollup follows the same holdings, so its invested capital is what these tokens cost.
+        valuation = portfolio_valuation.value_user(db, current_user.id)
+        accrued_yield = round(valuation["accrued_yield_cents"])
         
-        # Calculate current value (simplified)
-        current_value = total_invested * 1.05  # Simulated 5% appreciation
+        # Money stays exact until the response
+        total_invested = summary["total_invested"]
+        current_value = Decimal(valuation["value_cents"]) / 100
+        accrued_yield = Decimal(accrued_yield) / 100
+        total_return = current_value + accrued_yield - total_invested
         
         return {
-            "total_invested": total_invested,
-            "current_value": current_value,
-            "total_tokens": total_tokens,
-            "properties_count": properties_count,
-            "total_return": current_value - total_invested,
-            "return_percentage": ((current_value - total_invested) / total_invested * 100) if total_invested > 0 else 0
+            "total_invested": float(total_invested),
+            "current_value": float(current_value),
+            "accrued_yield": float(accrued_yield),
+            "total_tokens": valuation["total_tokens"],
+            "properties_count": summary["properties_count"],
+            "total_return": float(total_return),
+            "return_percentage": float(total_return / total_invested * 100) if total_invested > 0 else 0
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get portfolio: {str(e)}")
+
+@router.get("/user/portfolio/history")
+async def get_user_portfolio_history(
+    start: Optional[date] = Query(None),
+    end: Optional[date] = Query(None),
+    db: Session = Depends(get_db)
+):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Get daily portfolio snapshots for charting (the last year by default)"""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=365)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    
+    try:
+        return {
+            "start": start,
+            "end": end,
+            **portfolio_valuation.history(db, current_user.id, start, end)
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get portfolio: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to get portfolio history: {str(e)}")
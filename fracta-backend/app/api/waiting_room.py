@@ -0,0 +1,81 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, validator
+
+from app.database import get_db
+from app.models.property import Property
+from app.models.user import User
+from app.services.waiting_room import waiting_room
+
+router = APIRouter()
+
+# Pydantic models
+class WaitingRoomOpenRequest(BaseModel):
+    capacity: Optional[int] = None
+
+    @validator('capacity')
+    def validate_capacity(cls, v):
+        if v is not None and v < 1:
+            raise ValueError('Capacity must be at least 1')
+        return v
+
+class TicketResponse(BaseModel):
+    ticket: str
+    property_id: int
+    status: str
+    position: Optional[int] = None
+    eta_seconds: Optional[int] = None
+    pass_expires_at: Optional[float] = None
+
+# API endpoints
+@router.post("/{property_id}/join", response_model=TicketResponse)
+async def join_waiting_room(property_id: int, response: Response):
+    # For testing, use a mock user
+    current_user = User(
+        id=1,
+        wallet_address="0x1234567890123456789012345678901234567890",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TEST123"
+    )
+    """Take a ticket in the property's sale queue"""
+
+    response.headers["Cache-Control"] = "no-store"
+    return await waiting_room.join(property_id, current_user.id)
+
+@router.get("/{property_id}/tickets/{ticket}", response_model=TicketResponse)
+async def get_ticket_status(property_id: int, ticket: str, response: Response):
+    """Poll queue position and ETA; served without touching the database"""
+
+    response.headers["Cache-Control"] = "no-store"
+    return await waiting_room.ticket_status(property_id, ticket)
+
+@router.get("/{property_id}")
+async def get_waiting_room(property_id: int):
+    """Queue length and admission counters for a property"""
+    return await waiting_room.stats(property_id)
+
+@router.post("/{property_id}/open")
+async def open_waiting_room(
+    property_id: int,
+    request: WaitingRoomOpenRequest,
+    db: Session = Depends(get_db)
+):
+    """Put the property's purchase paths behind the waiting room (admin only)"""
+
+    property = db.query(Property.id).filter(Property.id == property_id).first()
+    if not property:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Property not found"
+        )
+
+    await waiting_room.open(property_id, request.capacity)
+    return await waiting_room.stats(property_id)
+
+@router.post("/{property_id}/close")
+async def close_waiting_room(property_id: int):
+    """Remove the waiting room; purchases are no longer gated (admin only)"""
+    await waiting_room.close(property_id)
+    return {"success": True, "property_id": property_id, "status": "closed"}
@@ -4,6 +4,8 @@ from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+from app.migrations import run_migrations
+
 load_dotenv()
 
 # Database URL from environment
@@ -28,5 +30,6 @@ def get_db():
         db.close()
 
 def create_database():
-    """Create all database tables"""
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    """Create all database tables and apply pending migrations"""
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine) 
\ No newline at end of file
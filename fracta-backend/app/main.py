@@ -3,9 +3,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
-from app.api import auth, properties, kyc, transactions
+from app.api import auth, properties, kyc, transactions, waiting_room, dividends, ledger
 from app.database import create_database
 from app.services.blockchain import blockchain_service
+from app.services.compliance_mirror import compliance_mirror
+from app.services.holder_snapshots import holder_indexer
+from app.services.order_book import convert_legacy_listings, order_book_service
+from app.services.portfolio_valuation import portfolio_snapshotter
+from app.services.property_facets import property_facets_service
+from app.services.token_reservations import reservation_sweeper
 
 load_dotenv()
 
@@ -41,6 +47,9 @@ app.include_router(auth.router, prefix=f"{API_V1_STR}/auth", tags=["authenticati
 app.include_router(properties.router, prefix=f"{API_V1_STR}/properties", tags=["properties"])
 app.include_router(kyc.router, prefix=f"{API_V1_STR}/kyc", tags=["kyc"])
 app.include_router(transactions.router, prefix=f"{API_V1_STR}/transactions", tags=["transactions"])
+app.include_router(waiting_room.router, prefix=f"{API_V1_STR}/waiting-room", tags=["waiting-room"])
+app.include_router(dividends.router, prefix=f"{API_V1_STR}/dividends", tags=["dividends"])
+app.include_router(ledger.router, prefix=f"{API_V1_STR}/ledger", tags=["ledger"])
 
 @app.get("/")
 async def root():
@@ -80,6 +89,13 @@ async def health_check():
 @app.on_event("startup")
 async def startup_event():
     create_database()
+    property_facets_service.ensure_view()
+    order_book_service.open()
+    convert_legacy_listings()
+    reservation_sweeper.start()
+    portfolio_snapshotter.start()
+    holder_indexer.start()
+    compliance_mirror.start()
     print("✅ Fracta.city Backend started successfully!")
     print(f"📊 Database: {os.getenv('DATABASE_URL', 'Not configured')[:50]}...")
     
@@ -98,6 +114,15 @@ async def startup_event():
     print(f"🌐 Frontend CORS: {os.getenv('FRONTEND_URL', 'http://localhost:3000')}")
     print("🚀 Backend ready for Phase 4 integration!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await reservation_sweeper.stop()
+    await portfolio_snapshotter.stop()
+    await holder_indexer.stop()
+    await compliance_mirror.stop()
+    order_book_service.close()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True) 
\ No newline at end of file
+    # One worker only: the order books live in this process and it holds the order log lock
+    uvicorn.run(app, host="0.0.0.0", port=8000, reload=True, workers=1) 
\ No newline at end of file
@@ -0,0 +1,256 @@
+import os
+import logging
+from typing import Sequence, Tuple, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for the advisory lock that serializes startup migrations across workers
+MIGRATION_LOCK_KEY = 7_221_001
+
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+
+
+class Batched:
+    """A backfill statement repeated in short transactions of its own until it touches no rows
+
+    The statement must limit itself to ``:batch_size`` rows that still need
+    work, so each pass holds row locks briefly and an interrupted backfill
+    resumes where it stopped.
+    """
+
+    def __init__(self, statement: str, batch_size: int = BACKFILL_BATCH_SIZE):
+        self.statement = statement
+        self.batch_size = batch_size
+
+
+# Schema changes for tables that already exist; create_all() only creates missing tables.
+# Each entry runs once, in order. Plain statements run in a single transaction;
+# a Batched step commits the work before it and then runs batch by batch.
+MIGRATIONS: Sequence[Tuple[str, Sequence[Union[str, Batched]]]] = (
+    ("0001_token_allocation", (
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS tokens_minted INTEGER NOT NULL DEFAULT 0",
+        # Renumber duplicates left by the old read-then-insert minting so the unique index can be built
+        """
+        WITH ranked AS (
+            SELECT id, property_id,
+                   row_number() OVER (PARTITION BY property_id, token_number ORDER BY id) AS copy_number
+            FROM tokens
+        ),
+        moved AS (
+            SELECT r.id,
+                   m.max_number + row_number() OVER (PARTITION BY r.property_id ORDER BY r.id) AS new_number
+            FROM ranked r
+            JOIN (SELECT property_id, max(token_number) AS max_number FROM tokens GROUP BY property_id) m
+              ON m.property_id = r.property_id
+            WHERE r.copy_number > 1
+        )
+        UPDATE tokens t SET token_number = moved.new_number FROM moved WHERE t.id = moved.id
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_tokens_property_token_number ON tokens (property_id, token_number)",
+        """
+        UPDATE properties p SET tokens_minted = t.max_number
+        FROM (SELECT property_id, max(token_number) AS max_number FROM tokens GROUP BY property_id) t
+        WHERE p.id = t.property_id
+        """,
+    )),
+    ("0002_token_ranges", (
+        # Collapse per-token rows into runs of consecutive numbers per owner (gaps and islands)
+        """
+        INSERT INTO token_ranges (property_id, owner_id, start_number, end_number)
+        SELECT property_id, owner_id, min(token_number), max(token_number)
+        FROM (
+            SELECT property_id, owner_id, token_number,
+                   token_number - row_number() OVER (PARTITION BY property_id, owner_id ORDER BY token_number) AS island
+            FROM tokens
+        ) numbered
+        GROUP BY property_id, owner_id, island
+        """,
+    )),
+    ("0003_token_reservations", (
+        "ALTER TABLE properties ADD COLUMN IF NOT EXISTS tokens_reserved INTEGER NOT NULL DEFAULT 0",
+    )),
+    ("0004_investment_history_index", (
+        "CREATE INDEX IF NOT EXISTS ix_investments_user_created ON investments (user_id, created_at, id)",
+    )),
+    ("0005_portfolio_rollups", (
+        # Seed the rollups from existing investments; purchases keep them current from here on
+        """
+        INSERT INTO portfolio_positions (user_id, property_id, tokens_purchased, total_invested, investment_count, updated_at)
+        SELECT user_id, property_id, sum(tokens_purchased), sum(total_amount::numeric), count(*), now()
+        FROM investments
+        GROUP BY user_id, property_id
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        INSERT INTO portfolio_summaries (user_id, total_invested, total_tokens, properties_count, investment_count, updated_at)
+        SELECT user_id, sum(total_invested), sum(tokens_purchased), count(*), sum(investment_count), now()
+        FROM portfolio_positions
+        GROUP BY user_id
+        ON CONFLICT DO NOTHING
+        """,
+    )),
+    ("0006_investment_money_numeric", (
+        # Exact copies of the text money columns, kept in sync for rows written while the backfill runs
+        """
+        ALTER TABLE investments
+            ADD COLUMN IF NOT EXISTS token_price_numeric NUMERIC(10, 2),
+            ADD COLUMN IF NOT EXISTS total_amount_numeric NUMERIC(20, 2)
+        """,
+        """
+        CREATE OR REPLACE FUNCTION investments_money_sync() RETURNS trigger AS $$
+        BEGIN
+            NEW.token_price_numeric := NEW.token_price_at_purchase::numeric;
+            NEW.total_amount_numeric := NEW.total_amount::numeric;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS investments_money_sync ON investments",
+        """
+        CREATE TRIGGER investments_money_sync BEFORE INSERT OR UPDATE OF token_price_at_purchase, total_amount
+        ON investments FOR EACH ROW EXECUTE FUNCTION investments_money_sync()
+        """,
+        Batched("""
+        UPDATE investments
+        SET token_price_numeric = token_price_at_purchase::numeric,
+            total_amount_numeric = total_amount::numeric
+        WHERE id IN (
+            SELECT id FROM investments WHERE total_amount_numeric IS NULL ORDER BY id LIMIT :batch_size
+        )
+        """),
+        # Swap the columns in one short transaction. Fresh databases already have
+        # numeric columns from create_all(); replacing them leaves the same schema.
+        "DROP TRIGGER investments_money_sync ON investments",
+        "DROP FUNCTION investments_money_sync()",
+        """
+        UPDATE investments
+        SET token_price_numeric = token_price_at_purchase::numeric,
+            total_amount_numeric = total_amount::numeric
+        WHERE total_amount_numeric IS NULL
+        """,
+        "ALTER TABLE investments DROP COLUMN token_price_at_purchase, DROP COLUMN total_amount",
+        "ALTER TABLE investments RENAME COLUMN token_price_numeric TO token_price_at_purchase",
+        "ALTER TABLE investments RENAME COLUMN total_amount_numeric TO total_amount",
+        """
+        ALTER TABLE investments
+            ALTER COLUMN token_price_at_purchase SET NOT NULL,
+            ALTER COLUMN total_amount SET NOT NULL
+        """,
+    )),
+    ("0007_user_cash_balance", (
+        "ALTER TABLE users ADD COLUMN IF NOT EXISTS cash_balance NUMERIC(20, 2) NOT NULL DEFAULT 0",
+    )),
+    ("0008_listings_to_order_book", (
+        # Listings are order book asks now. Each owner's listed tokens become one pending sell
+        # order per price (placed when the order book opens, see convert_legacy_listings)
+        """
+        INSERT INTO legacy_listings (property_id, owner_id, price, quantity, listed_at)
+        SELECT property_id, owner_id, current_price, count(*), min(listed_at)
+        FROM tokens
+        WHERE is_for_sale AND current_price > 0
+        GROUP BY property_id, owner_id, current_price
+        """,
+        "UPDATE tokens SET is_for_sale = false, current_price = NULL, listed_at = NULL WHERE is_for_sale",
+    )),
+    ("0009_portfolio_opening_balances", (
+        # Rollups only followed investments until now. Record the gap to the tokens each user
+        # actually holds (mints, transfers) as an opening balance at the property's token price,
+        # or at average cost where they hold fewer tokens than they bought, and roll it in
+        """
+        WITH held AS (
+            SELECT property_id, owner_id AS user_id, sum(end_number - start_number + 1) AS tokens
+            FROM token_ranges
+            GROUP BY property_id, owner_id
+        ),
+        invested AS (
+            SELECT property_id, user_id, sum(tokens_purchased) AS tokens, sum(total_amount) AS amount
+            FROM investments
+            GROUP BY property_id, user_id
+        ),
+        opening AS (
+            INSERT INTO token_transfers (property_id, from_user_id, to_user_id, quantity, cost_basis)
+            SELECT property_id, NULL, user_id,
+                   coalesce(held.tokens, 0) - coalesce(invested.tokens, 0),
+                   CASE WHEN coalesce(held.tokens, 0) > coalesce(invested.tokens, 0)
+                        THEN (coalesce(held.tokens, 0) - coalesce(invested.tokens, 0)) * p.token_price
+                        ELSE round(invested.amount * (coalesce(held.tokens, 0) - invested.tokens) / invested.tokens, 2) END
+            FROM held
+            FULL JOIN invested USING (property_id, user_id)
+            JOIN properties p ON p.id = property_id
+            WHERE coalesce(held.tokens, 0) <> coalesce(invested.tokens, 0)
+            RETURNING property_id, to_user_id, quantity, cost_basis
+        )
+        INSERT INTO portfolio_positions AS pp (user_id, property_id, tokens_purchased, total_invested, investment_count, updated_at)
+        SELECT to_user_id, property_id, quantity, cost_basis, 0, now()
+        FROM opening
+        ON CONFLICT (user_id, property_id) DO UPDATE SET
+            tokens_purchased = pp.tokens_purchased + excluded.tokens_purchased,
+            total_invested = pp.total_invested + excluded.total_invested,
+            updated_at = now()
+        """,
+        """
+        INSERT INTO portfolio_summaries AS ps (user_id, total_invested, total_tokens, properties_count, investment_count, updated_at)
+        SELECT user_id, sum(total_invested), sum(tokens_purchased), count(*) FILTER (WHERE tokens_purchased > 0),
+               sum(investment_count), now()
+        FROM portfolio_positions
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_invested = excluded.total_invested,
+            total_tokens = excluded.total_tokens,
+            properties_count = excluded.properties_count,
+            investment_count = excluded.investment_count,
+            updated_at = now()
+        """,
+    )),
+)
+
+
+def _run_batched(conn, step: Batched) -> int:
+    total = 0
+    while True:
+        with conn.begin():
+            updated = conn.execute(text(step.statement), {"batch_size": step.batch_size}).rowcount
+        total += updated
+        if not updated:
+            return total
+
+
+def run_migrations(engine: Engine):
+    """Apply pending migrations"""
+    with engine.connect() as conn:
+        # Session-level lock, since batched backfills commit along the way
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        conn.commit()
+        try:
+            with conn.begin():
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        name VARCHAR(100) PRIMARY KEY,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """))
+                applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+            for name, steps in MIGRATIONS:
+                if name in applied:
+                    continue
+                transaction = conn.begin()
+                for step in steps:
+                    if isinstance(step, Batched):
+                        transaction.commit()
+                        rows = _run_batched(conn, step)
+                        logger.info(f"Backfilled {rows} rows for migration {name}")
+                        transaction = conn.begin()
+                    else:
+                        conn.execute(text(step))
+                conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+                transaction.commit()
+                logger.info(f"Applied migration {name}")
+        finally:
+            if conn.in_transaction():
+                conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            conn.commit()
@@ -0,0 +1,59 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Numeric, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+# Wei amounts are uint256 on chain
+WEI = Numeric(78, 0)
+
+class DividendDistribution(Base):
+    __tablename__ = "dividend_distributions"
+    __table_args__ = (
+        Index("ix_dividend_distributions_property", "property_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+
+    # Amounts in wei, mirroring PropertyToken.distributeDividends
+    amount = Column(WEI, nullable=False)
+    tokens_sold = Column(BigInteger, nullable=False)
+    cumulative_amount = Column(WEI, nullable=False)  # totalDividendsDistributed after this distribution
+    dividend_per_token = Column(WEI, nullable=False)  # cumulative_amount / tokens_sold, rounded down as on chain
+    distributed_amount = Column(WEI, nullable=False)  # Sum of the entitlements; the rest is rounding dust
+    holder_count = Column(Integer, nullable=False)
+
+    # Blockchain Information
+    transaction_hash = Column(String(66), nullable=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DividendDistribution(id={self.id}, property_id={self.property_id}, amount={self.amount})>"
+
+class DividendEntitlement(Base):
+    __tablename__ = "dividend_entitlements"
+
+    # What one holder earned from one distribution
+    distribution_id = Column(Integer, ForeignKey("dividend_distributions.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    tokens = Column(BigInteger, nullable=False)
+    amount = Column(WEI, nullable=False)
+
+    def __repr__(self):
+        return f"<DividendEntitlement(distribution_id={self.distribution_id}, user_id={self.user_id}, amount={self.amount})>"
+
+class DividendAccount(Base):
+    __tablename__ = "dividend_accounts"
+
+    # Running totals per holder and property; claimable is earned - claimed
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    earned = Column(WEI, nullable=False, default=0)
+    claimed = Column(WEI, nullable=False, default=0)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DividendAccount(user_id={self.user_id}, property_id={self.property_id}, earned={self.earned}, claimed={self.claimed})>"
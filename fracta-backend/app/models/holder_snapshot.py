@@ -0,0 +1,68 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Numeric, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+# ERC-20 amounts are uint256 on chain
+TOKEN_AMOUNT = Numeric(78, 0)
+
+class HolderIndexState(Base):
+    __tablename__ = "holder_index_state"
+
+    # How far a property's token contract events have been indexed
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    contract_address = Column(String(42), nullable=False)
+    last_block = Column(BigInteger, nullable=False)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<HolderIndexState(property_id={self.property_id}, last_block={self.last_block})>"
+
+class BalanceCheckpoint(Base):
+    __tablename__ = "balance_checkpoints"
+
+    # A holder's balance at the end of a block in which it changed
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    holder = Column(String(42), primary_key=True)  # Lowercase address
+    block_number = Column(BigInteger, primary_key=True)
+    balance = Column(TOKEN_AMOUNT, nullable=False)
+
+    def __repr__(self):
+        return f"<BalanceCheckpoint(property_id={self.property_id}, holder={self.holder}, block={self.block_number}, balance={self.balance})>"
+
+class SupplyCheckpoint(Base):
+    __tablename__ = "supply_checkpoints"
+
+    # Tokens issued to investors (PropertyTokensIssued) up to the end of a block
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    block_number = Column(BigInteger, primary_key=True)
+    tokens_issued = Column(TOKEN_AMOUNT, nullable=False)
+
+    def __repr__(self):
+        return f"<SupplyCheckpoint(property_id={self.property_id}, block={self.block_number}, tokens_issued={self.tokens_issued})>"
+
+class SnapshotBlock(Base):
+    __tablename__ = "snapshot_blocks"
+
+    # Cap-table queries per block; blocks asked for often get a materialized snapshot
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    block_number = Column(BigInteger, primary_key=True)
+    query_count = Column(Integer, nullable=False, default=0)
+    holder_count = Column(Integer, nullable=True)
+    materialized_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<SnapshotBlock(property_id={self.property_id}, block={self.block_number}, queries={self.query_count})>"
+
+class HolderSnapshot(Base):
+    __tablename__ = "holder_snapshots"
+
+    # Full cap table of a property at a block
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+    block_number = Column(BigInteger, primary_key=True)
+    holder = Column(String(42), primary_key=True)
+    balance = Column(TOKEN_AMOUNT, nullable=False)
+
+    def __repr__(self):
+        return f"<HolderSnapshot(property_id={self.property_id}, block={self.block_number}, holder={self.holder})>"
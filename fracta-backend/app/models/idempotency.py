@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy.sql import func
+from app.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # SHA-256 of scope, user and client key; the raw key is never stored
+    key_hash = Column(LargeBinary(32), primary_key=True)
+    request_hash = Column(LargeBinary(32), nullable=False)  # SHA-256 of the request body
+    
+    # Status
+    status = Column(String(20), nullable=False, default="processing")  # processing, completed
+    locked_until = Column(DateTime(timezone=True), nullable=False)  # Processing claims can be taken over after this
+    
+    # Stored Response
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(LargeBinary, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<IdempotencyKey(key_hash={self.key_hash.hex()[:12]}, status={self.status})>"
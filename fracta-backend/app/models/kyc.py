@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, JSON, ForeignKey
-from sqlalchemy.sql import func
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Numeric, Text, JSON, ForeignKey, UniqueConstraint, CheckConstraint, Index
+from sqlalchemy.sql import func, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -108,8 +108,8 @@ class Investment(Base):
     
     # Investment Details
     tokens_purchased = Column(Integer, nullable=False)
-    token_price_at_purchase = Column(Text, nullable=False)  # Price per token at time of purchase
-    total_amount = Column(Text, nullable=False)  # Total investment amount
+    token_price_at_purchase = Column(Numeric(10, 2), nullable=False)  # Price per token at time of purchase
+    total_amount = Column(Numeric(20, 2), nullable=False)  # Total investment amount
     
     # Blockchain Transaction
     transaction_hash = Column(String(66), nullable=True)  # Blockchain tx hash
@@ -128,11 +128,49 @@ class Investment(Base):
     user = relationship("User", back_populates="investments")
     property = relationship("Property", back_populates="investments")
     
+    __table_args__ = (
+        # Keyset pagination of a user's history (newest first)
+        Index("ix_investments_user_created", "user_id", "created_at", "id"),
+    )
+    
     def __repr__(self):
         return f"<Investment(user_id={self.user_id}, property_id={self.property_id}, tokens={self.tokens_purchased})>" 
 
+class TokenReservation(Base):
+    __tablename__ = "token_reservations"
+    __table_args__ = (
+        Index("ix_token_reservations_held_expiry", "expires_at", postgresql_where=text("status = 'held'")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    reference = Column(String(36), unique=True, index=True, nullable=False)  # Public id (UUID)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    
+    # Hold Details
+    quantity = Column(Integer, nullable=False)
+    price_per_token = Column(Numeric(10, 2), nullable=False)  # Price locked at reservation time
+    
+    # Status
+    status = Column(String(20), default="held")  # held, confirmed, released, expired
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    investment_id = Column(Integer, ForeignKey("investments.id"), nullable=True)
+    transaction_hash = Column(String(66), nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    confirmed_at = Column(DateTime(timezone=True), nullable=True)
+    released_at = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<TokenReservation(reference={self.reference}, quantity={self.quantity}, status={self.status})>"
+
 class Token(Base):
     __tablename__ = "tokens"
+    # Per-token listing rows from before listings moved to the order book; kept for history, no longer written
+    __table_args__ = (
+        UniqueConstraint("property_id", "token_number", name="uq_tokens_property_token_number"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     token_number = Column(Integer, nullable=False)  # Token #1, #2, etc.
@@ -158,4 +196,112 @@ class Token(Base):
     def get_price_change_percentage(self):
         if not self.current_price or not self.mint_price:
             return 0
-        return ((self.current_price - self.mint_price) / self.mint_price) * 100 
\ No newline at end of file
+        return ((self.current_price - self.mint_price) / self.mint_price) * 100 
+
+class TokenRange(Base):
+    __tablename__ = "token_ranges"
+    __table_args__ = (
+        UniqueConstraint("property_id", "start_number", name="uq_token_ranges_property_start"),
+        CheckConstraint("start_number <= end_number", name="ck_token_ranges_bounds"),
+        Index("ix_token_ranges_owner_property", "owner_id", "property_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Contiguous run of token numbers held by the owner (inclusive bounds)
+    start_number = Column(Integer, nullable=False)
+    end_number = Column(Integer, nullable=False)
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<TokenRange(property_id={self.property_id}, owner_id={self.owner_id}, {self.start_number}-{self.end_number})>"
+    
+    @property
+    def token_count(self):
+        return self.end_number - self.start_number + 1
+
+class LegacyListing(Base):
+    __tablename__ = "legacy_listings"
+    # Per-token listings awaiting conversion to sell orders; each row is deleted once its order is placed
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    price = Column(Numeric(10, 2), nullable=False)  # Per-token asking price
+    quantity = Column(Integer, nullable=False)
+    listed_at = Column(DateTime(timezone=True), nullable=True)  # Earliest listing of the group, for time priority
+    
+    def __repr__(self):
+        return f"<LegacyListing(property_id={self.property_id}, owner_id={self.owner_id}, {self.quantity} @ {self.price})>"
+
+class TokenTransfer(Base):
+    __tablename__ = "token_transfers"
+    # Token movements outside purchases (mints and transfers), carrying cost basis into portfolio rollups
+    __table_args__ = (
+        Index("ix_token_transfers_from_user", "from_user_id", "property_id"),
+        Index("ix_token_transfers_to_user", "to_user_id", "property_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    from_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL for a mint or an opening balance
+    to_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Movement
+    quantity = Column(Integer, nullable=False)  # Negative only for an opening balance below recorded purchases
+    cost_basis = Column(Numeric(20, 2), nullable=False)  # Mint price, or the sender's average cost
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<TokenTransfer(property_id={self.property_id}, {self.from_user_id} -> {self.to_user_id}, quantity={self.quantity})>"
+
+class OrderFill(Base):
+    __tablename__ = "order_fills"
+    # A settled order book trade; the seller's side of the sale (the buyer's is an Investment)
+    __table_args__ = (
+        Index("ix_order_fills_seller", "seller_id", "property_id"),
+        Index("ix_order_fills_buyer", "buyer_id", "property_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    buy_order_id = Column(Integer, nullable=False)  # Order ids live in the order log, not the database
+    sell_order_id = Column(Integer, nullable=False)
+    buyer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    seller_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    
+    # Fill Details
+    quantity = Column(Integer, nullable=False)
+    price = Column(Numeric(10, 2), nullable=False)  # Per-token trade price
+    seller_cost_basis = Column(Numeric(20, 2), nullable=False)  # Cost the sold tokens leave the seller's position at
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<OrderFill(property_id={self.property_id}, {self.seller_id} -> {self.buyer_id}, {self.quantity} @ {self.price})>"
+
+class CashDeposit(Base):
+    __tablename__ = "cash_deposits"
+    # Money credited to a user's cash balance, which settles order book trades
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    
+    # Deposit Details
+    amount = Column(Numeric(20, 2), nullable=False)
+    payment_method = Column(String(30), nullable=True)  # crypto, bank_transfer, etc.
+    reference = Column(String(100), nullable=True)  # Payment provider or on-chain reference
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<CashDeposit(user_id={self.user_id}, amount={self.amount})>"
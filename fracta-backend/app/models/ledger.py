@@ -0,0 +1,85 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey, Index, UniqueConstraint, text
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LedgerAccount(Base):
+    __tablename__ = "ledger_accounts"
+    __table_args__ = (
+        # One account per property and kind, and per holder for holder accounts
+        Index("uq_ledger_accounts_owner", "property_id", "kind", text("coalesce(user_id, 0)"), unique=True),
+        Index("ix_ledger_accounts_user", "user_id", postgresql_where=text("user_id IS NOT NULL")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # cash, rental_income, expenses, distributions, holder_payable
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Set for holder_payable
+
+    # Running totals, kept current by every posting
+    balance = Column(BigInteger, nullable=False, default=0)  # Cents, debits minus credits
+    entry_count = Column(BigInteger, nullable=False, default=0)  # Sequence of the latest entry
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<LedgerAccount(id={self.id}, property_id={self.property_id}, kind={self.kind}, balance={self.balance})>"
+
+class LedgerTransaction(Base):
+    __tablename__ = "ledger_transactions"
+    __table_args__ = (
+        Index("ix_ledger_transactions_property", "property_id", "id"),
+    )
+
+    # A balanced journal entry: its postings sum to zero
+    id = Column(BigInteger, primary_key=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # rent, expense, distribution, payout
+    description = Column(String(255), nullable=True)
+    reference = Column(String(100), nullable=True)  # Invoice, bank or transaction reference
+    period = Column(Date, nullable=False)  # First day of the posting month
+
+    # Timestamps
+    posted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<LedgerTransaction(id={self.id}, property_id={self.property_id}, kind={self.kind})>"
+
+class LedgerEntry(Base):
+    __tablename__ = "ledger_entries"
+    __table_args__ = (
+        UniqueConstraint("account_id", "sequence", name="uq_ledger_entries_account_sequence"),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    transaction_id = Column(BigInteger, ForeignKey("ledger_transactions.id"), nullable=False, index=True)
+    account_id = Column(Integer, ForeignKey("ledger_accounts.id"), nullable=False)
+    sequence = Column(BigInteger, nullable=False)  # 1, 2, ... within the account
+
+    amount = Column(BigInteger, nullable=False)  # Cents; debits positive, credits negative
+    balance_after = Column(BigInteger, nullable=False)  # Account balance including this entry
+    period = Column(Date, nullable=False)
+
+    def __repr__(self):
+        return f"<LedgerEntry(account_id={self.account_id}, sequence={self.sequence}, amount={self.amount})>"
+
+class LedgerCheckpoint(Base):
+    __tablename__ = "ledger_checkpoints"
+
+    # An account's totals for one month, updated as entries are posted
+    account_id = Column(Integer, ForeignKey("ledger_accounts.id"), primary_key=True)
+    period = Column(Date, primary_key=True)
+
+    opening_balance = Column(BigInteger, nullable=False)
+    debits = Column(BigInteger, nullable=False)
+    credits = Column(BigInteger, nullable=False)
+    closing_balance = Column(BigInteger, nullable=False)
+    first_sequence = Column(BigInteger, nullable=False)
+    last_sequence = Column(BigInteger, nullable=False)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<LedgerCheckpoint(account_id={self.account_id}, period={self.period}, closing={self.closing_balance})>"
@@ -0,0 +1,57 @@
+from sqlalchemy import Column, Integer, BigInteger, Date, DateTime, Float, Numeric, ForeignKey
+from sqlalchemy.sql import func
+from app.database import Base
+
+class PortfolioPosition(Base):
+    __tablename__ = "portfolio_positions"
+
+    # Rollup of a user's tokens and their cost in one property, maintained with each purchase, mint and transfer
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), primary_key=True)
+
+    # Totals
+    tokens_purchased = Column(BigInteger, nullable=False, default=0)
+    total_invested = Column(Numeric, nullable=False, default=0)
+    investment_count = Column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<PortfolioPosition(user_id={self.user_id}, property_id={self.property_id}, tokens={self.tokens_purchased})>"
+
+class PortfolioSummary(Base):
+    __tablename__ = "portfolio_summaries"
+
+    # Rollup of all of a user's positions; the portfolio endpoint reads this row
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # Totals
+    total_invested = Column(Numeric, nullable=False, default=0)
+    total_tokens = Column(BigInteger, nullable=False, default=0)
+    properties_count = Column(Integer, nullable=False, default=0)
+    investment_count = Column(Integer, nullable=False, default=0)
+
+    # Timestamps
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<PortfolioSummary(user_id={self.user_id}, total_invested={self.total_invested})>"
+
+class PortfolioSnapshot(Base):
+    __tablename__ = "portfolio_snapshots"
+
+    # One narrow row per user per day; money in integer cents so a chart is a range read of the primary key
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    snapshot_date = Column(Date, primary_key=True)
+
+    # Valuation
+    total_tokens = Column(BigInteger, nullable=False)
+    invested_cents = Column(BigInteger, nullable=False)
+    value_cents = Column(BigInteger, nullable=False)
+    # Income keeps fractional cents so small holdings still accrue day by day
+    accrued_yield_cents = Column(Float, nullable=False)  # Accrued since the user's first snapshot
+    daily_income_cents = Column(Float, nullable=False)  # Income rate of the holdings on this day
+
+    def __repr__(self):
+        return f"<PortfolioSnapshot(user_id={self.user_id}, date={self.snapshot_date}, value_cents={self.value_cents})>"
@@ -22,6 +22,8 @@ class Property(Base):
     token_price = Column(Numeric(10, 2), nullable=False)  # Price per token
     total_tokens = Column(Integer, nullable=False)  # Total tokens available
     tokens_sold = Column(Integer, default=0)  # Tokens already sold
+    tokens_minted = Column(Integer, nullable=False, default=0, server_default="0")  # Highest token number allocated
+    tokens_reserved = Column(Integer, nullable=False, default=0, server_default="0")  # Held by open reservations
     expected_yield = Column(Numeric(5, 2), nullable=False)  # Expected annual yield %
     
     # Property Details
@@ -29,6 +29,7 @@ class User(Base):
     # Portfolio Information
     total_invested = Column(Numeric(20, 2), default=0)
     portfolio_value = Column(Numeric(20, 2), default=0)
+    cash_balance = Column(Numeric(20, 2), nullable=False, default=0, server_default="0")  # Settles secondary-market trades
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
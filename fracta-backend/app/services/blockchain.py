@@ -19,9 +19,11 @@ class BlockchainService:
         self.compliance_manager_address = os.getenv("COMPLIANCE_MANAGER_ADDRESS")
         self.duna_studio_token_address = os.getenv("DUNA_STUDIO_TOKEN_ADDRESS")
         self.chain_id = int(os.getenv("CHAIN_ID", "84532"))
+        # Seconds per RPC; bounds the thread a hung node holds, so it defaults to the feed's fetch timeout
+        self.request_timeout = float(os.getenv("WEB3_REQUEST_TIMEOUT", os.getenv("CHAIN_FETCH_TIMEOUT", "3")))
         
         # Initialize Web3
-        self.w3 = Web3(Web3.HTTPProvider(self.web3_provider_url))
+        self.w3 = Web3(Web3.HTTPProvider(self.web3_provider_url, request_kwargs={"timeout": self.request_timeout}))
         
         if not self.w3.is_connected():
             logger.error(f"Failed to connect to Web3 provider: {self.web3_provider_url}")
@@ -33,6 +35,9 @@ class BlockchainService:
         self.compliance_manager_abi = self._get_compliance_manager_abi()
         self.property_token_abi = self._get_property_token_abi()
         
+        # PropertyToken contract instances by checksum address
+        self._property_contracts = {}
+        
         # Initialize contract instances
         if self.compliance_manager_address:
             self.compliance_manager = self.w3.eth.contract(
@@ -63,6 +68,21 @@ class BlockchainService:
                 "stateMutability": "view",
                 "type": "function"
             },
+            {
+                "inputs": [
+                    {"name": "from", "type": "address"},
+                    {"name": "to", "type": "address"},
+                    {"name": "property", "type": "address"},
+                    {"name": "amount", "type": "uint256"}
+                ],
+                "name": "canTransfer",
+                "outputs": [
+                    {"name": "", "type": "bool"},
+                    {"name": "", "type": "string"}
+                ],
+                "stateMutability": "view",
+                "type": "function"
+            },
             {
                 "inputs": [
                     {"name": "user", "type": "address"}
@@ -85,6 +105,30 @@ class BlockchainService:
                 "stateMutability": "view",
                 "type": "function"
             },
+            {
+                "inputs": [{"name": "user", "type": "address"}],
+                "name": "kycExpiry",
+                "outputs": [{"name": "", "type": "uint256"}],
+                "stateMutability": "view",
+                "type": "function"
+            },
+            {
+                "inputs": [{"name": "jurisdiction", "type": "string"}],
+                "name": "maxInvestmentPerProperty",
+                "outputs": [{"name": "", "type": "uint256"}],
+                "stateMutability": "view",
+                "type": "function"
+            },
+            {
+                "inputs": [
+                    {"name": "user", "type": "address"},
+                    {"name": "property", "type": "address"}
+                ],
+                "name": "userInvestments",
+                "outputs": [{"name": "", "type": "uint256"}],
+                "stateMutability": "view",
+                "type": "function"
+            },
             {
                 "inputs": [
                     {"name": "user", "type": "address"},
@@ -104,6 +148,40 @@ class BlockchainService:
                 "outputs": [],
                 "stateMutability": "nonpayable",
                 "type": "function"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "name": "user", "type": "address"},
+                    {"indexed": False, "name": "jurisdiction", "type": "string"}
+                ],
+                "name": "KYCApproved",
+                "type": "event"
+            },
+            {
+                "anonymous": False,
+                "inputs": [{"indexed": True, "name": "user", "type": "address"}],
+                "name": "KYCRevoked",
+                "type": "event"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "name": "user", "type": "address"},
+                    {"indexed": False, "name": "permitId", "type": "string"}
+                ],
+                "name": "ProspectsPermitRegistered",
+                "type": "event"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "name": "property", "type": "address"},
+                    {"indexed": False, "name": "requiresProspera", "type": "bool"},
+                    {"indexed": False, "name": "allowsInternational", "type": "bool"}
+                ],
+                "name": "PropertyJurisdictionSet",
+                "type": "event"
             }
         ]
     
@@ -182,6 +260,40 @@ class BlockchainService:
                 ],
                 "stateMutability": "view",
                 "type": "function"
+            },
+            {
+                "inputs": [{"name": "_tokenAmount", "type": "uint256"}],
+                "name": "purchaseTokens",
+                "outputs": [],
+                "stateMutability": "payable",
+                "type": "function"
+            },
+            {
+                "inputs": [],
+                "name": "claimDividends",
+                "outputs": [],
+                "stateMutability": "nonpayable",
+                "type": "function"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "name": "from", "type": "address"},
+                    {"indexed": True, "name": "to", "type": "address"},
+                    {"indexed": False, "name": "value", "type": "uint256"}
+                ],
+                "name": "Transfer",
+                "type": "event"
+            },
+            {
+                "anonymous": False,
+                "inputs": [
+                    {"indexed": True, "name": "to", "type": "address"},
+                    {"indexed": False, "name": "amount", "type": "uint256"},
+                    {"indexed": False, "name": "price", "type": "uint256"}
+                ],
+                "name": "PropertyTokensIssued",
+                "type": "event"
             }
         ]
     
@@ -224,6 +336,67 @@ class BlockchainService:
             logger.error(f"Error checking investment eligibility: {e}")
             return False, f"Error: {str(e)}"
     
+    async def check_can_transfer(self, from_address: str, to_address: str, property_address: str, amount: int) -> Tuple[bool, str]:
+        """Check if tokens of a property may move between two wallets"""
+        try:
+            result = self.compliance_manager.functions.canTransfer(
+                self.w3.to_checksum_address(from_address),
+                self.w3.to_checksum_address(to_address),
+                self.w3.to_checksum_address(property_address),
+                amount
+            ).call()
+            
+            return result[0], result[1]
+        except Exception as e:
+            logger.error(f"Error checking transfer eligibility: {e}")
+            return False, f"Error: {str(e)}"
+    
+    def _approved_expiry(self, log) -> int:
+        # KYCApproved carries no expiry; read it from the approveKYC call, or the contract state at that block
+        user = log["args"]["user"]
+        transaction = self.w3.eth.get_transaction(log["transactionHash"])
+        try:
+            function, arguments = self.compliance_manager.decode_function_input(transaction["input"])
+            if function.fn_name == "approveKYC" and arguments["user"].lower() == user.lower():
+                return arguments["expiryTimestamp"]
+        except ValueError:
+            pass  # Sent through another contract, e.g. a multisig
+        return self.compliance_manager.functions.kycExpiry(user).call(block_identifier=log["blockNumber"])
+    
+    def get_compliance_events(self, from_block: int, to_block: int) -> List[Dict]:
+        """ComplianceManager state-changing events in a block range, in chain order (blocking RPC calls)"""
+        contract = self.compliance_manager
+        events = []
+        for event in (
+            contract.events.KYCApproved,
+            contract.events.KYCRevoked,
+            contract.events.ProspectsPermitRegistered,
+            contract.events.PropertyJurisdictionSet
+        ):
+            for log in event.get_logs(from_block=from_block, to_block=to_block):
+                args = dict(log["args"])
+                if log["event"] == "KYCApproved":
+                    args["expiryTimestamp"] = self._approved_expiry(log)
+                events.append({
+                    "event": log["event"],
+                    "block_number": log["blockNumber"],
+                    "log_index": log["logIndex"],
+                    "args": args
+                })
+        events.sort(key=lambda event: (event["block_number"], event["log_index"]))
+        return events
+    
+    def get_max_investment(self, jurisdiction: str, block_identifier="latest") -> int:
+        """maxInvestmentPerProperty for a jurisdiction; 0 is no limit (blocking RPC call)"""
+        return self.compliance_manager.functions.maxInvestmentPerProperty(jurisdiction).call(block_identifier=block_identifier)
+    
+    def get_user_investment(self, wallet_address: str, property_address: str) -> int:
+        """userInvestments: the amount recorded against a user for a property (blocking RPC call)"""
+        return self.compliance_manager.functions.userInvestments(
+            self.w3.to_checksum_address(wallet_address),
+            self.w3.to_checksum_address(property_address)
+        ).call()
+    
     # PropertyToken functions
     async def get_duna_studio_property(self) -> Dict:
         """Get Duna Studio property information from contract"""
@@ -281,6 +454,85 @@ class BlockchainService:
                 "saleEndTime": 0
             }
     
+    def get_property_contract(self, contract_address: str):
+        """Get a (cached) PropertyToken contract instance"""
+        address = self.w3.to_checksum_address(contract_address)
+        contract = self._property_contracts.get(address)
+        if contract is None:
+            contract = self.w3.eth.contract(address=address, abi=self.property_token_abi)
+            self._property_contracts[address] = contract
+        return contract
+    
+    def get_balance_of(self, contract_address: str, wallet_address: str, block_identifier="latest") -> int:
+        """PropertyToken balanceOf a wallet (blocking RPC call)"""
+        return self.get_property_contract(contract_address).functions.balanceOf(
+            self.w3.to_checksum_address(wallet_address)
+        ).call(block_identifier=block_identifier)
+    
+    def get_property_sale_info(self, contract_address: str) -> Dict:
+        """Get sale state for any PropertyToken contract (blocking RPC call)"""
+        sale_info = self.get_property_contract(contract_address).functions.getSaleInfo().call()
+        
+        return {
+            "tokenPrice": sale_info[0] // 10**18,  # Contract's decimal format to USD
+            "tokensSold": sale_info[1],
+            "tokensRemaining": sale_info[2],
+            "saleStartTime": sale_info[3],
+            "saleEndTime": sale_info[4],
+            "saleActive": sale_info[5]
+        }
+    
+    def get_sale_terms(self, contract_address: str) -> Dict:
+        """getSaleInfo in the contract's own units (price in wei) for building purchases (blocking RPC call)"""
+        sale_info = self.get_property_contract(contract_address).functions.getSaleInfo().call()
+        
+        return {
+            "token_price_wei": sale_info[0],
+            "tokens_remaining": sale_info[2],
+            "sale_start_time": sale_info[3],
+            "sale_end_time": sale_info[4],
+            "sale_active": sale_info[5]
+        }
+    
+    def get_fee_data(self) -> Dict:
+        """Latest block's base fee plus the node's suggested priority fee (blocking RPC calls)"""
+        block = self.w3.eth.get_block('latest')
+        
+        return {
+            "block_number": block["number"],
+            "timestamp": block["timestamp"],
+            "base_fee": block.get("baseFeePerGas", 0),
+            "priority_fee": self.w3.eth.max_priority_fee
+        }
+    
+    def encode_property_call(self, contract_address: str, function_name: str, args: List) -> str:
+        """Calldata for a PropertyToken function"""
+        return self.get_property_contract(contract_address).encode_abi(function_name, args=args)
+    
+    def estimate_gas(self, transaction: Dict) -> int:
+        """eth_estimateGas at the latest block (blocking RPC call); reverts raise ContractLogicError"""
+        return self.w3.eth.estimate_gas(transaction)
+    
+    def get_block_number(self) -> int:
+        """Latest block number (blocking RPC call)"""
+        return self.w3.eth.block_number
+    
+    def get_property_token_events(self, contract_address: str, from_block: int, to_block: int) -> List[Dict]:
+        """Transfer and PropertyTokensIssued events in a block range, in chain order (blocking RPC calls)"""
+        contract = self.get_property_contract(contract_address)
+        events = [
+            {
+                "event": log["event"],
+                "block_number": log["blockNumber"],
+                "log_index": log["logIndex"],
+                "args": dict(log["args"])
+            }
+            for event in (contract.events.Transfer, contract.events.PropertyTokensIssued)
+            for log in event.get_logs(from_block=from_block, to_block=to_block)
+        ]
+        events.sort(key=lambda event: (event["block_number"], event["log_index"]))
+        return events
+    
     async def get_user_token_balance(self, wallet_address: str, token_address: Optional[str] = None) -> int:
         """Get user's token balance for a property"""
         try:
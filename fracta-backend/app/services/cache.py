@@ -0,0 +1,223 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Cache tags shared by the read endpoints and the write paths that invalidate them
+PROPERTY_LIST_TAG = "properties"
+
+
+def property_tag(property_id: int) -> str:
+    return f"property:{property_id}"
+
+
+def property_tags(property_id: int) -> List[str]:
+    """Tags to invalidate when a single property changes"""
+    return [PROPERTY_LIST_TAG, property_tag(property_id)]
+
+
+def render_json(content: Any) -> bytes:
+    """Render content the same way ORJSONResponse does"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Stores an entry only if none of its tags were invalidated while it was loading
+_STORE_IF_CURRENT = """
+for i = 2, #KEYS do
+    local version = redis.call('GET', KEYS[i]) or '0'
+    if version ~= ARGV[i + 1] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return 1
+"""
+
+
+class ResponseCache:
+    """Two-tier (in-process LRU + Redis) cache for rendered JSON responses
+
+    Entries are keyed by a namespace plus normalized query parameters and
+    carry tags. Invalidating a tag drops matching local entries and bumps a
+    version counter in Redis, so entries written under an older version are
+    treated as misses by every process. Local entries in other processes
+    expire after RESPONSE_CACHE_LOCAL_TTL seconds.
+    """
+
+    def __init__(self):
+        self.redis_url = os.getenv("REDIS_URL")
+        self.prefix = os.getenv("RESPONSE_CACHE_PREFIX", "fracta:cache")
+        self.ttl = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+        self.local_ttl = float(os.getenv("RESPONSE_CACHE_LOCAL_TTL", "2"))
+        self.local_max_entries = int(os.getenv("RESPONSE_CACHE_LOCAL_ENTRIES", "512"))
+        self.enabled = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+        # key -> (expires_at, tags, body)
+        self._local: "OrderedDict[str, Tuple[float, frozenset, bytes]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._generation = 0
+
+        self.redis = redis.from_url(self.redis_url) if self.redis_url else None
+        self._store_script = self.redis.register_script(_STORE_IF_CURRENT) if self.redis else None
+
+    # Keys
+    def make_key(self, namespace: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Build a cache key from a namespace and normalized query parameters"""
+        normalized = {
+            name: value
+            for name, value in (params or {}).items()
+            if value is not None and value != ""
+        }
+        digest = hashlib.blake2b(
+            orjson.dumps(normalized, option=orjson.OPT_SORT_KEYS),
+            digest_size=16
+        ).hexdigest()
+        return f"{self.prefix}:{namespace}:{digest}"
+
+    def _version_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    # Local tier
+    def _get_local(self, key: str) -> Optional[bytes]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, _, body = entry
+        if expires_at < time.monotonic():
+            self._local.pop(key, None)
+            return None
+        self._local.move_to_end(key)
+        return body
+
+    def _set_local(self, key: str, body: bytes, tags: frozenset):
+        self._local[key] = (time.monotonic() + self.local_ttl, tags, body)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max_entries:
+            self._local.popitem(last=False)
+
+    # Redis tier
+    async def _get_redis(self, key: str, tags: List[str]) -> Tuple[Optional[bytes], List[str]]:
+        """Return (body, current tag versions); body is None on a miss or stale entry"""
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                if tags:
+                    pipe.mget([self._version_key(tag) for tag in tags])
+                results = await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None, []
+
+        raw = results[0]
+        versions = [(v or b"0").decode() for v in results[1]] if tags else []
+        if raw is None:
+            return None, versions
+
+        header, _, body = raw.partition(b"\n")
+        if orjson.loads(header) != versions:
+            return None, versions
+        return body, versions
+
+    async def _set_redis(self, key: str, body: bytes, tags: List[str], versions: List[str]):
+        try:
+            await self._store_script(
+                keys=[key] + [self._version_key(tag) for tag in tags],
+                args=[orjson.dumps(versions) + b"\n" + body, self.ttl] + versions
+            )
+        except (RedisError, OSError) as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    # Public API
+    async def get_or_load(
+        self,
+        namespace: str,
+        params: Optional[Dict[str, Any]],
+        tags: Iterable[str],
+        loader: Callable[[], bytes]
+    ) -> bytes:
+        """Return the cached body for a request, running loader once on a miss
+
+        Concurrent misses for the same key share a single loader call.
+        """
+        if not self.enabled:
+            return loader()
+
+        key = self.make_key(namespace, params)
+        tags = sorted(set(tags))
+
+        body = self._get_local(key)
+        if body is not None:
+            return body
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generation
+        try:
+            versions: List[str] = []
+            body = None
+            if self.redis is not None:
+                body, versions = await self._get_redis(key, tags)
+
+            if body is None:
+                body = loader()
+                if self.redis is not None:
+                    await self._set_redis(key, body, tags, versions)
+
+            # Skip the local store if an invalidation ran while loading
+            if generation == self._generation:
+                self._set_local(key, body, frozenset(tags))
+
+            future.set_result(body)
+            return body
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Waiters re-raise it; avoid "never retrieved" warnings
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+    async def invalidate(self, tags: Iterable[str]):
+        """Invalidate every entry carrying any of the given tags"""
+        tags = set(tags)
+        if not tags:
+            return
+
+        self._generation += 1
+        for key in [key for key, (_, entry_tags, _) in self._local.items() if entry_tags & tags]:
+            self._local.pop(key, None)
+
+        if self.redis is None:
+            return
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.incr(self._version_key(tag))
+                await pipe.execute()
+        except (RedisError, OSError) as e:
+            logger.error(f"Response cache invalidation failed for {sorted(tags)}: {e}")
+
+    def clear_local(self):
+        """Drop all in-process entries"""
+        self._generation += 1
+        self._local.clear()
+
+# Global instance
+response_cache = ResponseCache()
@@ -0,0 +1,251 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.services.blockchain import blockchain_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+COMPLIANCE_MIRROR_INTERVAL = int(os.getenv("COMPLIANCE_MIRROR_INTERVAL", "15"))  # Seconds between syncs
+COMPLIANCE_MIRROR_MAX_AGE = int(os.getenv("COMPLIANCE_MIRROR_MAX_AGE", "120"))  # Older mirrors fall back to eth_call
+COMPLIANCE_MIRROR_START_BLOCK = int(os.getenv("COMPLIANCE_MIRROR_START_BLOCK", "0"))  # ComplianceManager deployment
+COMPLIANCE_MIRROR_BLOCK_RANGE = int(os.getenv("COMPLIANCE_MIRROR_BLOCK_RANGE", "2000"))  # Blocks per eth_getLogs call
+
+PROSPERA = "prospera"
+INTERNATIONAL = "international"
+
+
+class MirroredUser(NamedTuple):
+    """A wallet's ComplianceManager entries; replaced whole on every change"""
+    kyc_approved: bool = False
+    jurisdiction: str = ""
+    expiry: int = 0
+    permit_id: str = ""
+    permit_valid: bool = False
+
+
+class MirroredProperty(NamedTuple):
+    requires_prospera: bool = False
+    allows_international: bool = False
+
+
+_NO_USER = MirroredUser()
+_NO_PROPERTY = MirroredProperty()
+
+
+class ComplianceMirror:
+    """ComplianceManager state rebuilt from its events, with the contract's view functions in Python
+
+    ``can_invest`` and ``can_transfer`` follow contracts/ComplianceManager.sol
+    branch for branch, including the reason strings, and compare expiries
+    against ``now`` as the contract does against block.timestamp.
+
+    KYC, permits and property jurisdictions come from events. setMaxInvestment
+    emits nothing, so ``limits`` holds maxInvestmentPerProperty for every
+    jurisdiction seen, re-read on each sync. recordInvestment emits nothing
+    either: userInvestments is passed in by the caller, and only matters when
+    the user's jurisdiction has a limit.
+    """
+
+    def __init__(self):
+        self.users: Dict[str, MirroredUser] = {}
+        self.properties: Dict[str, MirroredProperty] = {}
+        self.limits: Dict[str, int] = {}  # maxInvestmentPerProperty by jurisdiction; 0 or missing is no limit
+        self.last_block: Optional[int] = None
+        self.synced_at: Optional[float] = None  # Last time the mirror reached the chain head
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    # State
+    def apply(self, events: List[Dict[str, Any]], last_block: int):
+        """Apply events in chain order and record how far the mirror has read"""
+        with self._lock:
+            for event in events:
+                args = event["args"]
+                if event["event"] == "PropertyJurisdictionSet":
+                    self.properties[args["property"].lower()] = MirroredProperty(
+                        args["requiresProspera"], args["allowsInternational"]
+                    )
+                    continue
+
+                address = args["user"].lower()
+                user = self.users.get(address, _NO_USER)
+                if event["event"] == "KYCApproved":
+                    user = user._replace(kyc_approved=True, jurisdiction=args["jurisdiction"], expiry=args["expiryTimestamp"])
+                elif event["event"] == "KYCRevoked":
+                    # revokeKYC clears the jurisdiction, expiry and permit too
+                    user = _NO_USER
+                elif event["event"] == "ProspectsPermitRegistered":
+                    user = user._replace(permit_id=args["permitId"], permit_valid=True)
+                self.users[address] = user
+            self.last_block = last_block
+
+    @property
+    def ready(self) -> bool:
+        """Synced recently enough to answer instead of the chain"""
+        return self.synced_at is not None and time.time() - self.synced_at <= COMPLIANCE_MIRROR_MAX_AGE
+
+    def set_limits(self, limits: Dict[str, int]):
+        with self._lock:
+            self.limits = limits
+
+    def investment_limit(self, user: str) -> int:
+        """maxInvestmentPerProperty for the user's jurisdiction; 0 is no limit"""
+        return self.limits.get(self.users.get(user.lower(), _NO_USER).jurisdiction, 0)
+
+    # ComplianceManager view functions
+    def can_invest(self, user: str, property: str, amount: int, invested: int = 0, now: Optional[int] = None) -> Tuple[bool, str]:
+        """canInvest; ``invested`` is userInvestments[user][property]"""
+        now = int(time.time()) if now is None else now
+        record = self.users.get(user.lower(), _NO_USER)
+        if not record.kyc_approved:
+            return False, "KYC not approved"
+        if now > record.expiry:
+            return False, "KYC expired"
+
+        jurisdiction = record.jurisdiction
+        flags = self.properties.get(property.lower(), _NO_PROPERTY)
+        if flags.requires_prospera:
+            if jurisdiction != PROSPERA:
+                return False, "Prospera permit required"
+            if not record.permit_valid:
+                return False, "Invalid Prospera permit"
+        elif flags.allows_international:
+            if jurisdiction != PROSPERA and jurisdiction != INTERNATIONAL:
+                return False, "Invalid jurisdiction for this property"
+        else:
+            return False, "Property jurisdiction not configured"
+
+        max_amount = self.limits.get(jurisdiction, 0)
+        if max_amount > 0 and invested + amount > max_amount:
+            return False, "Investment limit exceeded"
+        return True, ""
+
+    def can_transfer(self, sender: str, recipient: str, property: str, amount: int, invested: int = 0, now: Optional[int] = None) -> Tuple[bool, str]:
+        """canTransfer; ``invested`` is userInvestments[recipient][property]"""
+        now = int(time.time()) if now is None else now
+        sender_record = self.users.get(sender.lower(), _NO_USER)
+        recipient_record = self.users.get(recipient.lower(), _NO_USER)
+        if not sender_record.kyc_approved or not recipient_record.kyc_approved:
+            return False, "Both parties must have KYC approval"
+        if now > sender_record.expiry or now > recipient_record.expiry:
+            return False, "KYC expired for one or both parties"
+        return self.can_invest(recipient, property, amount, invested, now)
+
+    def compliance_status(self, user: str, now: Optional[int] = None) -> Dict[str, Any]:
+        """Same fields as BlockchainService.check_user_kyc_status (getUserComplianceStatus)"""
+        now = int(time.time()) if now is None else now
+        record = self.users.get(user.lower(), _NO_USER)
+        return {
+            "kyc_valid": record.kyc_approved and now <= record.expiry,
+            "jurisdiction": record.jurisdiction,
+            "expiry": record.expiry,
+            "has_prospera_permit": record.permit_valid,
+            "permit_id": record.permit_id
+        }
+
+    # Sync
+    def sync(self, head_block: Optional[int] = None) -> int:
+        """Read new ComplianceManager events up to the head (blocking); returns events applied"""
+        head_block = blockchain_service.get_block_number() if head_block is None else head_block
+        applied = 0
+        from_block = COMPLIANCE_MIRROR_START_BLOCK if self.last_block is None else self.last_block + 1
+        while from_block <= head_block:
+            to_block = min(from_block + COMPLIANCE_MIRROR_BLOCK_RANGE - 1, head_block)
+            events = blockchain_service.get_compliance_events(from_block, to_block)
+            self.apply(events, to_block)
+            applied += len(events)
+            from_block = to_block + 1
+        # Only a mirror that has caught up may answer for the chain
+        if self.last_block is not None and self.last_block >= head_block:
+            self.refresh_limits(head_block)
+            self.synced_at = time.time()
+        return applied
+
+    def refresh_limits(self, block: int):
+        """Re-read maxInvestmentPerProperty for every jurisdiction a user holds (blocking)"""
+        jurisdictions = {user.jurisdiction for user in list(self.users.values()) if user.jurisdiction} | set(self.limits)
+        self.set_limits({
+            jurisdiction: blockchain_service.get_max_investment(jurisdiction, block)
+            for jurisdiction in sorted(jurisdictions)
+        })
+
+    async def _run(self):
+        while True:
+            try:
+                applied = await asyncio.to_thread(self.sync)
+                if applied:
+                    logger.info(f"Compliance mirror applied {applied} events through block {self.last_block}")
+            except Exception as e:
+                logger.error(f"Compliance mirror sync failed: {e}")
+            await asyncio.sleep(COMPLIANCE_MIRROR_INTERVAL)
+
+    def start(self):
+        if not blockchain_service.compliance_manager_address:
+            logger.warning("COMPLIANCE_MANAGER_ADDRESS not set; compliance checks use eth_call")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def _invested(wallet_address: str, property_address: str) -> Optional[int]:
+    """userInvestments by eth_call, or None when the read fails"""
+    try:
+        return await asyncio.to_thread(blockchain_service.get_user_investment, wallet_address, property_address)
+    except Exception as e:
+        logger.error(f"Error reading userInvestments for {wallet_address}: {e}")
+        return None
+
+
+async def check_can_invest(wallet_address: str, property_address: str, amount: int) -> Tuple[bool, str]:
+    """canInvest from the mirror when it is current, otherwise by eth_call
+
+    userInvestments has no event, so when the user's jurisdiction has a limit
+    and every other check passes, that one value is read from the chain.
+    """
+    if compliance_mirror.ready:
+        allowed, reason = compliance_mirror.can_invest(wallet_address, property_address, amount)
+        if not allowed or not compliance_mirror.investment_limit(wallet_address):
+            return allowed, reason
+        invested = await _invested(wallet_address, property_address)
+        if invested is not None:
+            return compliance_mirror.can_invest(wallet_address, property_address, amount, invested)
+    return await blockchain_service.check_can_invest(wallet_address, property_address, amount)
+
+
+async def check_can_transfer(from_address: str, to_address: str, property_address: str, amount: int) -> Tuple[bool, str]:
+    """canTransfer from the mirror when it is current, otherwise by eth_call; limits as in check_can_invest"""
+    if compliance_mirror.ready:
+        allowed, reason = compliance_mirror.can_transfer(from_address, to_address, property_address, amount)
+        if not allowed or not compliance_mirror.investment_limit(to_address):
+            return allowed, reason
+        invested = await _invested(to_address, property_address)
+        if invested is not None:
+            return compliance_mirror.can_transfer(from_address, to_address, property_address, amount, invested)
+    return await blockchain_service.check_can_transfer(from_address, to_address, property_address, amount)
+
+
+async def check_user_kyc_status(wallet_address: str) -> Dict[str, Any]:
+    """getUserComplianceStatus from the mirror when it is current, otherwise by eth_call"""
+    if compliance_mirror.ready:
+        return compliance_mirror.compliance_status(wallet_address)
+    return await blockchain_service.check_user_kyc_status(wallet_address)
+
+# Global instance
+compliance_mirror = ComplianceMirror()
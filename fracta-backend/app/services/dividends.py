@@ -0,0 +1,174 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from app.models.dividend import DividendAccount, DividendDistribution, DividendEntitlement
+from app.models.property import Property
+from app.models.kyc import TokenRange
+
+logger = logging.getLogger(__name__)
+
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+# Current token count per holder of a property
+_HOLDERS_SQL = text(f"""
+    SELECT owner_id, sum(end_number - start_number + 1) AS tokens
+    FROM {TokenRange.__tablename__}
+    WHERE property_id = :property_id
+    GROUP BY owner_id
+    ORDER BY owner_id
+""")
+
+_ENTITLEMENTS_SQL = text(f"""
+    INSERT INTO {DividendEntitlement.__tablename__} (distribution_id, user_id, tokens, amount)
+    SELECT :distribution_id, user_id, tokens, amount
+    FROM unnest(
+        CAST(:user_ids AS integer[]),
+        CAST(:tokens AS bigint[]),
+        CAST(:amounts AS numeric[])
+    ) AS v(user_id, tokens, amount)
+""")
+
+_ACCOUNTS_SQL = text(f"""
+    INSERT INTO {DividendAccount.__tablename__} AS a (user_id, property_id, earned, claimed, updated_at)
+    SELECT user_id, :property_id, amount, 0, now()
+    FROM unnest(CAST(:user_ids AS integer[]), CAST(:amounts AS numeric[])) AS v(user_id, amount)
+    ON CONFLICT (user_id, property_id) DO UPDATE SET
+        earned = a.earned + excluded.earned,
+        updated_at = excluded.updated_at
+""")
+
+
+def compute_entitlements(balances: np.ndarray, amount: int, tokens_sold: int, previous_amount: int = 0) -> Tuple[int, np.ndarray]:
+    """Wei owed to each balance for one distribution; returns (dividend_per_token, amounts)
+
+    PropertyToken pays ``balance * (totalDividendsDistributed / tokensSold)``
+    with integer division, so each distribution is worth the rise in that
+    rounded-down per-token figure. Summed over distributions the amounts
+    equal what the contract reports for an unchanged balance. Amounts that
+    could overflow int64 (in total, not only per holder) are computed on
+    Python integers instead.
+    """
+    if tokens_sold <= 0:
+        raise ValueError("No tokens sold yet")
+    dividend_per_token = (previous_amount + amount) // tokens_sold
+    increment = dividend_per_token - previous_amount // tokens_sold
+
+    balances = np.asarray(balances, dtype=np.int64)
+    if increment * int(balances.sum()) > INT64_MAX:
+        return dividend_per_token, balances.astype(object) * increment
+    return dividend_per_token, balances * np.int64(increment)
+
+
+def distribute_dividends(db: Session, property_id: int, amount: int, transaction_hash: Optional[str] = None) -> DividendDistribution:
+    """Compute and store every holder's share of a distribution; the caller commits"""
+    # Serializes distributions and ownership changes for the property
+    property = db.query(Property.id, Property.tokens_sold).filter(
+        Property.id == property_id
+    ).with_for_update().first()
+    if not property:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
+    tokens_sold = property.tokens_sold or 0
+    if tokens_sold <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No tokens sold yet")
+
+    previous_amount = db.query(DividendDistribution.cumulative_amount).filter(
+        DividendDistribution.property_id == property_id
+    ).order_by(DividendDistribution.id.desc()).limit(1).scalar() or 0
+
+    holders = db.execute(_HOLDERS_SQL, {"property_id": property_id}).all()
+    user_ids = np.array([row.owner_id for row in holders], dtype=np.int64)
+    balances = np.array([row.tokens for row in holders], dtype=np.int64)
+    if int(balances.sum()) > tokens_sold:
+        # Ownership records out of step with the sale counter would pay out more than was sent
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Holdings exceed tokens sold")
+
+    dividend_per_token, amounts = compute_entitlements(balances, amount, tokens_sold, int(previous_amount))
+    paid = amounts > 0
+    user_ids, balances, amounts = user_ids[paid], balances[paid], amounts[paid]
+    distributed = int(amounts.sum())
+
+    distribution = DividendDistribution(
+        property_id=property_id,
+        amount=amount,
+        tokens_sold=tokens_sold,
+        cumulative_amount=int(previous_amount) + amount,
+        dividend_per_token=dividend_per_token,
+        distributed_amount=distributed,
+        holder_count=len(user_ids),
+        transaction_hash=transaction_hash
+    )
+    db.add(distribution)
+    db.flush()
+
+    if len(user_ids):
+        amount_list = [int(value) for value in amounts]
+        db.execute(_ENTITLEMENTS_SQL, {
+            "distribution_id": distribution.id,
+            "user_ids": user_ids.tolist(),
+            "tokens": balances.tolist(),
+            "amounts": amount_list,
+        })
+        db.execute(_ACCOUNTS_SQL, {
+            "property_id": property_id,
+            "user_ids": user_ids.tolist(),
+            "amounts": amount_list,
+        })
+
+    logger.info(
+        f"Dividend distribution {distribution.id} for property {property_id}: "
+        f"{distributed} of {amount} wei to {len(user_ids)} holders"
+    )
+    return distribution
+
+
+def serialize_distribution(distribution: DividendDistribution) -> Dict[str, Any]:
+    # Wei amounts as strings; they overflow JSON number precision
+    return {
+        "id": distribution.id,
+        "property_id": distribution.property_id,
+        "amount": str(distribution.amount),
+        "tokens_sold": distribution.tokens_sold,
+        "dividend_per_token": str(distribution.dividend_per_token),
+        "cumulative_amount": str(distribution.cumulative_amount),
+        "distributed_amount": str(distribution.distributed_amount),
+        "holder_count": distribution.holder_count,
+        "transaction_hash": distribution.transaction_hash,
+        "created_at": distribution.created_at
+    }
+
+
+def get_user_dividends(db: Session, user_id: int, property_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Earned, claimed and claimable wei per property for one user"""
+    query = db.query(DividendAccount).filter(DividendAccount.user_id == user_id)
+    if property_id is not None:
+        query = query.filter(DividendAccount.property_id == property_id)
+
+    return [
+        {
+            "property_id": account.property_id,
+            "earned": str(account.earned),
+            "claimed": str(account.claimed),
+            "claimable": str(account.earned - account.claimed)
+        }
+        for account in query.order_by(DividendAccount.property_id).all()
+    ]
+
+
+def claim_dividends(db: Session, user_id: int, property_id: int) -> int:
+    """Mark everything the user can claim on a property as claimed; returns the wei amount"""
+    account = db.query(DividendAccount).filter(
+        DividendAccount.user_id == user_id,
+        DividendAccount.property_id == property_id
+    ).with_for_update().first()
+    if not account or account.earned <= account.claimed:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No dividends to claim")
+
+    claimable = int(account.earned - account.claimed)
+    account.claimed = account.earned
+    account.updated_at = func.now()
+    return claimable
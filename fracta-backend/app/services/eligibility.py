@@ -0,0 +1,185 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import HTTPException, status
+
+from app.models.user import User
+from app.models.property import Property
+
+# Property columns the rules read, so batch checks can skip full ORM loads
+ELIGIBILITY_COLUMNS = (
+    Property.id,
+    Property.status,
+    Property.kyc_required,
+    Property.total_tokens,
+    Property.tokens_sold,
+    Property.tokens_reserved,
+    Property.token_price,
+)
+
+
+class EligibilityFailure:
+    """A failed rule: machine-readable code, user-facing reason and HTTP status"""
+
+    __slots__ = ("code", "reason", "http_status")
+
+    def __init__(self, code: str, reason: str, http_status: int):
+        self.code = code
+        self.reason = reason
+        self.http_status = http_status
+
+
+class Rule:
+    """One investment requirement
+
+    ``scope`` says what the check depends on, which decides when it runs:
+    "user" rules run once per user, "kyc" rules once per (user, kyc_required)
+    and "property" rules for every property evaluated.
+    """
+
+    def __init__(self, code: str, http_status: int, scope: str, check: Callable[..., Optional[str]]):
+        self.code = code
+        self.http_status = http_status
+        self.scope = scope
+        self.check = check
+
+    def fail(self, *args) -> Optional[EligibilityFailure]:
+        reason = self.check(*args)
+        return EligibilityFailure(self.code, reason, self.http_status) if reason else None
+
+
+def _check_status(property, token_amount) -> Optional[str]:
+    if property.status != "live":
+        return f"Property is {property.status}"
+
+
+def _check_funding(property, token_amount) -> Optional[str]:
+    if (property.tokens_sold or 0) >= property.total_tokens:
+        return "Property is fully funded"
+
+
+def _check_kyc(user: User, kyc_required: str) -> Optional[str]:
+    if user.kyc_status != "approved":
+        return "KYC verification required"
+    if kyc_required == "prospera-permit":
+        if user.kyc_jurisdiction != "prospera":
+            return "Prospera permit required for this property"
+    elif user.kyc_jurisdiction not in ("prospera", "international"):
+        return "KYC jurisdiction is not eligible for this property"
+
+
+def _check_account(user: User) -> Optional[str]:
+    # Only an explicit False counts; unsaved users have no default applied yet
+    if user.is_active is False:
+        return "Account is inactive"
+
+
+def _check_token_amount(property, token_amount) -> Optional[str]:
+    # Tokens held by open reservations are not available
+    unavailable = (property.tokens_sold or 0) + (property.tokens_reserved or 0)
+    if token_amount is not None and unavailable + token_amount > property.total_tokens:
+        return "Not enough tokens available"
+
+
+# Evaluation order; the first failure decides the error raised by write endpoints
+RULES = (
+    Rule("property_not_live", status.HTTP_400_BAD_REQUEST, "property", _check_status),
+    Rule("fully_funded", status.HTTP_400_BAD_REQUEST, "property", _check_funding),
+    Rule("kyc_not_eligible", status.HTTP_403_FORBIDDEN, "kyc", _check_kyc),
+    Rule("account_inactive", status.HTTP_403_FORBIDDEN, "user", _check_account),
+    Rule("insufficient_tokens", status.HTTP_400_BAD_REQUEST, "property", _check_token_amount),
+)
+
+# Requirements for receiving tokens from another holder (sale state doesn't apply)
+HOLDER_RULES = tuple(rule for rule in RULES if rule.scope != "property")
+
+
+class EligibilityResult:
+    """Outcome of evaluating every rule for one property"""
+
+    __slots__ = ("property", "failures")
+
+    def __init__(self, property, failures: List[EligibilityFailure]):
+        self.property = property
+        self.failures = failures
+
+    @property
+    def eligible(self) -> bool:
+        return not self.failures
+
+    @property
+    def reasons(self) -> List[str]:
+        return [failure.reason for failure in self.failures]
+
+    @property
+    def codes(self) -> List[str]:
+        return [failure.code for failure in self.failures]
+
+    def raise_for_failure(self):
+        """Raise the first failure as an HTTPException"""
+        if self.failures:
+            failure = self.failures[0]
+            raise HTTPException(status_code=failure.http_status, detail=failure.reason)
+
+    def to_dict(self) -> Dict[str, Any]:
+        property = self.property
+        return {
+            "property_id": property.id,
+            "can_invest": self.eligible,
+            "reasons": self.reasons,
+            "reason_codes": self.codes,
+            "property_status": property.status,
+            "tokens_remaining": property.total_tokens - (property.tokens_sold or 0),
+            "tokens_available": property.total_tokens - (property.tokens_sold or 0) - (property.tokens_reserved or 0),
+            "minimum_investment": float(property.token_price)
+        }
+
+
+class EligibilityEngine:
+    """Rules compiled for one user and evaluated against any number of properties
+
+    User-level outcomes are decided at compile time and KYC outcomes are
+    memoized per kyc_required value, so each property only runs its own checks.
+    """
+
+    def __init__(self, user: User, rules=RULES):
+        self.user = user
+        self._kyc_outcomes: Dict[str, Dict[Rule, Optional[EligibilityFailure]]] = {}
+        self._plan = []
+
+        for rule in rules:
+            if rule.scope == "user":
+                failure = rule.fail(user)
+                if failure:
+                    self._plan.append(lambda property, token_amount, failure=failure: failure)
+            elif rule.scope == "kyc":
+                self._plan.append(lambda property, token_amount, rule=rule: self._kyc_outcome(rule, property.kyc_required))
+            else:
+                self._plan.append(lambda property, token_amount, rule=rule: rule.fail(property, token_amount))
+
+    def _kyc_outcome(self, rule: Rule, kyc_required: str) -> Optional[EligibilityFailure]:
+        outcomes = self._kyc_outcomes.setdefault(kyc_required, {})
+        if rule not in outcomes:
+            outcomes[rule] = rule.fail(self.user, kyc_required)
+        return outcomes[rule]
+
+    def evaluate(self, property, token_amount: Optional[int] = None) -> EligibilityResult:
+        """Evaluate a Property (or a row of ELIGIBILITY_COLUMNS)"""
+        failures = []
+        for step in self._plan:
+            failure = step(property, token_amount)
+            if failure:
+                failures.append(failure)
+        return EligibilityResult(property, failures)
+
+    def evaluate_many(self, properties) -> List[EligibilityResult]:
+        return [self.evaluate(property) for property in properties]
+
+
+def ensure_eligible(user: User, property, token_amount: Optional[int] = None):
+    """Raise an HTTPException unless the user may buy or mint tokens of the property"""
+    EligibilityEngine(user).evaluate(property, token_amount).raise_for_failure()
+
+
+def ensure_can_hold(user: User, property):
+    """Raise an HTTPException unless the user may receive tokens of the property"""
+    EligibilityEngine(user, rules=HOLDER_RULES).evaluate(property).raise_for_failure()
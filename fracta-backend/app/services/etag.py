@@ -0,0 +1,40 @@
+import hashlib
+from typing import Any, Dict
+
+from fastapi import Request
+from fastapi.responses import Response
+
+PUBLIC_CACHE_CONTROL = "no-cache"
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the version fields of a resource"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in header.split(",")
+    )
+
+
+def etag_headers(etag: str, private: bool = False) -> Dict[str, str]:
+    return {
+        "ETag": etag,
+        "Cache-Control": PRIVATE_CACHE_CONTROL if private else PUBLIC_CACHE_CONTROL
+    }
+
+
+def not_modified(etag: str, private: bool = False) -> Response:
+    """Empty 304 response carrying the current ETag"""
+    return Response(status_code=304, headers=etag_headers(etag, private))
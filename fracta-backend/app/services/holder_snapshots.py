@@ -0,0 +1,377 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.database import SessionLocal
+from app.models.holder_snapshot import (
+    BalanceCheckpoint,
+    HolderIndexState,
+    HolderSnapshot,
+    SnapshotBlock,
+    SupplyCheckpoint,
+)
+from app.models.property import Property
+from app.models.user import User
+from app.services.blockchain import blockchain_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+HOLDER_INDEX_INTERVAL = int(os.getenv("HOLDER_INDEX_INTERVAL", "60"))  # Seconds between indexing passes
+HOLDER_INDEX_BLOCK_RANGE = int(os.getenv("HOLDER_INDEX_BLOCK_RANGE", "2000"))  # Blocks per eth_getLogs call
+HOLDER_INDEX_CONFIRMATIONS = int(os.getenv("HOLDER_INDEX_CONFIRMATIONS", "12"))  # Stay this far behind the head
+HOLDER_INDEX_START_BLOCK = int(os.getenv("HOLDER_INDEX_START_BLOCK", "0"))  # No earlier than the contracts' deployment
+SNAPSHOT_MATERIALIZE_AFTER = int(os.getenv("SNAPSHOT_MATERIALIZE_AFTER", "3"))  # Queries before a block is materialized
+
+ZERO_ADDRESS = "0x" + "0" * 40
+
+_LATEST_BALANCES_SQL = text(f"""
+    SELECT DISTINCT ON (holder) holder, balance
+    FROM {BalanceCheckpoint.__tablename__}
+    WHERE property_id = :property_id AND holder = ANY(CAST(:holders AS varchar[]))
+    ORDER BY holder, block_number DESC
+""")
+
+_CHECKPOINTS_SQL = text(f"""
+    INSERT INTO {BalanceCheckpoint.__tablename__} (property_id, holder, block_number, balance)
+    SELECT :property_id, holder, block_number, balance
+    FROM unnest(
+        CAST(:holders AS varchar[]),
+        CAST(:block_numbers AS bigint[]),
+        CAST(:balances AS numeric[])
+    ) AS v(holder, block_number, balance)
+    ON CONFLICT (property_id, holder, block_number) DO UPDATE SET balance = excluded.balance
+""")
+
+_SUPPLY_SQL = text(f"""
+    INSERT INTO {SupplyCheckpoint.__tablename__} (property_id, block_number, tokens_issued)
+    SELECT :property_id, block_number, tokens_issued
+    FROM unnest(CAST(:block_numbers AS bigint[]), CAST(:tokens_issued AS numeric[])) AS v(block_number, tokens_issued)
+    ON CONFLICT (property_id, block_number) DO UPDATE SET tokens_issued = excluded.tokens_issued
+""")
+
+_ISSUED_AT_SQL = text(f"""
+    SELECT tokens_issued FROM {SupplyCheckpoint.__tablename__}
+    WHERE property_id = :property_id AND block_number <= :block_number
+    ORDER BY block_number DESC
+    LIMIT 1
+""")
+
+_QUERY_HIT_SQL = text(f"""
+    INSERT INTO {SnapshotBlock.__tablename__} AS s (property_id, block_number, query_count)
+    VALUES (:property_id, :block_number, 1)
+    ON CONFLICT (property_id, block_number) DO UPDATE SET query_count = s.query_count + 1
+    RETURNING query_count, materialized_at
+""")
+
+_MATERIALIZE_SQL = text(f"""
+    INSERT INTO {HolderSnapshot.__tablename__} (property_id, block_number, holder, balance)
+    SELECT :property_id, :block_number, holder, balance
+    FROM unnest(CAST(:holders AS varchar[]), CAST(:balances AS numeric[])) AS v(holder, balance)
+    ON CONFLICT DO NOTHING
+""")
+
+
+def apply_events(db: Session, property_id: int, events: List[Dict[str, Any]]) -> int:
+    """Turn Transfer and PropertyTokensIssued events (in chain order) into checkpoints; the caller commits
+
+    Each holder whose balance changed in a block gets one checkpoint with
+    its balance at the end of that block. Returns the number of checkpoints.
+    """
+    transfers = [event for event in events if event["event"] == "Transfer"]
+    touched = sorted({
+        address.lower()
+        for event in transfers
+        for address in (event["args"]["from"], event["args"]["to"])
+    } - {ZERO_ADDRESS})
+    balances = {
+        row.holder: int(row.balance)
+        for row in db.execute(_LATEST_BALANCES_SQL, {"property_id": property_id, "holders": touched})
+    }
+    tokens_issued = int(db.execute(_ISSUED_AT_SQL, {"property_id": property_id, "block_number": 2**62}).scalar() or 0)
+
+    checkpoints: Dict[Tuple[str, int], int] = {}
+    supply: Dict[int, int] = {}
+    for event in events:
+        block_number = event["block_number"]
+        if event["event"] == "Transfer":
+            value = event["args"]["value"]
+            sender, recipient = event["args"]["from"].lower(), event["args"]["to"].lower()
+            # Mints come from and burns go to the zero address, which holds nothing
+            if sender != ZERO_ADDRESS:
+                balances[sender] = balances.get(sender, 0) - value
+                checkpoints[(sender, block_number)] = balances[sender]
+            if recipient != ZERO_ADDRESS:
+                balances[recipient] = balances.get(recipient, 0) + value
+                checkpoints[(recipient, block_number)] = balances[recipient]
+        elif event["event"] == "PropertyTokensIssued":
+            # The sale's own Transfer already moved the balance; this only tracks tokensSold
+            tokens_issued += event["args"]["amount"]
+            supply[block_number] = tokens_issued
+
+    if checkpoints:
+        keys = list(checkpoints)
+        db.execute(_CHECKPOINTS_SQL, {
+            "property_id": property_id,
+            "holders": [holder for holder, _ in keys],
+            "block_numbers": [block_number for _, block_number in keys],
+            "balances": [checkpoints[key] for key in keys],
+        })
+    if supply:
+        db.execute(_SUPPLY_SQL, {
+            "property_id": property_id,
+            "block_numbers": list(supply),
+            "tokens_issued": list(supply.values()),
+        })
+    return len(checkpoints)
+
+
+def index_next_range(db: Session, property_id: int, contract_address: str, head_block: int) -> Optional[int]:
+    """Index the next block range of a property's events; returns the new last block, or None if caught up
+
+    The range and the state advance in the caller's transaction, so a
+    failed range is simply fetched again on the next pass.
+    """
+    state = db.query(HolderIndexState).filter(
+        HolderIndexState.property_id == property_id
+    ).with_for_update().first()
+    if state is None:
+        state = HolderIndexState(
+            property_id=property_id,
+            contract_address=contract_address,
+            last_block=HOLDER_INDEX_START_BLOCK - 1
+        )
+        db.add(state)
+
+    safe_block = head_block - HOLDER_INDEX_CONFIRMATIONS
+    from_block = state.last_block + 1
+    if from_block > safe_block:
+        return None
+    to_block = min(from_block + HOLDER_INDEX_BLOCK_RANGE - 1, safe_block)
+
+    events = blockchain_service.get_property_token_events(contract_address, from_block, to_block)
+    apply_events(db, property_id, events)
+    state.last_block = to_block
+    return to_block
+
+
+class CheckpointIndex:
+    """Every balance checkpoint of a property as sorted arrays, for point-in-time lookups
+
+    Checkpoints are sorted by holder, then block, and keyed as
+    ``holder_index * stride + block``. One searchsorted call then binary
+    searches every holder's checkpoints for its last change at or before a block.
+    """
+
+    def __init__(self, holders: List[str], holder_index: np.ndarray, block_numbers: np.ndarray, balances: np.ndarray):
+        self.holders = holders
+        self.stride = int(block_numbers.max()) + 2 if len(block_numbers) else 1
+        self.keys = holder_index * self.stride + block_numbers
+        self.starts = np.searchsorted(holder_index, np.arange(len(holders)))  # First checkpoint of each holder
+        self.balances = balances
+
+    @classmethod
+    def load(cls, db: Session, property_id: int) -> "CheckpointIndex":
+        rows = db.query(
+            BalanceCheckpoint.holder,
+            BalanceCheckpoint.block_number,
+            BalanceCheckpoint.balance
+        ).filter(
+            BalanceCheckpoint.property_id == property_id
+        ).order_by(BalanceCheckpoint.holder, BalanceCheckpoint.block_number).all()
+
+        holders: List[str] = []
+        holder_index = np.empty(len(rows), dtype=np.int64)
+        for i, row in enumerate(rows):
+            if not holders or holders[-1] != row.holder:
+                holders.append(row.holder)
+            holder_index[i] = len(holders) - 1
+
+        # Exact integers; token amounts can exceed int64
+        balances = np.empty(len(rows), dtype=object)
+        balances[:] = [int(row.balance) for row in rows]
+        block_numbers = np.array([row.block_number for row in rows], dtype=np.int64)
+        return cls(holders, holder_index, block_numbers, balances)
+
+    def balances_at(self, block_number: int) -> List[Tuple[str, int]]:
+        """(holder, balance) for every holder with a checkpoint at or before the block"""
+        if not self.holders:
+            return []
+        block_number = min(block_number, self.stride - 1)
+        positions = np.searchsorted(self.keys, np.arange(len(self.holders)) * self.stride + block_number, side="right") - 1
+        present = positions >= self.starts
+        return [
+            (self.holders[holder], self.balances[position])
+            for holder, position in zip(np.flatnonzero(present).tolist(), positions[present].tolist())
+        ]
+
+
+class HolderSnapshotService:
+    """Point-in-time cap tables from balance checkpoints
+
+    Each property's checkpoints are held as a CheckpointIndex until the
+    indexer moves past the block it was loaded at. Blocks queried
+    SNAPSHOT_MATERIALIZE_AFTER times get their full cap table written to
+    holder_snapshots. Indexed blocks are final, so those rows never go stale.
+    """
+
+    def __init__(self):
+        # property_id -> (last indexed block when loaded, index)
+        self._indexes: Dict[int, Tuple[int, CheckpointIndex]] = {}
+
+    def _index(self, db: Session, state: HolderIndexState) -> CheckpointIndex:
+        cached = self._indexes.get(state.property_id)
+        if cached is None or cached[0] != state.last_block:
+            cached = self._indexes[state.property_id] = (state.last_block, CheckpointIndex.load(db, state.property_id))
+        return cached[1]
+
+    def _balances_at(self, db: Session, state: HolderIndexState, block_number: int) -> List[Tuple[str, int]]:
+        hit = db.execute(_QUERY_HIT_SQL, {"property_id": state.property_id, "block_number": block_number}).one()
+        if hit.materialized_at is not None:
+            rows = db.query(HolderSnapshot.holder, HolderSnapshot.balance).filter(
+                HolderSnapshot.property_id == state.property_id,
+                HolderSnapshot.block_number == block_number
+            ).all()
+            return [(row.holder, int(row.balance)) for row in rows]
+
+        balances = [
+            (holder, balance)
+            for holder, balance in self._index(db, state).balances_at(block_number)
+            if balance
+        ]
+        if hit.query_count >= SNAPSHOT_MATERIALIZE_AFTER:
+            db.execute(_MATERIALIZE_SQL, {
+                "property_id": state.property_id,
+                "block_number": block_number,
+                "holders": [holder for holder, _ in balances],
+                "balances": [balance for _, balance in balances],
+            })
+            db.query(SnapshotBlock).filter(
+                SnapshotBlock.property_id == state.property_id,
+                SnapshotBlock.block_number == block_number
+            ).update({"materialized_at": text("now()"), "holder_count": len(balances)}, synchronize_session=False)
+        return balances
+
+    def cap_table(self, db: Session, property_id: int, block_number: Optional[int] = None) -> Dict[str, Any]:
+        """Holders and balances of a property at the end of a block (default: the last indexed one); the caller commits"""
+        state = db.query(HolderIndexState).filter(HolderIndexState.property_id == property_id).first()
+        if state is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Holder index not available for this property")
+        if block_number is None:
+            block_number = state.last_block
+        if block_number > state.last_block:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Block {block_number} not indexed yet; indexed through {state.last_block}"
+            )
+
+        contract_address = state.contract_address.lower()
+        balances = self._balances_at(db, state, block_number)
+        # The contract's own balance is unsold inventory, not a holder
+        unsold = next((balance for holder, balance in balances if holder == contract_address), 0)
+        holders = sorted(
+            ((holder, balance) for holder, balance in balances if holder != contract_address),
+            key=lambda item: (-item[1], item[0])
+        )
+        tokens_issued = int(db.execute(_ISSUED_AT_SQL, {"property_id": property_id, "block_number": block_number}).scalar() or 0)
+        held = sum(balance for _, balance in holders)
+        denominator = tokens_issued or held
+
+        addresses = [holder for holder, _ in holders]
+        user_ids = dict(
+            db.query(User.wallet_address, User.id).filter(User.wallet_address.in_(addresses)).all()
+        ) if addresses else {}
+        # Wallet addresses may be stored checksummed
+        if len(user_ids) < len(addresses):
+            user_ids.update({
+                address.lower(): user_id
+                for address, user_id in db.execute(
+                    text(f"SELECT lower(wallet_address), id FROM {User.__tablename__} WHERE lower(wallet_address) = ANY(:addresses)"),
+                    {"addresses": addresses}
+                )
+            })
+
+        return {
+            "property_id": property_id,
+            "block_number": block_number,
+            "indexed_through": state.last_block,
+            "tokens_issued": str(tokens_issued),
+            "unsold": str(unsold),
+            "holder_count": len(holders),
+            "holders": [
+                {
+                    "address": holder,
+                    "user_id": user_ids.get(holder),
+                    "balance": str(balance),
+                    "percentage": round(balance / denominator * 100, 4) if denominator else 0
+                }
+                for holder, balance in holders
+            ]
+        }
+
+
+class HolderIndexer:
+    """Background task that follows every tokenized property's events into checkpoints"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def run(self) -> int:
+        """Index all properties up to the confirmed head (blocking); returns the block ranges indexed"""
+        db = SessionLocal()
+        try:
+            head_block = blockchain_service.get_block_number()
+            properties = db.query(Property.id, Property.contract_address).filter(
+                Property.contract_address.isnot(None)
+            ).all()
+            ranges = 0
+            for property in properties:
+                while True:
+                    try:
+                        last_block = index_next_range(db, property.id, property.contract_address, head_block)
+                        db.commit()
+                    except Exception as e:
+                        db.rollback()
+                        logger.error(f"Holder indexing failed for property {property.id}: {e}")
+                        break
+                    if last_block is None:
+                        break
+                    ranges += 1
+            return ranges
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                ranges = await asyncio.to_thread(self.run)
+                if ranges:
+                    logger.info(f"Indexed {ranges} block ranges of token events")
+            except Exception as e:
+                logger.error(f"Holder indexing pass failed: {e}")
+            await asyncio.sleep(HOLDER_INDEX_INTERVAL)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+holder_snapshots = HolderSnapshotService()
+holder_indexer = HolderIndexer()
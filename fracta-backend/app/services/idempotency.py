@@ -0,0 +1,181 @@
+import os
+import time
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from sqlalchemy import text
+from dotenv import load_dotenv
+
+from app.database import engine
+from app.models.idempotency import IdempotencyKey
+from app.services.cache import render_json
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+PURGE_INTERVAL = 300
+
+REPLAY_HEADER = "Idempotent-Replayed"
+
+# Client errors that depend on timing rather than the request, so retries must run again
+RETRYABLE_STATUSES = (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS)
+
+# Claim a key unless a live entry already holds it. Expired entries and
+# processing claims whose owner went away are taken over.
+_CLAIM_SQL = text(f"""
+    INSERT INTO {IdempotencyKey.__tablename__} (key_hash, request_hash, status, locked_until, expires_at)
+    VALUES (:key_hash, :request_hash, 'processing',
+            now() + make_interval(secs => :lock_timeout), now() + make_interval(secs => :ttl))
+    ON CONFLICT (key_hash) DO UPDATE SET
+        request_hash = EXCLUDED.request_hash,
+        status = 'processing',
+        locked_until = EXCLUDED.locked_until,
+        expires_at = EXCLUDED.expires_at,
+        response_status = NULL,
+        response_body = NULL,
+        created_at = now()
+    WHERE idempotency_keys.expires_at <= now()
+       OR (idempotency_keys.status = 'processing' AND idempotency_keys.locked_until <= now())
+    RETURNING key_hash
+""")
+
+
+class IdempotencyStore:
+    """Postgres-backed store of write-endpoint responses keyed by Idempotency-Key
+
+    Claims and results are written on their own short transactions so that
+    concurrent duplicates see them immediately.
+    """
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL, lock_timeout: int = IDEMPOTENCY_LOCK_TIMEOUT):
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._last_purge = 0.0
+
+    @staticmethod
+    def key_hash(scope: str, user_id: int, key: str) -> bytes:
+        return hashlib.sha256(f"{scope}:{user_id}:{key}".encode()).digest()
+
+    @staticmethod
+    def request_hash(payload: Dict[str, Any]) -> bytes:
+        return hashlib.sha256(orjson.dumps(jsonable_encoder(payload), option=orjson.OPT_SORT_KEYS)).digest()
+
+    def claim(self, key_hash: bytes, request_hash: bytes) -> Optional[Response]:
+        """Claim a key; returns None when the caller should run the request, else a replayed response"""
+        self._maybe_purge()
+        with engine.begin() as conn:
+            claimed = conn.execute(_CLAIM_SQL, {
+                "key_hash": key_hash,
+                "request_hash": request_hash,
+                "lock_timeout": self.lock_timeout,
+                "ttl": self.ttl
+            }).first()
+            if claimed:
+                return None
+
+            existing = conn.execute(text(f"""
+                SELECT request_hash, status, response_status, response_body
+                FROM {IdempotencyKey.__tablename__} WHERE key_hash = :key_hash
+            """), {"key_hash": key_hash}).first()
+
+        if existing is None:
+            # Purged between the two statements; claim again
+            return self.claim(key_hash, request_hash)
+        if bytes(existing.request_hash) != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request"
+            )
+        if existing.status != "completed":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is already in progress",
+                headers={"Retry-After": "1"}
+            )
+        return Response(
+            content=bytes(existing.response_body),
+            status_code=existing.response_status,
+            media_type="application/json",
+            headers={REPLAY_HEADER: "true"}
+        )
+
+    def complete(self, key_hash: bytes, status_code: int, body: bytes):
+        with engine.begin() as conn:
+            conn.execute(text(f"""
+                UPDATE {IdempotencyKey.__tablename__}
+                SET status = 'completed', response_status = :status_code, response_body = :body
+                WHERE key_hash = :key_hash
+            """), {"key_hash": key_hash, "status_code": status_code, "body": body})
+
+    def release(self, key_hash: bytes):
+        """Drop a claim so the request can be retried"""
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"DELETE FROM {IdempotencyKey.__tablename__} WHERE key_hash = :key_hash"),
+                {"key_hash": key_hash}
+            )
+
+    def _maybe_purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"""
+                    DELETE FROM {IdempotencyKey.__tablename__} WHERE key_hash IN (
+                        SELECT key_hash FROM {IdempotencyKey.__tablename__}
+                        WHERE expires_at <= now() LIMIT 10000
+                    )
+                """))
+        except Exception as e:
+            logger.error(f"Error purging idempotency keys: {e}")
+
+    async def run(
+        self,
+        scope: str,
+        user_id: int,
+        key: Optional[str],
+        payload: Dict[str, Any],
+        handler: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Run a write handler at most once per (scope, user, Idempotency-Key)
+
+        Successful and 4xx outcomes are stored and replayed for retries with
+        the same key and body; 5xx, conflict and rate-limit failures release
+        the key.
+        """
+        if not key:
+            return await handler()
+
+        key_hash = self.key_hash(scope, user_id, key)
+        replay = self.claim(key_hash, self.request_hash(payload))
+        if replay is not None:
+            return replay
+
+        try:
+            result = await handler()
+        except HTTPException as e:
+            if e.status_code >= 500 or e.status_code in RETRYABLE_STATUSES:
+                self.release(key_hash)
+            else:
+                self.complete(key_hash, e.status_code, render_json({"detail": e.detail}))
+            raise
+        except BaseException:
+            self.release(key_hash)
+            raise
+
+        body = render_json(jsonable_encoder(result))
+        self.complete(key_hash, status.HTTP_200_OK, body)
+        return Response(content=body, media_type="application/json")
+
+# Global instance
+idempotency_store = IdempotencyStore()
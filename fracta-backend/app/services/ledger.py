@@ -0,0 +1,530 @@
+import logging
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.kyc import TokenRange
+from app.models.ledger import LedgerAccount, LedgerCheckpoint, LedgerEntry, LedgerTransaction
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+# Account kinds
+CASH = "cash"
+RENTAL_INCOME = "rental_income"
+EXPENSES = "expenses"
+DISTRIBUTIONS = "distributions"
+HOLDER_PAYABLE = "holder_payable"  # One per holder; what the property owes them
+
+# Balances are stored as debits minus credits; this is the sign that makes each kind read positive
+NORMAL_SIGN = {CASH: 1, EXPENSES: 1, DISTRIBUTIONS: 1, RENTAL_INCOME: -1, HOLDER_PAYABLE: -1}
+
+TRANSACTION_KINDS = ("rent", "expense", "distribution", "payout")
+
+ACCOUNTS = LedgerAccount.__tablename__
+CHECKPOINTS = LedgerCheckpoint.__tablename__
+
+
+class Posting(NamedTuple):
+    kind: str
+    amount: int  # Cents; debits positive, credits negative
+    user_id: Optional[int] = None
+
+
+class JournalEntry(NamedTuple):
+    property_id: int
+    kind: str
+    postings: List[Posting]
+    description: Optional[str] = None
+    reference: Optional[str] = None
+
+
+# Account keys as parallel arrays; user_id is NULL except for holder accounts
+_ACCOUNT_KEYS = """
+    unnest(
+        CAST(:property_ids AS integer[]),
+        CAST(:kinds AS varchar[]),
+        CAST(:user_ids AS integer[])
+    ) AS v(property_id, kind, user_id)
+"""
+
+_ENSURE_ACCOUNTS_SQL = text(f"""
+    INSERT INTO {ACCOUNTS} (property_id, kind, user_id, balance, entry_count)
+    SELECT property_id, kind, user_id, 0, 0
+    FROM {_ACCOUNT_KEYS}
+    ON CONFLICT (property_id, kind, (coalesce(user_id, 0))) DO NOTHING
+""")
+
+# Locked in id order so concurrent postings cannot deadlock
+_LOCK_ACCOUNTS_SQL = text(f"""
+    SELECT a.id, a.property_id, a.kind, a.user_id, a.balance, a.entry_count
+    FROM {ACCOUNTS} a
+    JOIN {_ACCOUNT_KEYS}
+      ON a.property_id = v.property_id AND a.kind = v.kind AND coalesce(a.user_id, 0) = coalesce(v.user_id, 0)
+    ORDER BY a.id
+    FOR UPDATE OF a
+""")
+
+_TRANSACTION_IDS_SQL = text(f"""
+    SELECT nextval(pg_get_serial_sequence('{LedgerTransaction.__tablename__}', 'id'))
+    FROM generate_series(1, :count)
+""")
+
+_INSERT_TRANSACTIONS_SQL = text(f"""
+    INSERT INTO {LedgerTransaction.__tablename__} (id, property_id, kind, description, reference, period, posted_at)
+    SELECT id, property_id, kind, description, reference, :period, now()
+    FROM unnest(
+        CAST(:ids AS bigint[]),
+        CAST(:property_ids AS integer[]),
+        CAST(:kinds AS varchar[]),
+        CAST(:descriptions AS varchar[]),
+        CAST(:references AS varchar[])
+    ) AS v(id, property_id, kind, description, reference)
+""")
+
+_INSERT_ENTRIES_SQL = text(f"""
+    INSERT INTO {LedgerEntry.__tablename__} (transaction_id, account_id, sequence, amount, balance_after, period)
+    SELECT transaction_id, account_id, sequence, amount, balance_after, :period
+    FROM unnest(
+        CAST(:transaction_ids AS bigint[]),
+        CAST(:account_ids AS integer[]),
+        CAST(:sequences AS bigint[]),
+        CAST(:amounts AS bigint[]),
+        CAST(:balances AS bigint[])
+    ) AS v(transaction_id, account_id, sequence, amount, balance_after)
+""")
+
+_UPDATE_ACCOUNTS_SQL = text(f"""
+    UPDATE {ACCOUNTS} AS a
+    SET balance = v.balance, entry_count = v.entry_count, updated_at = now()
+    FROM unnest(
+        CAST(:ids AS integer[]),
+        CAST(:balances AS bigint[]),
+        CAST(:entry_counts AS bigint[])
+    ) AS v(id, balance, entry_count)
+    WHERE a.id = v.id
+""")
+
+# Opening balance and first sequence are kept from the month's first posting
+_CHECKPOINTS_SQL = text(f"""
+    INSERT INTO {CHECKPOINTS} AS c
+        (account_id, period, opening_balance, debits, credits, closing_balance, first_sequence, last_sequence, updated_at)
+    SELECT account_id, :period, opening_balance, debits, credits, closing_balance, first_sequence, last_sequence, now()
+    FROM unnest(
+        CAST(:account_ids AS integer[]),
+        CAST(:opening_balances AS bigint[]),
+        CAST(:debits AS bigint[]),
+        CAST(:credits AS bigint[]),
+        CAST(:closing_balances AS bigint[]),
+        CAST(:first_sequences AS bigint[]),
+        CAST(:last_sequences AS bigint[])
+    ) AS v(account_id, opening_balance, debits, credits, closing_balance, first_sequence, last_sequence)
+    ON CONFLICT (account_id, period) DO UPDATE SET
+        debits = c.debits + excluded.debits,
+        credits = c.credits + excluded.credits,
+        closing_balance = excluded.closing_balance,
+        last_sequence = excluded.last_sequence,
+        updated_at = excluded.updated_at
+""")
+
+# Current token count per holder, for several properties
+_HOLDINGS_SQL = text(f"""
+    SELECT property_id, owner_id, sum(end_number - start_number + 1) AS tokens
+    FROM {TokenRange.__tablename__}
+    WHERE property_id = ANY(CAST(:property_ids AS integer[]))
+    GROUP BY property_id, owner_id
+    ORDER BY property_id, owner_id
+""")
+
+_KIND_BALANCES_SQL = text(f"""
+    SELECT property_id, kind, sum(balance) AS balance, count(*) AS accounts
+    FROM {ACCOUNTS}
+    WHERE property_id = ANY(CAST(:property_ids AS integer[]))
+    GROUP BY property_id, kind
+""")
+
+_HOLDER_BALANCES_SQL = text(f"""
+    SELECT user_id, balance FROM {ACCOUNTS}
+    WHERE property_id = :property_id AND kind = '{HOLDER_PAYABLE}' AND balance <> 0
+    ORDER BY user_id
+""")
+
+# Each account's checkpoint for the period, or its latest one before it
+_STATEMENT_SQL = text(f"""
+    SELECT DISTINCT ON (a.id) a.id, a.kind, a.user_id, c.period, c.opening_balance, c.debits, c.credits, c.closing_balance,
+        c.first_sequence, c.last_sequence
+    FROM {ACCOUNTS} a
+    JOIN {CHECKPOINTS} c ON c.account_id = a.id AND c.period <= :period
+    WHERE a.property_id = :property_id
+    ORDER BY a.id, c.period DESC
+""")
+
+_ACCOUNT_ENTRIES_SQL = text(f"""
+    SELECT e.sequence, e.amount, e.balance_after, t.id AS transaction_id, t.kind, t.description, t.reference, t.posted_at
+    FROM {LedgerEntry.__tablename__} e
+    JOIN {LedgerTransaction.__tablename__} t ON t.id = e.transaction_id
+    WHERE e.account_id = :account_id AND e.sequence BETWEEN :first AND :last
+    ORDER BY e.sequence
+    LIMIT :limit
+""")
+
+
+def current_period(now: Optional[datetime] = None) -> date:
+    """First day of the posting month (UTC)"""
+    return (now or datetime.now(timezone.utc)).date().replace(day=1)
+
+
+def allocate(amount: int, weights: np.ndarray) -> np.ndarray:
+    """Split amount in proportion to weights, exactly, by largest remainder"""
+    weights = np.asarray(weights, dtype=np.int64)
+    total = int(weights.sum())
+    if amount * total > INT64_MAX:
+        weights = weights.astype(object)
+    shares, remainders = np.divmod(weights * amount, total)
+    shortfall = amount - int(shares.sum())
+    shares[np.argsort(-remainders.astype(np.float64), kind="stable")[:shortfall]] += 1
+    return shares
+
+
+# Journal entries
+def rent_entry(property_id: int, amount: int, description: Optional[str] = None, reference: Optional[str] = None) -> JournalEntry:
+    return JournalEntry(property_id, "rent", [Posting(CASH, amount), Posting(RENTAL_INCOME, -amount)], description, reference)
+
+
+def expense_entry(property_id: int, amount: int, description: Optional[str] = None, reference: Optional[str] = None) -> JournalEntry:
+    return JournalEntry(property_id, "expense", [Posting(EXPENSES, amount), Posting(CASH, -amount)], description, reference)
+
+
+def distribution_entry(property_id: int, amount: int, user_ids: np.ndarray, tokens: np.ndarray, description: Optional[str] = None) -> JournalEntry:
+    """Declare amount payable to holders, pro rata to their tokens"""
+    shares = allocate(amount, tokens)
+    postings = [Posting(DISTRIBUTIONS, amount)] + [
+        Posting(HOLDER_PAYABLE, -int(share), int(user_id))
+        for user_id, share in zip(user_ids, shares)
+        if share
+    ]
+    return JournalEntry(property_id, "distribution", postings, description)
+
+
+def payout_entry(property_id: int, owed: Dict[int, int], reference: Optional[str] = None) -> JournalEntry:
+    """Pay holders what they are owed from the property's cash"""
+    postings = [Posting(HOLDER_PAYABLE, amount, user_id) for user_id, amount in owed.items()]
+    postings.append(Posting(CASH, -sum(owed.values())))
+    return JournalEntry(property_id, "payout", postings, "Holder payout", reference)
+
+
+def _check(entry: JournalEntry):
+    if entry.kind not in TRANSACTION_KINDS:
+        raise ValueError(f"Unknown transaction kind: {entry.kind}")
+    if not entry.postings or sum(posting.amount for posting in entry.postings) != 0:
+        raise ValueError(f"Unbalanced {entry.kind} entry for property {entry.property_id}")
+    for posting in entry.postings:
+        if posting.kind not in NORMAL_SIGN:
+            raise ValueError(f"Unknown account kind: {posting.kind}")
+        if (posting.user_id is not None) != (posting.kind == HOLDER_PAYABLE):
+            raise ValueError("Only holder accounts belong to a user")
+        if not posting.amount:
+            raise ValueError("Postings must move money")
+
+
+# Posting
+def post_entries(db: Session, entries: Sequence[JournalEntry], period: Optional[date] = None) -> List[int]:
+    """Post balanced journal entries in bulk; returns their transaction ids and the caller commits
+
+    Every posting stores its account's running balance and sequence, the
+    accounts keep their current balance, and each account's checkpoint for
+    the month accumulates debits, credits and the closing balance, so
+    balances and monthly statements never read the entries themselves.
+    The whole batch costs the same handful of statements however many
+    entries it holds.
+    """
+    if not entries:
+        return []
+    for entry in entries:
+        _check(entry)
+    period = period or current_period()
+
+    # Flatten postings and number the distinct accounts they touch
+    keys: Dict[Tuple[int, str, Optional[int]], int] = {}
+    positions, amounts, owners = [], [], []
+    for index, entry in enumerate(entries):
+        for posting in entry.postings:
+            positions.append(keys.setdefault((entry.property_id, posting.kind, posting.user_id), len(keys)))
+            amounts.append(posting.amount)
+            owners.append(index)
+
+    account_keys = {
+        "property_ids": [key[0] for key in keys],
+        "kinds": [key[1] for key in keys],
+        "user_ids": [key[2] for key in keys],
+    }
+    db.execute(_ENSURE_ACCOUNTS_SQL, account_keys)
+    account_ids = np.zeros(len(keys), dtype=np.int64)
+    opening = np.zeros(len(keys), dtype=np.int64)
+    entry_counts = np.zeros(len(keys), dtype=np.int64)
+    for row in db.execute(_LOCK_ACCOUNTS_SQL, account_keys):
+        position = keys[(row.property_id, row.kind, row.user_id)]
+        account_ids[position] = row.id
+        opening[position] = row.balance
+        entry_counts[position] = row.entry_count
+
+    # Running balance and sequence of every posting within its account, in posting order
+    positions = np.array(positions, dtype=np.int64)
+    amounts = np.array(amounts, dtype=np.int64)
+    order = np.argsort(positions, kind="stable")
+    grouped = positions[order]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    group_start = np.repeat(starts, np.diff(np.r_[starts, len(grouped)]))
+    running = np.cumsum(amounts[order])
+    running -= (running - amounts[order])[group_start]
+    balances = np.empty_like(amounts)
+    sequences = np.empty_like(amounts)
+    balances[order] = opening[grouped] + running
+    sequences[order] = entry_counts[grouped] + np.arange(len(grouped)) - group_start + 1
+
+    posted = np.bincount(positions, minlength=len(keys))
+    debits = np.zeros(len(keys), dtype=np.int64)
+    credits = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(debits, positions, np.maximum(amounts, 0))
+    np.add.at(credits, positions, np.maximum(-amounts, 0))
+    closing = opening + debits - credits
+
+    transaction_ids = [row[0] for row in db.execute(_TRANSACTION_IDS_SQL, {"count": len(entries)})]
+    db.execute(_INSERT_TRANSACTIONS_SQL, {
+        "period": period,
+        "ids": transaction_ids,
+        "property_ids": [entry.property_id for entry in entries],
+        "kinds": [entry.kind for entry in entries],
+        "descriptions": [entry.description for entry in entries],
+        "references": [entry.reference for entry in entries],
+    })
+    db.execute(_INSERT_ENTRIES_SQL, {
+        "period": period,
+        "transaction_ids": [transaction_ids[index] for index in owners],
+        "account_ids": account_ids[positions].tolist(),
+        "sequences": sequences.tolist(),
+        "amounts": amounts.tolist(),
+        "balances": balances.tolist(),
+    })
+    db.execute(_UPDATE_ACCOUNTS_SQL, {
+        "ids": account_ids.tolist(),
+        "balances": closing.tolist(),
+        "entry_counts": (entry_counts + posted).tolist(),
+    })
+    db.execute(_CHECKPOINTS_SQL, {
+        "period": period,
+        "account_ids": account_ids.tolist(),
+        "opening_balances": opening.tolist(),
+        "debits": debits.tolist(),
+        "credits": credits.tolist(),
+        "closing_balances": closing.tolist(),
+        "first_sequences": (entry_counts + 1).tolist(),
+        "last_sequences": (entry_counts + posted).tolist(),
+    })
+    return transaction_ids
+
+
+def _lock_properties(db: Session, property_ids: Sequence[int]):
+    """Serialize ledger runs per property; 404 when any is missing"""
+    found = {
+        row.id for row in db.query(Property.id).filter(
+            Property.id.in_(property_ids)
+        ).order_by(Property.id).with_for_update().all()
+    }
+    missing = sorted(set(property_ids) - found)
+    if missing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Properties not found: {missing}")
+
+
+def _available_cash(db: Session, property_ids: Sequence[int]) -> Dict[int, int]:
+    """Cash not yet owed to holders, per property (cents)"""
+    available = {property_id: 0 for property_id in property_ids}
+    for row in db.execute(_KIND_BALANCES_SQL, {"property_ids": list(property_ids)}):
+        if row.kind in (CASH, HOLDER_PAYABLE):
+            # Payables carry credit (negative) balances
+            available[row.property_id] += int(row.balance)
+    return available
+
+
+def _holdings(db: Session, property_ids: Sequence[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+    rows = db.execute(_HOLDINGS_SQL, {"property_ids": list(property_ids)}).all()
+    holdings: Dict[int, Tuple[List[int], List[int]]] = {}
+    for row in rows:
+        user_ids, tokens = holdings.setdefault(row.property_id, ([], []))
+        user_ids.append(row.owner_id)
+        tokens.append(int(row.tokens))
+    return {
+        property_id: (np.array(user_ids, dtype=np.int64), np.array(tokens, dtype=np.int64))
+        for property_id, (user_ids, tokens) in holdings.items()
+    }
+
+
+# Operations
+def record_rent(db: Session, property_id: int, amount: int, description: Optional[str] = None, reference: Optional[str] = None) -> int:
+    _lock_properties(db, [property_id])
+    return post_entries(db, [rent_entry(property_id, amount, description, reference)])[0]
+
+
+def record_expense(db: Session, property_id: int, amount: int, description: Optional[str] = None, reference: Optional[str] = None) -> int:
+    _lock_properties(db, [property_id])
+    return post_entries(db, [expense_entry(property_id, amount, description, reference)])[0]
+
+
+def distribute_income(db: Session, property_id: int, amount: Optional[int] = None, description: Optional[str] = None) -> Dict[str, Any]:
+    """Allocate cash to holders by their current tokens; all available cash when no amount is given"""
+    _lock_properties(db, [property_id])
+    available = _available_cash(db, [property_id])[property_id]
+    amount = available if amount is None else amount
+    if amount <= 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No cash available to distribute")
+    if amount > available:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Distribution exceeds available cash")
+
+    holdings = _holdings(db, [property_id]).get(property_id)
+    if holdings is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Property has no token holders")
+
+    entry = distribution_entry(property_id, amount, *holdings, description)
+    transaction_id = post_entries(db, [entry])[0]
+    return {"transaction_id": transaction_id, "amount_cents": amount, "holders": len(entry.postings) - 1}
+
+
+def pay_out_holders(db: Session, property_id: int, reference: Optional[str] = None) -> Dict[str, Any]:
+    """Pay every holder of a property what they are owed"""
+    _lock_properties(db, [property_id])
+    owed = {
+        row.user_id: -int(row.balance)
+        for row in db.execute(_HOLDER_BALANCES_SQL, {"property_id": property_id})
+    }
+    if not owed:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nothing owed to holders")
+
+    transaction_id = post_entries(db, [payout_entry(property_id, owed, reference)])[0]
+    return {"transaction_id": transaction_id, "amount_cents": sum(owed.values()), "holders": len(owed)}
+
+
+def run_monthly(db: Session, items: Sequence[Dict[str, Any]], description: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Rent, expenses and a distribution of what is left, for many properties in one posting
+
+    Each item has property_id, rent_cents, expense_cents and distribute.
+    A property with several items is handled in item order.
+    """
+    property_ids = sorted({item["property_id"] for item in items})
+    _lock_properties(db, property_ids)
+    available = _available_cash(db, property_ids)
+    holdings = _holdings(db, property_ids)
+
+    entries: List[JournalEntry] = []
+    summary = []
+    for item in items:
+        property_id = item["property_id"]
+        if item["rent_cents"]:
+            entries.append(rent_entry(property_id, item["rent_cents"], description))
+            available[property_id] += item["rent_cents"]
+        if item["expense_cents"]:
+            entries.append(expense_entry(property_id, item["expense_cents"], description))
+            available[property_id] -= item["expense_cents"]
+
+        distributed, holders = 0, 0
+        if item["distribute"] and available[property_id] > 0 and property_id in holdings:
+            entry = distribution_entry(property_id, available[property_id], *holdings[property_id], description)
+            entries.append(entry)
+            distributed, holders = available[property_id], len(entry.postings) - 1
+            available[property_id] = 0
+
+        summary.append({
+            "property_id": property_id,
+            "rent_cents": item["rent_cents"],
+            "expense_cents": item["expense_cents"],
+            "distributed_cents": distributed,
+            "holders": holders
+        })
+
+    post_entries(db, entries)
+    logger.info(f"Ledger run posted {len(entries)} entries for {len(property_ids)} properties")
+    return summary
+
+
+# Queries
+def get_property_balances(db: Session, property_id: int) -> Dict[str, Any]:
+    """Current balance of each account kind (holder accounts summed), read from the running totals"""
+    balances = {kind: 0 for kind in NORMAL_SIGN}
+    holder_accounts = 0
+    for row in db.execute(_KIND_BALANCES_SQL, {"property_ids": [property_id]}):
+        balances[row.kind] = NORMAL_SIGN[row.kind] * int(row.balance)
+        if row.kind == HOLDER_PAYABLE:
+            holder_accounts = row.accounts
+
+    return {
+        "property_id": property_id,
+        "balances_cents": balances,
+        "available_cents": balances[CASH] - balances[HOLDER_PAYABLE],
+        "holder_accounts": holder_accounts
+    }
+
+
+def get_property_statement(db: Session, property_id: int, period: date) -> Dict[str, Any]:
+    """A month's opening and closing balances, debits and credits per account kind, from checkpoints"""
+    totals = {
+        kind: {"opening_cents": 0, "debits_cents": 0, "credits_cents": 0, "closing_cents": 0, "entries": 0}
+        for kind in NORMAL_SIGN
+    }
+    for row in db.execute(_STATEMENT_SQL, {"property_id": property_id, "period": period}):
+        sign = NORMAL_SIGN[row.kind]
+        kind = totals[row.kind]
+        if row.period == period:
+            kind["opening_cents"] += sign * row.opening_balance
+            kind["debits_cents"] += row.debits
+            kind["credits_cents"] += row.credits
+            kind["entries"] += row.last_sequence - row.first_sequence + 1
+        else:
+            # No activity this month; the account stands where it closed
+            kind["opening_cents"] += sign * row.closing_balance
+        kind["closing_cents"] += sign * row.closing_balance
+
+    return {"property_id": property_id, "period": period.isoformat(), "accounts": totals}
+
+
+def get_account_entries(db: Session, account_id: int, period: date, after_sequence: int = 0, limit: int = 100) -> Dict[str, Any]:
+    """An account's postings in a month, located through its checkpoint's sequence range"""
+    checkpoint = db.get(LedgerCheckpoint, (account_id, period))
+    if checkpoint is None:
+        return {"account_id": account_id, "period": period.isoformat(), "entries": [], "next_sequence": None}
+
+    rows = db.execute(_ACCOUNT_ENTRIES_SQL, {
+        "account_id": account_id,
+        "first": max(checkpoint.first_sequence, after_sequence + 1),
+        "last": checkpoint.last_sequence,
+        "limit": limit,
+    }).all()
+    entries = [dict(row._mapping) for row in rows]
+    more = bool(rows) and rows[-1].sequence < checkpoint.last_sequence
+    return {
+        "account_id": account_id,
+        "period": period.isoformat(),
+        "entries": entries,
+        "next_sequence": rows[-1].sequence if more else None
+    }
+
+
+def get_user_ledger(db: Session, user_id: int) -> Dict[str, Any]:
+    """What each property owes the user, and their ledger account ids"""
+    accounts = db.query(LedgerAccount).filter(
+        LedgerAccount.user_id == user_id,
+        LedgerAccount.kind == HOLDER_PAYABLE
+    ).order_by(LedgerAccount.property_id).all()
+
+    return {
+        "user_id": user_id,
+        "owed_cents": sum(-account.balance for account in accounts),
+        "properties": [
+            {"property_id": account.property_id, "account_id": account.id, "owed_cents": -account.balance}
+            for account in accounts
+        ]
+    }
@@ -0,0 +1,619 @@
+import os
+import time
+import fcntl
+import heapq
+import logging
+import threading
+from collections import defaultdict, deque
+from decimal import Decimal
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.database import SessionLocal
+from app.models.kyc import LegacyListing, OrderFill
+from app.models.user import User
+from app.services.portfolio_rollups import remove_tokens
+from app.services.token_ownership import get_holdings, transfer_tokens
+from app.services.token_reservations import create_investment
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+ORDER_LOG_PATH = os.getenv("ORDER_LOG_PATH", "data/order_book.log")
+ORDER_LOG_FSYNC = os.getenv("ORDER_LOG_FSYNC", "false").lower() == "true"  # fsync every record, not just flush
+
+BUY = "buy"
+SELL = "sell"
+
+
+class Order:
+    """A limit order; prices are integer cents"""
+
+    __slots__ = ("order_id", "property_id", "user_id", "side", "price", "quantity", "remaining", "status", "created_at")
+
+    def __init__(self, order_id: int, property_id: int, user_id: int, side: str, price: int, quantity: int, created_at: float):
+        self.order_id = order_id
+        self.property_id = property_id
+        self.user_id = user_id
+        self.side = side
+        self.price = price
+        self.quantity = quantity
+        self.remaining = quantity
+        self.status = "open"  # open, filled, cancelled
+        self.created_at = created_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "order_id": self.order_id,
+            "property_id": self.property_id,
+            "user_id": self.user_id,
+            "side": self.side,
+            "price": self.price / 100,
+            "quantity": self.quantity,
+            "filled_quantity": self.quantity - self.remaining,
+            "remaining_quantity": self.remaining,
+            "status": self.status,
+            "created_at": self.created_at
+        }
+
+
+class Trade:
+    """A fill between a resting (maker) order and an incoming (taker) order, at the maker's price"""
+
+    __slots__ = ("property_id", "price", "quantity", "buy_order_id", "sell_order_id", "buyer_id", "seller_id", "taker_side")
+
+    def __init__(self, property_id: int, price: int, quantity: int, buy: Order, sell: Order, taker_side: str):
+        self.property_id = property_id
+        self.price = price
+        self.quantity = quantity
+        self.buy_order_id = buy.order_id
+        self.sell_order_id = sell.order_id
+        self.buyer_id = buy.user_id
+        self.seller_id = sell.user_id
+        self.taker_side = taker_side
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "property_id": self.property_id,
+            "price": self.price / 100,
+            "quantity": self.quantity,
+            "buy_order_id": self.buy_order_id,
+            "sell_order_id": self.sell_order_id,
+            "buyer_id": self.buyer_id,
+            "seller_id": self.seller_id,
+            "taker_side": self.taker_side
+        }
+
+
+class OrderBook:
+    """Price-time priority limit order book for one property
+
+    Each side keeps a FIFO queue per price level and a heap of level prices
+    (bids negated), so adding a level is O(log n) and the best price is O(1).
+    Cancelling only marks the order and adjusts the level volume; dead
+    orders are dropped when they reach the front of their queue. Each side
+    also keeps its total open quantity and a version that changes whenever
+    its open orders do, so summaries of a side can be cached until then.
+    """
+
+    def __init__(self, property_id: int):
+        self.property_id = property_id
+        self.orders: Dict[int, Order] = {}  # Open orders by id
+        self.open_sell_quantity: Dict[int, int] = defaultdict(int)  # Tokens committed to asks, per user
+        self.open_buy_value: Dict[int, int] = defaultdict(int)  # Cents committed to bids, per user
+        self.closed: List[int] = []  # Resting orders filled or cancelled since the caller last cleared this
+        self.quantity: Dict[str, int] = {BUY: 0, SELL: 0}  # Open quantity per side
+        self.version: Dict[str, int] = {BUY: 0, SELL: 0}  # Bumped by every change to a side's open orders
+        self._levels: Dict[str, Dict[int, Deque[Order]]] = {BUY: {}, SELL: {}}
+        self._volume: Dict[str, Dict[int, int]] = {BUY: {}, SELL: {}}
+        self._prices: Dict[str, List[int]] = {BUY: [], SELL: []}
+
+    def best_price(self, side: str) -> Optional[int]:
+        heap = self._prices[side]
+        levels = self._levels[side]
+        while heap:
+            price = -heap[0] if side == BUY else heap[0]
+            queue = levels[price]
+            while queue and queue[0].status != "open":
+                queue.popleft()
+            if queue:
+                return price
+            heapq.heappop(heap)
+            del levels[price]
+            self._volume[side].pop(price, None)
+        return None
+
+    def _rest(self, order: Order):
+        levels = self._levels[order.side]
+        queue = levels.get(order.price)
+        if queue is None:
+            queue = levels[order.price] = deque()
+            heapq.heappush(self._prices[order.side], -order.price if order.side == BUY else order.price)
+        queue.append(order)
+        volume = self._volume[order.side]
+        volume[order.price] = volume.get(order.price, 0) + order.remaining
+        self.quantity[order.side] += order.remaining
+        self.version[order.side] += 1
+        self.orders[order.order_id] = order
+        if order.side == SELL:
+            self.open_sell_quantity[order.user_id] += order.remaining
+        else:
+            self.open_buy_value[order.user_id] += order.remaining * order.price
+
+    def _release(self, order: Order, quantity: int):
+        # Take quantity of a resting order off its level and its owner's commitments
+        self._volume[order.side][order.price] -= quantity
+        self.quantity[order.side] -= quantity
+        self.version[order.side] += 1
+        if order.side == SELL:
+            commitments, amount = self.open_sell_quantity, quantity
+        else:
+            commitments, amount = self.open_buy_value, quantity * order.price
+        committed = commitments[order.user_id] - amount
+        if committed:
+            commitments[order.user_id] = committed
+        else:
+            del commitments[order.user_id]
+
+    def _close(self, order: Order, order_status: str):
+        order.status = order_status
+        del self.orders[order.order_id]
+        self.closed.append(order.order_id)
+
+    def cancel(self, order: Order):
+        self._release(order, order.remaining)
+        self._close(order, "cancelled")
+
+    def _walk_prices(self, side: str):
+        """Level prices on a side, best first, read from the price heap without popping it
+
+        A heap's children never beat their parent, so a small frontier heap
+        of (price key, position) yields the prices in order while visiting
+        only the levels the caller actually consumes.
+        """
+        heap = self._prices[side]
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            key, position = heapq.heappop(frontier)
+            yield -key if side == BUY else key
+            for child in (2 * position + 1, 2 * position + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def preview(self, order: Order) -> List[Trade]:
+        """The fills match() would make for an incoming order, without changing the book"""
+        trades = []
+        remaining = order.remaining
+        opposite = SELL if order.side == BUY else BUY
+        levels = self._levels[opposite]
+        for price in self._walk_prices(opposite):
+            if not remaining or (price > order.price if order.side == BUY else price < order.price):
+                break
+            for resting in levels[price]:
+                # Dead orders wait at the front of their queue; the user's own are cancelled by match()
+                if resting.status != "open" or resting.user_id == order.user_id:
+                    continue
+                quantity = min(resting.remaining, remaining)
+                remaining -= quantity
+                buy, sell = (order, resting) if order.side == BUY else (resting, order)
+                trades.append(Trade(self.property_id, price, quantity, buy, sell, order.side))
+                if not remaining:
+                    break
+        return trades
+
+    def match(self, order: Order) -> List[Trade]:
+        """Fill an incoming order against the opposite side, then rest any remainder"""
+        trades = []
+        opposite = SELL if order.side == BUY else BUY
+        while order.remaining:
+            price = self.best_price(opposite)
+            if price is None or (price > order.price if order.side == BUY else price < order.price):
+                break
+            resting = self._levels[opposite][price][0]
+
+            # Self-trade prevention: the user's older resting order is cancelled
+            if resting.user_id == order.user_id:
+                self.cancel(resting)
+                continue
+
+            quantity = min(resting.remaining, order.remaining)
+            self._release(resting, quantity)
+            resting.remaining -= quantity
+            order.remaining -= quantity
+            if not resting.remaining:
+                self._close(resting, "filled")
+            buy, sell = (order, resting) if order.side == BUY else (resting, order)
+            trades.append(Trade(self.property_id, price, quantity, buy, sell, order.side))
+
+        if order.remaining:
+            self._rest(order)
+        else:
+            order.status = "filled"
+        return trades
+
+    def levels(self, side: str) -> List[Tuple[int, int]]:
+        """(price, open quantity) of every level on a side, best price first"""
+        volume = self._volume[side]
+        return sorted(((price, quantity) for price, quantity in volume.items() if quantity > 0), reverse=side == BUY)
+
+    def best_orders(self, side: str, limit: int) -> List[Order]:
+        """The first ``limit`` open orders on a side, in price-time priority"""
+        orders = []
+        for price in self._walk_prices(side):
+            for order in self._levels[side][price]:
+                if order.status == "open":
+                    orders.append(order)
+                    if len(orders) == limit:
+                        return orders
+        return orders
+
+    def depth(self, levels: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        """Aggregated open quantity for the best ``levels`` prices on each side"""
+        def side_depth(side: str, best) -> List[Dict[str, Any]]:
+            volume = self._volume[side]
+            prices = best(levels, (price for price, quantity in volume.items() if quantity > 0))
+            return [{"price": price / 100, "quantity": volume[price]} for price in prices]
+
+        return {
+            "bids": side_depth(BUY, heapq.nlargest),
+            "asks": side_depth(SELL, heapq.nsmallest)
+        }
+
+
+class OrderBookService:
+    """In-memory order books for every property, backed by an append-only order log
+
+    Every accepted placement and cancellation is appended to the log before
+    it is applied. Matching is deterministic, so replaying the log on
+    startup rebuilds the exact books, including fills. A placement's fills
+    are settled and committed in the database before the placement is
+    logged, so a failed settlement leaves neither the book nor the log changed.
+
+    Placements and cancellations for one property are serialized by that
+    property's lock, held through settlement so the book cannot change
+    between preview and apply. Properties settle concurrently; the service
+    lock is only held to append a record and apply it, and by readers.
+
+    The books and the log belong to one process: run the API with a single
+    worker. Separate workers would each match against a book of their own
+    and interleave records in the same log file, so open() takes an
+    exclusive lock on the log and refuses to start while another process
+    holds it.
+    """
+
+    def __init__(self, log_path: Optional[str] = ORDER_LOG_PATH, fsync: bool = ORDER_LOG_FSYNC):
+        self.log_path = log_path
+        self.fsync = fsync
+        self.books: Dict[int, OrderBook] = {}
+        self._order_books: Dict[int, OrderBook] = {}  # Open order id -> its book
+        self._next_id = 1
+        self._log = None
+        self._log_lock = None  # Held for as long as the service is open
+        self._opened = False
+        self._loaded = False  # The log has been replayed; reopening only resumes appending
+        self._lock = threading.Lock()  # Guards the books, the log and order ids
+        self._property_locks: Dict[int, threading.Lock] = defaultdict(threading.Lock)
+
+    def book(self, property_id: int) -> OrderBook:
+        book = self.books.get(property_id)
+        if book is None:
+            book = self.books[property_id] = OrderBook(property_id)
+        return book
+
+    def _property_lock(self, property_id: int) -> threading.Lock:
+        with self._lock:
+            return self._property_locks[property_id]
+
+    # Log
+    def open(self):
+        """Replay the order log and start appending to it"""
+        with self._lock:
+            if self._opened:
+                return
+            if self.log_path:
+                directory = os.path.dirname(self.log_path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._acquire_log_lock()
+                if not self._loaded and os.path.exists(self.log_path):
+                    self._replay()
+                self._log = open(self.log_path, "ab")
+            self._opened = self._loaded = True
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+            if self._log_lock:
+                self._log_lock.close()  # Closing the descriptor releases the flock
+                self._log_lock = None
+            self._opened = False
+
+    def _acquire_log_lock(self):
+        # A separate lock file, since compact() swaps the log for a new inode
+        lock_path = f"{self.log_path}.lock"
+        lock_file = open(lock_path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Order log {self.log_path} is locked by another process ({lock_path}); "
+                "run the API with a single worker"
+            )
+        self._log_lock = lock_file
+
+    def _append(self, record: Dict[str, Any]):
+        if self._log is None:
+            return
+        self._log.write(orjson.dumps(record) + b"\n")
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+
+    def _replay(self):
+        records = 0
+        with open(self.log_path, "rb") as log:
+            for line in log:
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A torn final write from a crash; everything before it was applied
+                    logger.warning(f"Ignoring unreadable order log record: {line[:80]!r}")
+                    continue
+                if record["op"] == "place":
+                    self._apply_place(record)
+                elif record["op"] == "cancel":
+                    order_book = self._order_books.get(record["order_id"])
+                    if order_book:
+                        self._apply_cancel(order_book, record["order_id"])
+                self._next_id = max(self._next_id, record.get("next_order_id", 0), record.get("order_id", 0) + 1)
+                records += 1
+        logger.info(f"Replayed {records} order log records; {len(self._order_books)} open orders")
+
+    def compact(self):
+        """Rewrite the log as just the open orders (in priority order) so replay stays short"""
+        with self._lock:
+            if not self.log_path:
+                return
+            temp_path = f"{self.log_path}.compact"
+            with open(temp_path, "wb") as log:
+                log.write(orjson.dumps({"op": "checkpoint", "next_order_id": self._next_id}) + b"\n")
+                # Order ids follow arrival, so replaying in id order restores time priority
+                for order_id in sorted(self._order_books):
+                    order = self._order_books[order_id].orders[order_id]
+                    log.write(orjson.dumps(self._place_record(order, order.remaining)) + b"\n")
+                log.flush()
+                os.fsync(log.fileno())
+            if self._log:
+                self._log.close()
+            os.replace(temp_path, self.log_path)
+            self._log = open(self.log_path, "ab") if self._opened else None
+
+    # Operations
+    @staticmethod
+    def _place_record(order: Order, quantity: int) -> Dict[str, Any]:
+        return {
+            "op": "place",
+            "order_id": order.order_id,
+            "property_id": order.property_id,
+            "user_id": order.user_id,
+            "side": order.side,
+            "price": order.price,
+            "quantity": quantity,
+            "created_at": order.created_at
+        }
+
+    def _apply_place(self, record: Dict[str, Any]) -> Tuple[Order, List[Trade]]:
+        order_book = self.book(record["property_id"])
+        order = Order(
+            record["order_id"],
+            record["property_id"],
+            record["user_id"],
+            record["side"],
+            record["price"],
+            record["quantity"],
+            record["created_at"]
+        )
+        trades = order_book.match(order)
+        # Resting orders that were filled or cancelled by self-trade prevention
+        for order_id in order_book.closed:
+            self._order_books.pop(order_id, None)
+        order_book.closed.clear()
+        if order.status == "open":
+            self._order_books[order.order_id] = order_book
+        return order, trades
+
+    def _apply_cancel(self, order_book: OrderBook, order_id: int) -> Order:
+        order = order_book.orders[order_id]
+        order_book.cancel(order)
+        order_book.closed.clear()
+        self._order_books.pop(order_id, None)
+        return order
+
+    def place(
+        self,
+        property_id: int,
+        user_id: int,
+        side: str,
+        price: int,
+        quantity: int,
+        settle: Optional[Callable[[Order, List[Trade]], None]] = None
+    ) -> Tuple[Order, List[Trade]]:
+        """Match, log and apply a limit order; returns the order and its fills
+
+        ``settle`` receives the fills before anything changes and must make
+        them durable (settle_trades, then commit). If it raises, the order
+        is neither logged nor applied.
+        """
+        if side not in (BUY, SELL):
+            raise ValueError(f"Unknown side {side}")
+        if price <= 0 or quantity <= 0:
+            raise ValueError("Price and quantity must be positive")
+
+        with self._property_lock(property_id):
+            with self._lock:
+                if not self._opened:
+                    raise RuntimeError("Order book service is not open")
+                # Ids only grow under the property lock, so within a book they follow log order
+                order = Order(self._next_id, property_id, user_id, side, price, quantity, time.time())
+                self._next_id += 1
+                trades = self.book(property_id).preview(order)
+            if settle is not None:
+                settle(order, trades)
+
+            record = self._place_record(order, quantity)
+            with self._lock:
+                try:
+                    self._append(record)
+                except Exception:
+                    # The fills are already committed, so the book must still apply them
+                    logger.exception(f"Order {order.order_id} settled but not logged: {record}")
+                return self._apply_place(record)
+
+    def cancel(self, order_id: int, user_id: Optional[int] = None) -> Order:
+        """Log and cancel an open order, optionally only if it belongs to ``user_id``"""
+        order = self.get_order(order_id)
+        if order is None or (user_id is not None and order.user_id != user_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Open order not found")
+
+        # Waits out a placement settling against this book, which may fill the order
+        with self._property_lock(order.property_id):
+            with self._lock:
+                order_book = self._order_books.get(order_id)
+                if order_book is None:
+                    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Open order not found")
+                self._append({"op": "cancel", "order_id": order_id})
+                return self._apply_cancel(order_book, order_id)
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        with self._lock:
+            order_book = self._order_books.get(order_id)
+            return order_book.orders.get(order_id) if order_book else None
+
+    def user_orders(self, user_id: int, property_id: Optional[int] = None) -> List[Order]:
+        with self._lock:
+            if property_id is None:
+                books = list(self.books.values())
+            else:
+                books = [self.books[property_id]] if property_id in self.books else []
+            return [order for book in books for order in book.orders.values() if order.user_id == user_id]
+
+    def version(self, property_id: int, side: str) -> int:
+        with self._lock:
+            order_book = self.books.get(property_id)
+            return order_book.version[side] if order_book else 0
+
+    def side_snapshot(self, property_id: int, side: str, limit: int) -> Tuple[int, int, List[Tuple[int, int]], List[Order]]:
+        """(version, open quantity, levels, first ``limit`` orders) of one side, read together"""
+        with self._lock:
+            order_book = self.books.get(property_id)
+            if order_book is None:
+                return 0, 0, [], []
+            return order_book.version[side], order_book.quantity[side], order_book.levels(side), order_book.best_orders(side, limit)
+
+    def depth(self, property_id: int, levels: int = 20) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            order_book = self.books.get(property_id)
+            return order_book.depth(levels) if order_book else {"bids": [], "asks": []}
+
+    def open_sell_quantity(self, property_id: int, user_id: int) -> int:
+        with self._lock:
+            order_book = self.books.get(property_id)
+            return order_book.open_sell_quantity.get(user_id, 0) if order_book else 0
+
+    def open_buy_value(self, user_id: int) -> int:
+        """Cents the user's open bids commit, across every property"""
+        with self._lock:
+            return sum(order_book.open_buy_value.get(user_id, 0) for order_book in self.books.values())
+
+
+def settle_trades(db: Session, order: Order, trades: List[Trade]):
+    """Move the traded tokens to buyers and their price to sellers; the caller commits
+
+    Each fill is an investment for the buyer. The seller's side is an
+    OrderFill that takes the tokens out of their portfolio at its average
+    cost. Runs before the book changes (see OrderBookService.place).
+    """
+    for trade in trades:
+        transfer_tokens(db, trade.property_id, trade.seller_id, trade.buyer_id, trade.quantity)
+
+        token_price = Decimal(trade.price) / 100
+        amount = token_price * trade.quantity
+        paid = db.execute(
+            update(User)
+            .where(User.id == trade.buyer_id, User.cash_balance >= amount)
+            .values(cash_balance=User.cash_balance - amount)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        if paid is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient funds")
+        db.execute(
+            update(User)
+            .where(User.id == trade.seller_id)
+            .values(cash_balance=User.cash_balance + amount)
+            .execution_options(synchronize_session=False)
+        )
+
+        create_investment(db, trade.buyer_id, trade.property_id, trade.quantity, token_price, None)
+        db.add(OrderFill(
+            property_id=trade.property_id,
+            buy_order_id=trade.buy_order_id,
+            sell_order_id=trade.sell_order_id,
+            buyer_id=trade.buyer_id,
+            seller_id=trade.seller_id,
+            quantity=trade.quantity,
+            price=token_price,
+            seller_cost_basis=remove_tokens(db, trade.seller_id, trade.property_id, trade.quantity)
+        ))
+
+def convert_legacy_listings() -> int:
+    """Place the listings migration 0008 carried over from per-token rows as sell orders
+
+    Oldest listings go first. Each row is deleted in the transaction that
+    settles its order's fills, so a restart only places what is left.
+    Tokens the owner no longer holds outside other asks are left out.
+    Blocking; call once the order book service is open.
+    """
+    placed = 0
+    db = SessionLocal()
+    try:
+        listings = db.query(
+            LegacyListing.id, LegacyListing.property_id, LegacyListing.owner_id, LegacyListing.price, LegacyListing.quantity
+        ).order_by(LegacyListing.listed_at.asc().nulls_last(), LegacyListing.id).all()
+        for listing_id, property_id, owner_id, price, quantity in listings:
+            holdings = get_holdings(db, owner_id, property_id=property_id)
+            held = holdings[0]["token_count"] if holdings else 0
+            quantity = min(quantity, held - order_book_service.open_sell_quantity(property_id, owner_id))
+
+            def settle(order, trades):
+                settle_trades(db, order, trades)
+                db.query(LegacyListing).filter(LegacyListing.id == listing_id).delete()
+                db.commit()
+
+            try:
+                if quantity <= 0:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tokens no longer held")
+                order_book_service.place(property_id, owner_id, SELL, int(price * 100), quantity, settle)
+                placed += 1
+            except HTTPException as e:
+                db.rollback()
+                logger.warning(f"Dropping legacy listing {listing_id}: {e.detail}")
+                db.query(LegacyListing).filter(LegacyListing.id == listing_id).delete()
+                db.commit()
+    finally:
+        db.close()
+    if placed:
+        logger.info(f"Placed {placed} legacy listings as sell orders")
+    return placed
+
+# Global instance
+order_book_service = OrderBookService()
@@ -0,0 +1,233 @@
+import logging
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.kyc import OrderFill, TokenTransfer
+from app.models.portfolio import PortfolioPosition, PortfolioSummary
+
+logger = logging.getLogger(__name__)
+
+POSITIONS = PortfolioPosition.__tablename__
+SUMMARIES = PortfolioSummary.__tablename__
+TRANSFERS = TokenTransfer.__tablename__
+FILLS = OrderFill.__tablename__
+
+# Add tokens (and their cost) to the user's position and summary in one statement.
+# A position opens when it goes from no tokens to some, whether the row is new
+# or was emptied by earlier transfers, which is when properties_count goes up.
+_ADD_SQL = text(f"""
+    WITH position AS (
+        INSERT INTO {POSITIONS} AS p (user_id, property_id, tokens_purchased, total_invested, investment_count, updated_at)
+        VALUES (:user_id, :property_id, :tokens, :amount, :investments, now())
+        ON CONFLICT (user_id, property_id) DO UPDATE SET
+            tokens_purchased = p.tokens_purchased + excluded.tokens_purchased,
+            total_invested = p.total_invested + excluded.total_invested,
+            investment_count = p.investment_count + excluded.investment_count,
+            updated_at = now()
+        RETURNING (tokens_purchased = :tokens) AS opened
+    )
+    INSERT INTO {SUMMARIES} AS s (user_id, total_invested, total_tokens, properties_count, investment_count, updated_at)
+    SELECT :user_id, :amount, :tokens, CASE WHEN opened THEN 1 ELSE 0 END, :investments, now() FROM position
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_invested = s.total_invested + excluded.total_invested,
+        total_tokens = s.total_tokens + excluded.total_tokens,
+        properties_count = s.properties_count + excluded.properties_count,
+        investment_count = s.investment_count + excluded.investment_count,
+        updated_at = now()
+""")
+
+# Take tokens out of a position at its average cost and return that cost basis.
+# Emptying the position takes all of its remaining cost and closes it.
+_REMOVE_SQL = text(f"""
+    WITH held AS (
+        SELECT tokens_purchased, total_invested, LEAST(:tokens, tokens_purchased) AS tokens
+        FROM {POSITIONS}
+        WHERE user_id = :user_id AND property_id = :property_id AND tokens_purchased > 0
+        FOR UPDATE
+    ),
+    removed AS (
+        SELECT tokens,
+               CASE WHEN tokens = tokens_purchased THEN total_invested
+                    ELSE round(total_invested * tokens / tokens_purchased, 2) END AS cost_basis,
+               tokens = tokens_purchased AS closed
+        FROM held
+    ),
+    position AS (
+        UPDATE {POSITIONS} p SET
+            tokens_purchased = p.tokens_purchased - removed.tokens,
+            total_invested = p.total_invested - removed.cost_basis,
+            updated_at = now()
+        FROM removed
+        WHERE p.user_id = :user_id AND p.property_id = :property_id
+    ),
+    summary AS (
+        UPDATE {SUMMARIES} s SET
+            total_tokens = s.total_tokens - removed.tokens,
+            total_invested = s.total_invested - removed.cost_basis,
+            properties_count = s.properties_count - CASE WHEN removed.closed THEN 1 ELSE 0 END,
+            updated_at = now()
+        FROM removed
+        WHERE s.user_id = :user_id
+    )
+    SELECT cost_basis FROM removed
+""")
+
+# Positions rebuilt from every source of tokens (optionally for one user):
+# investments (order book buys included), transfers in and out at the cost
+# basis they carried, and order book sales at the seller's cost basis
+_SOURCE_POSITIONS_SQL = f"""
+    SELECT user_id, property_id,
+           sum(tokens) AS tokens_purchased,
+           sum(amount) AS total_invested,
+           sum(investments) AS investment_count
+    FROM (
+        SELECT user_id, property_id, tokens_purchased AS tokens, total_amount AS amount, 1 AS investments
+        FROM investments
+        UNION ALL
+        SELECT to_user_id, property_id, quantity, cost_basis, 0
+        FROM {TRANSFERS}
+        UNION ALL
+        SELECT from_user_id, property_id, -quantity, -cost_basis, 0
+        FROM {TRANSFERS}
+        WHERE from_user_id IS NOT NULL
+        UNION ALL
+        SELECT seller_id, property_id, -quantity, -seller_cost_basis, 0
+        FROM {FILLS}
+    ) movements
+    WHERE (CAST(:user_id AS integer) IS NULL OR user_id = :user_id)
+    GROUP BY user_id, property_id
+"""
+
+_SUMMARY_COLUMNS = """
+    user_id,
+    sum(total_invested) AS total_invested,
+    sum(tokens_purchased) AS total_tokens,
+    count(*) FILTER (WHERE tokens_purchased > 0) AS properties_count,
+    sum(investment_count) AS investment_count
+"""
+
+_SOURCE_SUMMARIES_SQL = f"""
+    SELECT {_SUMMARY_COLUMNS}
+    FROM {POSITIONS}
+    WHERE (CAST(:user_id AS integer) IS NULL OR user_id = :user_id)
+    GROUP BY user_id
+"""
+
+# Users whose stored summary disagrees with their investments, transfers and sales
+_DRIFT_SQL = text(f"""
+    WITH source AS (
+        SELECT {_SUMMARY_COLUMNS}
+        FROM ({_SOURCE_POSITIONS_SQL}) positions
+        GROUP BY user_id
+    ),
+    stored AS (
+        SELECT user_id, total_invested, total_tokens, properties_count, investment_count
+        FROM {SUMMARIES}
+        WHERE (CAST(:user_id AS integer) IS NULL OR user_id = :user_id)
+    )
+    SELECT count(*) FROM source FULL JOIN stored USING (user_id)
+    WHERE (source.total_invested, source.total_tokens, source.properties_count, source.investment_count)
+          IS DISTINCT FROM
+          (stored.total_invested, stored.total_tokens, stored.properties_count, stored.investment_count)
+""")
+
+
+def apply_investment(db: Session, user_id: int, property_id: int, tokens: int, amount: Decimal):
+    """Add an investment to the user's rollups; runs in the caller's transaction
+
+    Anything that records an Investment (purchases, reservation
+    confirmations, a chain indexer) calls this in the same transaction.
+    """
+    db.execute(_ADD_SQL, {"user_id": user_id, "property_id": property_id, "tokens": tokens, "amount": amount, "investments": 1})
+
+
+def remove_tokens(db: Session, user_id: int, property_id: int, tokens: int) -> Decimal:
+    """Take tokens out of the user's rollups at the position's average cost; returns the cost basis removed"""
+    cost_basis = db.execute(_REMOVE_SQL, {"user_id": user_id, "property_id": property_id, "tokens": tokens}).scalar()
+    return cost_basis if cost_basis is not None else Decimal(0)
+
+
+def record_transfer(
+    db: Session,
+    property_id: int,
+    from_user_id: Optional[int],
+    to_user_id: int,
+    quantity: int,
+    cost_basis: Decimal = Decimal(0)
+) -> Decimal:
+    """Move tokens between users' rollups and record the movement; runs in the caller's transaction
+
+    A transfer carries the sender's average cost to the recipient. A mint
+    has no sender and brings in ``cost_basis``, what the tokens cost at mint.
+    Anything that moves token ranges outside a purchase calls this.
+    """
+    if from_user_id is not None:
+        cost_basis = remove_tokens(db, from_user_id, property_id, quantity)
+    db.execute(_ADD_SQL, {
+        "user_id": to_user_id,
+        "property_id": property_id,
+        "tokens": quantity,
+        "amount": cost_basis,
+        "investments": 0
+    })
+    db.add(TokenTransfer(
+        property_id=property_id,
+        from_user_id=from_user_id,
+        to_user_id=to_user_id,
+        quantity=quantity,
+        cost_basis=cost_basis
+    ))
+    return cost_basis
+
+
+def get_portfolio_summary(db: Session, user_id: int) -> Dict[str, Any]:
+    """Portfolio totals from the user's summary row"""
+    summary = db.get(PortfolioSummary, user_id)
+    if summary is None:
+        return {
+            "total_invested": Decimal(0),
+            "total_tokens": 0,
+            "properties_count": 0,
+            "investment_count": 0,
+            "updated_at": None
+        }
+    return {
+        "total_invested": summary.total_invested,
+        "total_tokens": summary.total_tokens,
+        "properties_count": summary.properties_count,
+        "investment_count": summary.investment_count,
+        "updated_at": summary.updated_at
+    }
+
+
+def reconcile_portfolios(db: Session, user_id: Optional[int] = None) -> Dict[str, int]:
+    """Rebuild rollups from investments, transfers and sales for one user (or everyone); the caller commits
+
+    The rollup tables are locked against concurrent purchases for the rest of
+    the transaction, so no investment lands between the rebuild and commit.
+    """
+    db.execute(text(f"LOCK TABLE {POSITIONS}, {SUMMARIES} IN SHARE ROW EXCLUSIVE MODE"))
+
+    params = {"user_id": user_id}
+    drifted = db.execute(_DRIFT_SQL, params).scalar()
+
+    user_filter = "WHERE user_id = :user_id" if user_id is not None else ""
+    db.execute(text(f"DELETE FROM {SUMMARIES} {user_filter}"), params)
+    db.execute(text(f"DELETE FROM {POSITIONS} {user_filter}"), params)
+    positions = db.execute(text(f"""
+        INSERT INTO {POSITIONS} (user_id, property_id, tokens_purchased, total_invested, investment_count, updated_at)
+        SELECT user_id, property_id, tokens_purchased, total_invested, investment_count, now()
+        FROM ({_SOURCE_POSITIONS_SQL}) source
+    """), params).rowcount
+    users = db.execute(text(f"""
+        INSERT INTO {SUMMARIES} (user_id, total_invested, total_tokens, properties_count, investment_count, updated_at)
+        SELECT user_id, total_invested, total_tokens, properties_count, investment_count, now()
+        FROM ({_SOURCE_SUMMARIES_SQL}) source
+    """), params).rowcount
+
+    if drifted:
+        logger.warning(f"Rebuilt portfolio rollups for {drifted} user(s) that had drifted from their investments, transfers and sales")
+    return {"users": users, "positions": positions, "drifted": drifted}
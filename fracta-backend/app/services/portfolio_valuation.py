@@ -0,0 +1,281 @@
+import os
+import asyncio
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.database import SessionLocal
+from app.models.portfolio import PortfolioSnapshot, PortfolioSummary
+from app.models.property import Property
+from app.models.kyc import TokenRange
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DAYS_PER_YEAR = 365
+SNAPSHOT_HOUR = int(os.getenv("PORTFOLIO_SNAPSHOT_HOUR", "0"))  # UTC hour the daily snapshot runs
+
+SNAPSHOTS = PortfolioSnapshot.__tablename__
+
+# Pricing inputs for every property, or only the listed ones, as parallel columns
+_PRICES_SQL = text(f"""
+    SELECT id, token_price, expected_yield, monthly_rent, occupancy_rate, total_tokens
+    FROM {Property.__tablename__}
+    WHERE (CAST(:property_ids AS integer[]) IS NULL OR id = ANY(CAST(:property_ids AS integer[])))
+    ORDER BY id
+""")
+
+# Cheap fingerprint of what one user's valuation depends on: their ranges and the properties' last edits
+_VERSION_SQL = text(f"""
+    SELECT count(r.id), max(r.id), coalesce(sum(r.end_number - r.start_number + 1), 0), max(p.updated_at)
+    FROM {TokenRange.__tablename__} r
+    JOIN {Property.__tablename__} p ON p.id = r.property_id
+    WHERE r.owner_id = :user_id
+""")
+
+# Current token counts per (owner, property), optionally for one owner
+_HOLDINGS_SQL = text(f"""
+    SELECT owner_id, property_id, sum(end_number - start_number + 1) AS tokens
+    FROM {TokenRange.__tablename__}
+    WHERE (CAST(:user_id AS integer) IS NULL OR owner_id = :user_id)
+    GROUP BY owner_id, property_id
+""")
+
+_INVESTED_SQL = text(f"""
+    SELECT user_id, total_invested FROM {PortfolioSummary.__tablename__}
+    WHERE (CAST(:user_id AS integer) IS NULL OR user_id = :user_id)
+""")
+
+# Latest snapshot before a date, per user
+_PREVIOUS_SQL = text(f"""
+    SELECT DISTINCT ON (user_id) user_id, snapshot_date, accrued_yield_cents, daily_income_cents
+    FROM {SNAPSHOTS}
+    WHERE snapshot_date < :snapshot_date
+      AND (CAST(:user_id AS integer) IS NULL OR user_id = :user_id)
+    ORDER BY user_id, snapshot_date DESC
+""")
+
+_UPSERT_SQL = text(f"""
+    INSERT INTO {SNAPSHOTS} AS s
+        (user_id, snapshot_date, total_tokens, invested_cents, value_cents, accrued_yield_cents, daily_income_cents)
+    SELECT user_id, :snapshot_date, total_tokens, invested_cents, value_cents, accrued_yield_cents, daily_income_cents
+    FROM unnest(
+        CAST(:user_ids AS integer[]),
+        CAST(:total_tokens AS bigint[]),
+        CAST(:invested_cents AS bigint[]),
+        CAST(:value_cents AS bigint[]),
+        CAST(:accrued_yield_cents AS double precision[]),
+        CAST(:daily_income_cents AS double precision[])
+    ) AS v(user_id, total_tokens, invested_cents, value_cents, accrued_yield_cents, daily_income_cents)
+    ON CONFLICT (user_id, snapshot_date) DO UPDATE SET
+        total_tokens = excluded.total_tokens,
+        invested_cents = excluded.invested_cents,
+        value_cents = excluded.value_cents,
+        accrued_yield_cents = excluded.accrued_yield_cents,
+        daily_income_cents = excluded.daily_income_cents
+""")
+
+_HISTORY_SQL = text(f"""
+    SELECT snapshot_date, total_tokens, invested_cents, value_cents, accrued_yield_cents
+    FROM {SNAPSHOTS}
+    WHERE user_id = :user_id AND snapshot_date BETWEEN :start AND :end
+    ORDER BY snapshot_date
+""")
+
+
+def _column(rows, index: int, dtype) -> np.ndarray:
+    # NULLs become NaN in float columns
+    return np.array([row[index] if row[index] is not None else np.nan for row in rows], dtype=dtype)
+
+
+class PortfolioValuationEngine:
+    """Values every holding against every property's pricing inputs in one pass
+
+    Holdings and property columns are loaded as NumPy arrays; each holding
+    finds its property with a sorted search and per-user totals are summed
+    with bincount, so valuing all users costs a few array operations.
+    Values are in cents.
+    """
+
+    def load_prices(self, db: Session, property_ids: Optional[List[int]] = None) -> Dict[str, np.ndarray]:
+        """Token value and daily income per token (cents) for every property, or the given ones"""
+        rows = db.execute(_PRICES_SQL, {"property_ids": property_ids}).all()
+        token_price = _column(rows, 1, np.float64)
+        expected_yield = _column(rows, 2, np.float64)
+        monthly_rent = _column(rows, 3, np.float64)
+        occupancy_rate = np.nan_to_num(_column(rows, 4, np.float64))
+        total_tokens = _column(rows, 5, np.float64)
+
+        # Rent actually collected when the property reports it, otherwise the advertised yield
+        rent_income = monthly_rent * 12 * occupancy_rate / 100 / np.where(total_tokens > 0, total_tokens, np.nan)
+        yield_income = token_price * np.nan_to_num(expected_yield) / 100
+        annual_income = np.where(np.isnan(rent_income), yield_income, rent_income)
+
+        return {
+            "property_ids": _column(rows, 0, np.int64),
+            "price_cents": np.rint(token_price * 100).astype(np.int64),
+            "daily_income_cents": annual_income * 100 / DAYS_PER_YEAR,
+        }
+
+    def value(self, db: Session, user_id: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Holdings value, income rate, tokens and invested capital per user (cents)"""
+        holdings = db.execute(_HOLDINGS_SQL, {"user_id": user_id}).all()
+        invested = db.execute(_INVESTED_SQL, {"user_id": user_id}).all()
+        # One user's valuation only needs the properties they hold
+        held = None if user_id is None else sorted({row.property_id for row in holdings})
+        prices = self.load_prices(db, held)
+
+        owner_ids = _column(holdings, 0, np.int64)
+        tokens = _column(holdings, 2, np.int64)
+        property_index = np.searchsorted(prices["property_ids"], _column(holdings, 1, np.int64))
+        investor_ids = _column(invested, 0, np.int64)
+
+        user_ids = np.union1d(owner_ids, investor_ids)
+        holder_index = np.searchsorted(user_ids, owner_ids)
+        size = len(user_ids)
+
+        # Exact integer cents for value; bincount weights are float64, which is exact far beyond any portfolio size
+        holding_value = tokens * prices["price_cents"][property_index]
+        holding_income = tokens * prices["daily_income_cents"][property_index]
+
+        invested_cents = np.zeros(size, dtype=np.int64)
+        invested_cents[np.searchsorted(user_ids, investor_ids)] = np.rint(
+            _column(invested, 1, np.float64) * 100
+        ).astype(np.int64)
+
+        return {
+            "user_ids": user_ids,
+            "total_tokens": np.bincount(holder_index, weights=tokens, minlength=size).astype(np.int64),
+            "value_cents": np.rint(np.bincount(holder_index, weights=holding_value, minlength=size)).astype(np.int64),
+            "daily_income_cents": np.bincount(holder_index, weights=holding_income, minlength=size),
+            "invested_cents": invested_cents,
+        }
+
+    def accrue(self, db: Session, valuation: Dict[str, np.ndarray], as_of: date, user_id: Optional[int] = None) -> np.ndarray:
+        """Yield accrued up to ``as_of``: the last snapshot's total plus its income rate since then"""
+        previous = db.execute(_PREVIOUS_SQL, {"snapshot_date": as_of, "user_id": user_id}).all()
+        accrued = np.zeros(len(valuation["user_ids"]))
+        if not previous:
+            return accrued
+
+        previous_ids = _column(previous, 0, np.int64)
+        days = np.array([(as_of - row.snapshot_date).days for row in previous], dtype=np.float64)
+        earned = _column(previous, 2, np.float64) + _column(previous, 3, np.float64) * days
+
+        # Users left with neither holdings nor investments are no longer valued
+        present = np.isin(previous_ids, valuation["user_ids"])
+        accrued[np.searchsorted(valuation["user_ids"], previous_ids[present])] = earned[present]
+        return accrued
+
+    def snapshot(self, db: Session, snapshot_date: Optional[date] = None) -> int:
+        """Value every user and upsert their row for the day; the caller commits"""
+        snapshot_date = snapshot_date or datetime.now(timezone.utc).date()
+        valuation = self.value(db)
+        accrued = self.accrue(db, valuation, snapshot_date)
+
+        db.execute(_UPSERT_SQL, {
+            "snapshot_date": snapshot_date,
+            "user_ids": valuation["user_ids"].tolist(),
+            "total_tokens": valuation["total_tokens"].tolist(),
+            "invested_cents": valuation["invested_cents"].tolist(),
+            "value_cents": valuation["value_cents"].tolist(),
+            "accrued_yield_cents": accrued.tolist(),
+            "daily_income_cents": valuation["daily_income_cents"].tolist(),
+        })
+        return len(valuation["user_ids"])
+
+    def user_version(self, db: Session, user_id: int) -> Tuple[Any, ...]:
+        """Everything value_user depends on besides the portfolio summary, from one indexed read
+
+        Accrual moves on daily, so the valuation date is part of it.
+        """
+        return (datetime.now(timezone.utc).date(), *db.execute(_VERSION_SQL, {"user_id": user_id}).one())
+
+    def value_user(self, db: Session, user_id: int) -> Dict[str, Any]:
+        """Live valuation of one user's portfolio (cents)"""
+        today = datetime.now(timezone.utc).date()
+        valuation = self.value(db, user_id)
+        if not len(valuation["user_ids"]):
+            return {"total_tokens": 0, "invested_cents": 0, "value_cents": 0, "accrued_yield_cents": 0.0, "daily_income_cents": 0.0}
+
+        accrued = self.accrue(db, valuation, today, user_id)[0]
+        return {
+            "total_tokens": int(valuation["total_tokens"][0]),
+            "invested_cents": int(valuation["invested_cents"][0]),
+            "value_cents": int(valuation["value_cents"][0]),
+            "accrued_yield_cents": float(accrued),
+            "daily_income_cents": float(valuation["daily_income_cents"][0]),
+        }
+
+    def history(self, db: Session, user_id: int, start: date, end: date) -> Dict[str, list]:
+        """Daily snapshots in a date range as columns, ready for charting"""
+        rows = db.execute(_HISTORY_SQL, {"user_id": user_id, "start": start, "end": end}).all()
+        return {
+            "dates": [row.snapshot_date for row in rows],
+            "total_tokens": [row.total_tokens for row in rows],
+            "invested": [row.invested_cents / 100 for row in rows],
+            "value": [row.value_cents / 100 for row in rows],
+            "accrued_yield": [round(row.accrued_yield_cents / 100, 2) for row in rows],
+        }
+
+
+class PortfolioSnapshotter:
+    """Background task that takes the daily portfolio snapshot"""
+
+    def __init__(self, engine: PortfolioValuationEngine):
+        self.engine = engine
+        self._task: Optional[asyncio.Task] = None
+
+    def run(self, snapshot_date: Optional[date] = None) -> int:
+        """Snapshot every user (blocking)"""
+        db = SessionLocal()
+        try:
+            users = self.engine.snapshot(db, snapshot_date)
+            db.commit()
+            return users
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _seconds_until_next_run() -> float:
+        now = datetime.now(timezone.utc)
+        next_run = now.replace(hour=SNAPSHOT_HOUR, minute=0, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        return (next_run - now).total_seconds()
+
+    async def _run(self):
+        # Snapshot on startup too; re-running a day overwrites that day's rows
+        while True:
+            try:
+                users = await asyncio.to_thread(self.run)
+                logger.info(f"Portfolio snapshot taken for {users} users")
+            except Exception as e:
+                logger.error(f"Portfolio snapshot failed: {e}")
+            await asyncio.sleep(self._seconds_until_next_run())
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+portfolio_valuation = PortfolioValuationEngine()
+portfolio_snapshotter = PortfolioSnapshotter(portfolio_valuation)
@@ -0,0 +1,198 @@
+import os
+import asyncio
+import hashlib
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.database import engine
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+FACETS_VIEW = "property_facets_mv"
+
+# Token price bands (label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = (
+    ("under-100", 0, 100),
+    ("100-500", 100, 500),
+    ("500-1000", 500, 1000),
+    ("1000-5000", 1000, 5000),
+    ("5000-plus", 5000, None),
+)
+
+# Facets counted disjunctively: each one ignores its own filter
+FACET_FIELDS = ("jurisdiction", "status", "property_type", "price_band")
+
+
+def _price_band_sql() -> str:
+    cases = " ".join(
+        f"WHEN token_price < {upper} THEN '{label}'"
+        for label, _, upper in PRICE_BANDS if upper is not None
+    )
+    return f"CASE {cases} ELSE '{PRICE_BANDS[-1][0]}' END"
+
+
+# Every grouping column is non-null so the unique index covers all rows,
+# which REFRESH ... CONCURRENTLY requires
+FACETS_VIEW_SQL = f"""
+    SELECT
+        jurisdiction,
+        COALESCE(status, 'coming-soon') AS status,
+        COALESCE(property_type, 'unspecified') AS property_type,
+        {_price_band_sql()} AS price_band,
+        COALESCE(is_featured, false) AS is_featured,
+        count(*) AS property_count,
+        min(token_price) AS min_token_price,
+        max(token_price) AS max_token_price,
+        min(expected_yield) AS min_expected_yield,
+        max(expected_yield) AS max_expected_yield
+    FROM properties
+    WHERE is_active = true
+    GROUP BY 1, 2, 3, 4, 5
+"""
+
+# Stored as the view comment so a changed definition (e.g. new bands) is rebuilt on startup
+FACETS_VIEW_VERSION = hashlib.blake2b(FACETS_VIEW_SQL.encode(), digest_size=8).hexdigest()
+
+
+def _as_float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+class PropertyFacetsService:
+    """Catalogue facet counts served from a materialized view
+
+    Property writes schedule a debounced REFRESH ... CONCURRENTLY, so reads
+    never block on a refresh and bursts of writes trigger a single refresh.
+    """
+
+    def __init__(self):
+        self.refresh_delay = float(os.getenv("FACETS_REFRESH_DELAY", "1"))
+        self._dirty = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    # View management
+    def ensure_view(self):
+        """Create the materialized view, rebuilding it if its definition changed"""
+        with engine.begin() as conn:
+            current = conn.execute(
+                text("SELECT obj_description(to_regclass(:view), 'pg_class')"),
+                {"view": FACETS_VIEW}
+            ).scalar()
+            if current == FACETS_VIEW_VERSION:
+                return
+
+            conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {FACETS_VIEW}"))
+            conn.execute(text(f"CREATE MATERIALIZED VIEW {FACETS_VIEW} AS {FACETS_VIEW_SQL}"))
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX {FACETS_VIEW}_key ON {FACETS_VIEW} "
+                f"(jurisdiction, status, property_type, price_band, is_featured)"
+            ))
+            conn.execute(text(f"COMMENT ON MATERIALIZED VIEW {FACETS_VIEW} IS '{FACETS_VIEW_VERSION}'"))
+        logger.info(f"Created {FACETS_VIEW} ({FACETS_VIEW_VERSION})")
+
+    def refresh(self):
+        """Refresh the view without blocking concurrent reads"""
+        with engine.begin() as conn:
+            conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {FACETS_VIEW}"))
+
+    def schedule_refresh(self):
+        """Mark the view stale; a single background task refreshes it after a short delay"""
+        self._dirty = True
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        # Writes arriving during a refresh set the flag again and get one more pass
+        while self._dirty:
+            await asyncio.sleep(self.refresh_delay)
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                logger.error(f"Error refreshing {FACETS_VIEW}: {e}")
+
+    # Queries
+    def get_facets(
+        self,
+        db: Session,
+        jurisdiction: Optional[Sequence[str]] = None,
+        status: Optional[Sequence[str]] = None,
+        property_type: Optional[Sequence[str]] = None,
+        price_band: Optional[Sequence[str]] = None,
+        featured_only: bool = False
+    ) -> Dict[str, Any]:
+        """Facet counts and ranges for the current filter selection"""
+        rows = db.execute(text(f"SELECT * FROM {FACETS_VIEW}")).mappings().all()
+
+        selected = {
+            "jurisdiction": set(jurisdiction or ()),
+            "status": set(status or ()),
+            "property_type": set(property_type or ()),
+            "price_band": set(price_band or ()),
+        }
+
+        def matches(row, skip: Optional[str] = None) -> bool:
+            if featured_only and not row["is_featured"]:
+                return False
+            return all(
+                not selected[field] or row[field] in selected[field]
+                for field in FACET_FIELDS if field != skip
+            )
+
+        facets = {}
+        for field in FACET_FIELDS:
+            counts = Counter()
+            for row in rows:
+                if matches(row, skip=field):
+                    counts[row[field]] += row["property_count"]
+            facets[field] = counts
+
+        matching = [row for row in rows if matches(row)]
+
+        def value_range(column: str) -> Dict[str, Optional[float]]:
+            values_min = [row[f"min_{column}"] for row in matching]
+            values_max = [row[f"max_{column}"] for row in matching]
+            return {
+                "min": _as_float(min(values_min)) if values_min else None,
+                "max": _as_float(max(values_max)) if values_max else None
+            }
+
+        return {
+            "total": sum(row["property_count"] for row in matching),
+            "facets": {
+                "jurisdiction": self._facet_values(facets["jurisdiction"], selected["jurisdiction"]),
+                "status": self._facet_values(facets["status"], selected["status"]),
+                "property_type": self._facet_values(facets["property_type"], selected["property_type"]),
+                # Bands keep their defined order and are listed even when empty
+                "price_band": [
+                    {
+                        "value": label,
+                        "min": lower,
+                        "max": upper,
+                        "count": facets["price_band"].get(label, 0),
+                        "selected": label in selected["price_band"]
+                    }
+                    for label, lower, upper in PRICE_BANDS
+                ]
+            },
+            "token_price": value_range("token_price"),
+            "expected_yield": value_range("expected_yield")
+        }
+
+    @staticmethod
+    def _facet_values(counts: Counter, selected: set) -> List[Dict[str, Any]]:
+        values = set(counts) | selected
+        return [
+            {"value": value, "count": counts.get(value, 0), "selected": value in selected}
+            for value in sorted(values, key=lambda value: (-counts.get(value, 0), value))
+        ]
+
+# Global instance
+property_facets_service = PropertyFacetsService()
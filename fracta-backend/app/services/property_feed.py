@@ -0,0 +1,152 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.models.property import Property
+from app.services.blockchain import blockchain_service
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Database columns merged into the live feed
+FEED_COLUMNS = (
+    Property.id,
+    Property.name,
+    Property.location,
+    Property.jurisdiction,
+    Property.kyc_required,
+    Property.full_price,
+    Property.token_price,
+    Property.total_tokens,
+    Property.tokens_sold,
+    Property.expected_yield,
+    Property.primary_image,
+    Property.status,
+    Property.contract_address,
+)
+
+
+class PropertyFeedService:
+    """Aggregates tokenized properties from the database with live on-chain sale state
+
+    Chain reads run concurrently with bounded fan-out. A property whose RPC
+    call fails or times out falls back to its last known chain state (or to
+    database values), and each entry reports where its numbers came from.
+    """
+
+    def __init__(self, chain=blockchain_service):
+        self.chain = chain
+        self.max_concurrency = int(os.getenv("CHAIN_FETCH_CONCURRENCY", "32"))
+        self.timeout = float(os.getenv("CHAIN_FETCH_TIMEOUT", "3"))
+
+        # web3 calls are blocking, so they run on a dedicated pool sized to the fan-out
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="chain-feed")
+        # contract address -> (fetched_at unix time, sale info)
+        self._last_known: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await asyncio.wait_for(loop.run_in_executor(self._executor, fn, *args), self.timeout)
+
+    async def _fetch_sale_info(self, semaphore: asyncio.Semaphore, contract_address: str) -> Tuple[Optional[Dict], Dict]:
+        """Return (sale info or None, freshness) for one contract"""
+        async with semaphore:
+            try:
+                sale_info = await self._run(self.chain.get_property_sale_info, contract_address)
+                fetched_at = time.time()
+                self._last_known[contract_address] = (fetched_at, sale_info)
+                return sale_info, self._freshness("chain", fetched_at)
+            except asyncio.TimeoutError:
+                error = "timeout"
+            except Exception as e:
+                logger.error(f"Error getting sale info for {contract_address}: {e}")
+                error = str(e)[:100]
+
+        last_known = self._last_known.get(contract_address)
+        if last_known:
+            fetched_at, sale_info = last_known
+            return sale_info, self._freshness("cache", fetched_at, error)
+        return None, self._freshness("database", None, error)
+
+    @staticmethod
+    def _freshness(source: str, fetched_at: Optional[float], error: Optional[str] = None) -> Dict[str, Any]:
+        freshness = {
+            "source": source,
+            "fetched_at": datetime.fromtimestamp(fetched_at, timezone.utc).isoformat() if fetched_at else None,
+            "age_seconds": round(time.time() - fetched_at, 3) if fetched_at else None,
+        }
+        if error:
+            freshness["error"] = error
+        return freshness
+
+    @staticmethod
+    def _merge(row, sale_info: Optional[Dict], freshness: Dict) -> Dict[str, Any]:
+        total_tokens = row.total_tokens or 0
+        tokens_sold = row.tokens_sold or 0
+        merged = {
+            "id": row.id,
+            "name": row.name,
+            "location": row.location,
+            "jurisdiction": row.jurisdiction,
+            "fullPrice": float(row.full_price),
+            "tokenPrice": float(row.token_price),
+            "totalTokens": total_tokens,
+            "tokensSold": tokens_sold,
+            "tokensRemaining": total_tokens - tokens_sold,
+            "expectedYield": float(row.expected_yield),
+            "image": row.primary_image,
+            "kycRequired": row.kyc_required,
+            "status": row.status,
+            "contractAddress": row.contract_address,
+            "saleActive": None,
+            "saleStartTime": None,
+            "saleEndTime": None,
+            "freshness": freshness
+        }
+        if sale_info:
+            merged.update(sale_info)
+        return merged
+
+    async def get_live_properties(self, db: Session) -> Dict[str, Any]:
+        """Load tokenized properties and merge them with their chain sale state"""
+        rows = db.query(*FEED_COLUMNS).filter(
+            Property.is_active == True,
+            Property.contract_address.isnot(None)
+        ).order_by(Property.created_at.desc()).all()
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        network_task = asyncio.ensure_future(self._run(self.chain.get_network_info))
+        results = await asyncio.gather(*(
+            self._fetch_sale_info(semaphore, row.contract_address) for row in rows
+        ))
+
+        try:
+            network = await network_task
+        except Exception as e:
+            logger.error(f"Error getting network info: {e}")
+            network = {"connected": False, "chain_id": self.chain.chain_id, "network_name": "Base Testnet"}
+
+        properties = [
+            self._merge(row, sale_info, freshness)
+            for row, (sale_info, freshness) in zip(rows, results)
+        ]
+        live_count = sum(1 for _, freshness in results if freshness["source"] == "chain")
+
+        return {
+            "properties": properties,
+            "blockchain_properties": live_count,
+            "stale_properties": len(properties) - live_count,
+            "partial": live_count < len(properties),
+            "network": network
+        }
+
+# Global instance
+property_feed_service = PropertyFeedService()
@@ -0,0 +1,234 @@
+import io
+import os
+import csv
+import json
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.property import Property
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = int(os.getenv("PROPERTY_IMPORT_CHUNK_SIZE", "1000"))
+
+# Columns accepted from import files (the PropertyCreate fields)
+IMPORT_COLUMNS = (
+    "name", "description", "location", "jurisdiction", "kyc_required",
+    "full_price", "token_price", "total_tokens", "expected_yield",
+    "property_type", "square_feet", "square_meters", "bedrooms", "bathrooms",
+    "features", "primary_image", "image_gallery",
+)
+_LIST_COLUMNS = ("features", "image_gallery")
+
+STAGING_TABLE = "property_import_staging"
+
+# Values applied by the ORM defaults when properties are created one at a time
+_INSERT_DEFAULTS = {
+    "tokens_sold": "0",
+    "status": "'coming-soon'",
+    "token_standard": "'ERC-20'",
+    "total_raised": "0",
+    "investor_count": "0",
+    "occupancy_rate": "0",
+    "is_active": "true",
+    "is_featured": "false",
+    "listing_date": "now()",
+}
+
+# (row number, parsed record or None, parse error or None)
+ImportRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str] = None) -> str:
+    """Guess csv or ndjson from a filename or content type"""
+    name = (filename or "").lower()
+    if name.endswith((".ndjson", ".jsonl")) or "ndjson" in (content_type or ""):
+        return "ndjson"
+    return "csv"
+
+
+def _parse_list_cell(value: str) -> Optional[List[str]]:
+    value = value.strip()
+    if not value:
+        return None
+    if value.startswith("["):
+        return json.loads(value)
+    return [item.strip() for item in value.split("|") if item.strip()]
+
+
+def iter_records(stream: TextIO, fmt: str) -> Iterator[ImportRecord]:
+    """Stream records from a CSV or NDJSON text stream without loading it whole"""
+    if fmt == "ndjson":
+        for row_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("Each line must be a JSON object")
+                yield row_number, record, None
+            except ValueError as e:
+                yield row_number, None, f"Invalid JSON: {e}"
+        return
+
+    reader = csv.DictReader(stream)
+    # Data rows start on line 2, after the header
+    for row_number, row in enumerate(reader, start=2):
+        try:
+            record = {
+                column: (value if value != "" else None)
+                for column, value in row.items()
+                if column in IMPORT_COLUMNS
+            }
+            for column in _LIST_COLUMNS:
+                if record.get(column) is not None:
+                    record[column] = _parse_list_cell(record[column])
+            yield row_number, record, None
+        except ValueError as e:
+            yield row_number, None, f"Invalid list value: {e}"
+
+
+def _validation_errors(error: ValidationError) -> List[Dict[str, str]]:
+    return [
+        {"field": ".".join(str(part) for part in item["loc"]), "message": item["msg"]}
+        for item in error.errors()
+    ]
+
+
+class PropertyImporter:
+    """Bulk loader for properties: validate in chunks, COPY to staging, merge"""
+
+    def __init__(self, schema: Type[BaseModel], chunk_size: int = CHUNK_SIZE):
+        self.schema = schema
+        self.chunk_size = chunk_size
+
+    def run(self, db: Session, records: Iterable[ImportRecord]) -> Dict[str, Any]:
+        """Import records chunk by chunk; failures are reported per row"""
+        report = {
+            "total_rows": 0,
+            "imported": 0,
+            "skipped": 0,
+            "failed": 0,
+            "property_ids": [],
+            "skipped_rows": [],
+            "errors": [],
+        }
+
+        records = iter(records)
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(db, chunk, report)
+
+        return report
+
+    def _import_chunk(self, db: Session, chunk: List[ImportRecord], report: Dict[str, Any]):
+        report["total_rows"] += len(chunk)
+
+        valid = []
+        for row_number, record, parse_error in chunk:
+            if parse_error:
+                report["errors"].append({"row": row_number, "errors": [{"field": "", "message": parse_error}]})
+                continue
+            try:
+                valid.append((row_number, self.schema(**record)))
+            except ValidationError as e:
+                report["errors"].append({"row": row_number, "errors": _validation_errors(e)})
+
+        report["failed"] = len(report["errors"])
+        if not valid:
+            return
+
+        try:
+            self._ensure_staging_table(db)
+            self._copy_to_staging(db, valid)
+            inserted = self._merge(db)
+            db.commit()
+        except Exception as e:
+            # COPY raises raw driver errors, so this covers more than SQLAlchemyError
+            db.rollback()
+            logger.error(f"Property import chunk failed: {e}")
+            for row_number, _ in valid:
+                report["errors"].append({
+                    "row": row_number,
+                    "errors": [{"field": "", "message": f"Database error: {str(getattr(e, 'orig', e))[:200]}"}]
+                })
+            report["failed"] = len(report["errors"])
+            return
+
+        inserted_rows = dict(inserted)
+        for row_number, _ in valid:
+            if row_number in inserted_rows:
+                report["property_ids"].append(inserted_rows[row_number])
+            else:
+                report["skipped"] += 1
+                report["skipped_rows"].append({"row": row_number, "reason": "Property already exists"})
+        report["imported"] += len(inserted_rows)
+
+    def _ensure_staging_table(self, db: Session):
+        dialect = db.get_bind().dialect
+        columns = ", ".join(
+            f"{name} {Property.__table__.c[name].type.compile(dialect=dialect)}"
+            for name in IMPORT_COLUMNS
+        )
+        db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+            f"(row_number INTEGER NOT NULL, {columns}) ON COMMIT DELETE ROWS"
+        ))
+
+    def _copy_to_staging(self, db: Session, valid: List[Tuple[int, BaseModel]]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row_number, model in valid:
+            values = model.dict()
+            writer.writerow([row_number] + [
+                json.dumps(values[column]) if column in _LIST_COLUMNS and values[column] is not None
+                else values[column]
+                for column in IMPORT_COLUMNS
+            ])
+        buffer.seek(0)
+
+        # COPY goes through the raw psycopg2 cursor of the session's connection
+        cursor = db.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {STAGING_TABLE} (row_number, {', '.join(IMPORT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+
+    def _merge(self, db: Session) -> List[Tuple[int, int]]:
+        """Insert staged rows that are not already listed; returns (row_number, property_id)"""
+        columns = ", ".join(IMPORT_COLUMNS + tuple(_INSERT_DEFAULTS))
+        values = ", ".join(
+            [f"s.{column}" for column in IMPORT_COLUMNS] + list(_INSERT_DEFAULTS.values())
+        )
+        # A property counts as a duplicate when name and location already exist,
+        # either in the catalogue or earlier in the same file
+        result = db.execute(text(f"""
+            WITH candidates AS (
+                SELECT DISTINCT ON (s.name, s.location) s.*
+                FROM {STAGING_TABLE} s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM properties p
+                    WHERE p.name = s.name AND p.location = s.location
+                )
+                ORDER BY s.name, s.location, s.row_number
+            ),
+            inserted AS (
+                INSERT INTO properties ({columns})
+                SELECT {values} FROM candidates s
+                RETURNING id, name, location
+            )
+            SELECT c.row_number, i.id
+            FROM inserted i
+            JOIN candidates c ON c.name = i.name AND c.location = i.location
+        """))
+        return [tuple(row) for row in result]
@@ -0,0 +1,100 @@
+from typing import Any, Dict, Iterable, List, Sequence
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.property import Property
+
+# Columns needed to build a PropertyResponse, in the order rows are unpacked
+PROPERTY_RESPONSE_COLUMNS = (
+    Property.id,
+    Property.name,
+    Property.description,
+    Property.location,
+    Property.jurisdiction,
+    Property.kyc_required,
+    Property.full_price,
+    Property.token_price,
+    Property.total_tokens,
+    Property.tokens_sold,
+    Property.expected_yield,
+    Property.property_type,
+    Property.square_feet,
+    Property.square_meters,
+    Property.bedrooms,
+    Property.bathrooms,
+    Property.features,
+    Property.primary_image,
+    Property.image_gallery,
+    Property.status,
+    Property.listing_date,
+    Property.total_raised,
+    Property.investor_count,
+    Property.is_active,
+    Property.is_featured,
+    Property.created_at,
+    Property.updated_at,
+)
+
+PROPERTY_RESPONSE_FIELDS = tuple(column.key for column in PROPERTY_RESPONSE_COLUMNS)
+
+# Numeric(…) columns come back as Decimal and are exposed as floats
+_FLOAT_FIELDS = ("full_price", "token_price", "expected_yield", "total_raised")
+
+
+def query_property_rows(db: Session):
+    """Query returning plain row tuples in PROPERTY_RESPONSE_FIELDS order"""
+    return db.query(*PROPERTY_RESPONSE_COLUMNS)
+
+
+def query_property_version(db: Session):
+    """Query returning (created_at, updated_at, tokens_sold) for a single property"""
+    return db.query(
+        Property.created_at,
+        Property.updated_at,
+        Property.tokens_sold
+    )
+
+
+def query_property_list_version(db: Session):
+    """Aggregate query returning (count, max id, last created, last updated, tokens sold) for a filtered list"""
+    return db.query(
+        func.count(Property.id),
+        func.max(Property.id),
+        func.max(Property.created_at),
+        func.max(Property.updated_at),
+        func.sum(Property.tokens_sold)
+    )
+
+
+def serialize_property_row(row: Sequence[Any]) -> Dict[str, Any]:
+    """Build a PropertyResponse-shaped dict from a row tuple in a single pass"""
+    data = dict(zip(PROPERTY_RESPONSE_FIELDS, row))
+
+    for field in _FLOAT_FIELDS:
+        value = data[field]
+        data[field] = float(value) if value is not None else 0.0
+
+    total_tokens = data["total_tokens"] or 0
+    tokens_sold = data["tokens_sold"] or 0
+    data["tokens_sold"] = tokens_sold
+    data["investor_count"] = data["investor_count"] or 0
+
+    # Computed properties (mirrors the Property model helpers)
+    data["tokens_remaining"] = total_tokens - tokens_sold
+    data["funding_percentage"] = (tokens_sold / total_tokens) * 100 if total_tokens else 0.0
+    data["is_fully_funded"] = tokens_sold >= total_tokens
+    data["minimum_investment"] = data["token_price"]
+    data["requires_prospera_permit"] = data["kyc_required"] == "prospera-permit"
+
+    return data
+
+
+def serialize_property_rows(rows: Iterable[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Serialize a batch of row tuples"""
+    return [serialize_property_row(row) for row in rows]
+
+
+def serialize_property(property: Property) -> Dict[str, Any]:
+    """Serialize an already loaded Property instance"""
+    return serialize_property_row([getattr(property, field) for field in PROPERTY_RESPONSE_FIELDS])
@@ -0,0 +1,58 @@
+import os
+from typing import Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.models.property import Property
+from app.services.token_ownership import add_range
+
+MAX_MINT_QUANTITY = int(os.getenv("MAX_MINT_QUANTITY", "1000"))
+
+
+def allocate_token_numbers(db: Session, property_id: int, quantity: int) -> int:
+    """Reserve a contiguous block of token numbers and return the first one
+
+    A single conditional UPDATE ... RETURNING bumps the property's counters,
+    so concurrent callers get disjoint blocks and neither the supply cap nor
+    reserved inventory can be oversold. The row lock is held until the caller's transaction ends.
+    """
+    tokens_sold = func.coalesce(Property.tokens_sold, 0)
+    last_number = db.execute(
+        update(Property)
+        .where(
+            Property.id == property_id,
+            Property.tokens_minted + quantity <= Property.total_tokens,
+            # Tokens held by open reservations are not available
+            tokens_sold + Property.tokens_reserved + quantity <= Property.total_tokens
+        )
+        .values(
+            tokens_minted=Property.tokens_minted + quantity,
+            tokens_sold=tokens_sold + quantity
+        )
+        .returning(Property.tokens_minted)
+        # Session synchronization would report the in-memory counter of an
+        # already loaded Property instead of the value the database returned
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+    if last_number is None:
+        counters = db.query(Property.tokens_minted, Property.total_tokens).filter(
+            Property.id == property_id
+        ).first()
+        if counters is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Property not found")
+        if counters.tokens_minted >= counters.total_tokens:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="All tokens have been minted")
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not enough tokens available")
+
+    return last_number - quantity + 1
+
+
+def allocate_owned_range(db: Session, property_id: int, owner_id: int, quantity: int) -> Tuple[int, int]:
+    """Allocate a block of token numbers and record it as owned; returns (first, last)"""
+    first_number = allocate_token_numbers(db, property_id, quantity)
+    last_number = first_number + quantity - 1
+    add_range(db, property_id, owner_id, first_number, last_number)
+    return first_number, last_number
@@ -0,0 +1,79 @@
+import threading
+from typing import Any, Dict, List, Tuple
+
+from app.services.order_book import SELL, Order, order_book_service
+
+# Last summary per property, keyed by (asks version, best, buckets)
+_summaries: Dict[int, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_summaries_lock = threading.Lock()
+
+
+def get_listing_summary(property_id: int, best: int = 20, buckets: int = 10) -> Dict[str, Any]:
+    """Floor price, the ``best`` first asks and a price histogram of a property's listings
+
+    Listings are the asks (open sell orders) of the property's order book,
+    so the summary reads the in-memory book and never the database. The
+    book bumps its asks version on every listing, fill and cancellation;
+    the summary is rebuilt only when that version has moved.
+    """
+    version = order_book_service.version(property_id, SELL)
+    with _summaries_lock:
+        cached = _summaries.get(property_id)
+    if cached and cached[0] == (version, best, buckets):
+        return cached[1]
+
+    version, listed_tokens, levels, orders = order_book_service.side_snapshot(property_id, SELL, best)
+    summary = _summarize(property_id, listed_tokens, levels, orders, buckets)
+    with _summaries_lock:
+        _summaries[property_id] = ((version, best, buckets), summary)
+    return summary
+
+
+def _summarize(
+    property_id: int,
+    listed_tokens: int,
+    levels: List[Tuple[int, int]],
+    orders: List[Order],
+    buckets: int
+) -> Dict[str, Any]:
+    summary = {
+        "property_id": property_id,
+        "listed_tokens": listed_tokens,
+        "floor_price": levels[0][0] / 100 if levels else None,
+        "max_price": levels[-1][0] / 100 if levels else None,
+        "best_asks": [],
+        "histogram": []
+    }
+    if not levels:
+        return summary
+
+    summary["best_asks"] = [
+        {
+            "order_id": order.order_id,
+            "user_id": order.user_id,
+            "price": order.price / 100,
+            "quantity": order.remaining,
+            "created_at": order.created_at
+        }
+        for order in orders
+    ]
+
+    low, high = levels[0][0], levels[-1][0]
+    if low == high:
+        summary["histogram"] = [{"min_price": low / 100, "max_price": high / 100, "tokens": summary["listed_tokens"]}]
+        return summary
+
+    # Equal-width buckets from the floor to the highest ask; the highest ask falls in the last bucket
+    counts = [0] * buckets
+    for price, quantity in levels:
+        counts[min((price - low) * buckets // (high - low), buckets - 1)] += quantity
+    width = (high - low) / buckets
+    summary["histogram"] = [
+        {
+            "min_price": round(low + width * bucket) / 100,
+            "max_price": round(low + width * (bucket + 1)) / 100,
+            "tokens": counts[bucket]
+        }
+        for bucket in range(buckets)
+    ]
+    return summary
@@ -0,0 +1,206 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.models.property import Property
+from app.models.kyc import TokenRange
+
+# Token count of a range as a SQL expression
+RANGE_SIZE = TokenRange.end_number - TokenRange.start_number + 1
+
+# Fields of a token in a page of a property's tokens, in TokenResponse order
+TOKEN_FIELDS = ("token_number", "property_id", "owner_id", "mint_price")
+
+
+def add_range(db: Session, property_id: int, owner_id: int, start_number: int, end_number: int) -> TokenRange:
+    """Record ownership of [start_number, end_number], merging with the owner's adjacent ranges
+
+    Callers must hold the property's row lock (minting and transfers take it),
+    so neighbouring ranges cannot change underneath the merge.
+    """
+    neighbours = db.query(TokenRange).filter(
+        TokenRange.property_id == property_id,
+        TokenRange.owner_id == owner_id,
+        (TokenRange.end_number == start_number - 1) | (TokenRange.start_number == end_number + 1)
+    ).all()
+    left = next((r for r in neighbours if r.end_number == start_number - 1), None)
+    right = next((r for r in neighbours if r.start_number == end_number + 1), None)
+
+    if left and right:
+        left.end_number = right.end_number
+        db.delete(right)
+        token_range = left
+    elif left:
+        left.end_number = end_number
+        token_range = left
+    elif right:
+        right.start_number = start_number
+        token_range = right
+    else:
+        token_range = TokenRange(
+            property_id=property_id,
+            owner_id=owner_id,
+            start_number=start_number,
+            end_number=end_number
+        )
+        db.add(token_range)
+
+    # Sessions don't autoflush, and the next merge must see this one
+    db.flush()
+    return token_range
+
+
+def take_ranges(db: Session, property_id: int, owner_id: int, quantity: int) -> List[Tuple[int, int]]:
+    """Remove ``quantity`` tokens from the owner's lowest-numbered ranges and return the runs taken"""
+    ranges = db.query(TokenRange).filter(
+        TokenRange.property_id == property_id,
+        TokenRange.owner_id == owner_id
+    ).order_by(TokenRange.start_number).with_for_update().all()
+
+    if sum(r.token_count for r in ranges) < quantity:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Insufficient token balance")
+
+    taken = []
+    remaining = quantity
+    for token_range in ranges:
+        count = min(token_range.token_count, remaining)
+        taken.append((token_range.start_number, token_range.start_number + count - 1))
+        if count == token_range.token_count:
+            db.delete(token_range)
+        else:
+            token_range.start_number += count
+        remaining -= count
+        if not remaining:
+            break
+
+    # Apply the splits before the recipient's ranges are written at the same numbers
+    db.flush()
+    return taken
+
+
+def transfer_tokens(db: Session, property_id: int, from_owner_id: int, to_owner_id: int, quantity: int) -> List[Tuple[int, int]]:
+    """Move ``quantity`` tokens between owners, splitting and merging ranges; the caller commits"""
+    # Serialize range changes per property, as minting does through its counter update
+    db.query(Property.id).filter(Property.id == property_id).with_for_update().first()
+
+    runs = take_ranges(db, property_id, from_owner_id, quantity)
+
+    for start_number, end_number in runs:
+        add_range(db, property_id, to_owner_id, start_number, end_number)
+
+    return runs
+
+
+def get_holdings(db: Session, owner_id: int, property_id: Optional[int] = None, include_ranges: bool = False) -> List[Dict[str, Any]]:
+    """Token counts per property for one owner"""
+    query = db.query(
+        TokenRange.property_id,
+        func.sum(RANGE_SIZE),
+        func.count(TokenRange.id)
+    ).filter(TokenRange.owner_id == owner_id)
+    if property_id is not None:
+        query = query.filter(TokenRange.property_id == property_id)
+    rows = query.group_by(TokenRange.property_id).order_by(TokenRange.property_id).all()
+
+    holdings = [
+        {"property_id": row[0], "token_count": int(row[1]), "range_count": row[2]}
+        for row in rows
+    ]
+
+    if include_ranges and holdings:
+        ranges = db.query(TokenRange.property_id, TokenRange.start_number, TokenRange.end_number).filter(
+            TokenRange.owner_id == owner_id,
+            TokenRange.property_id.in_([holding["property_id"] for holding in holdings])
+        ).order_by(TokenRange.property_id, TokenRange.start_number).all()
+        by_property: Dict[int, List[List[int]]] = {}
+        for range_property_id, start_number, end_number in ranges:
+            by_property.setdefault(range_property_id, []).append([start_number, end_number])
+        for holding in holdings:
+            holding["ranges"] = by_property.get(holding["property_id"], [])
+
+    return holdings
+
+
+def get_cap_table(db: Session, property_id: int) -> List[Dict[str, Any]]:
+    """Token count per owner for one property, largest holders first"""
+    token_count = func.sum(RANGE_SIZE)
+    rows = db.query(
+        TokenRange.owner_id,
+        User.wallet_address,
+        token_count,
+        func.count(TokenRange.id)
+    ).join(User, User.id == TokenRange.owner_id).filter(
+        TokenRange.property_id == property_id
+    ).group_by(TokenRange.owner_id, User.wallet_address).order_by(
+        token_count.desc(), TokenRange.owner_id
+    ).all()
+
+    return [
+        {
+            "owner_id": owner_id,
+            "wallet_address": wallet_address,
+            "token_count": int(count),
+            "range_count": range_count
+        }
+        for owner_id, wallet_address, count, range_count in rows
+    ]
+
+
+def page_property_tokens(
+    db: Session,
+    property_id: int,
+    after: Optional[int] = None,
+    limit: int = 100,
+    owner_id: Optional[int] = None,
+    compact: bool = False
+) -> Dict[str, Any]:
+    """One page of a property's tokens by token number, expanded from ownership ranges
+
+    Pages continue from ``after`` (the last token number seen). Every range
+    holds at least one token, so the next ``limit + 1`` ranges always fill a
+    page; every token was minted at the property's price. ``compact``
+    returns each token as a list in TOKEN_FIELDS order instead of an object.
+    """
+    mint_price = float(db.query(Property.token_price).filter(Property.id == property_id).scalar() or 0)
+
+    query = db.query(TokenRange.start_number, TokenRange.end_number, TokenRange.owner_id).filter(
+        TokenRange.property_id == property_id
+    )
+    if owner_id is not None:
+        query = query.filter(TokenRange.owner_id == owner_id)
+    if after is not None:
+        # Start from the range holding token ``after`` so the scan stays on the (property_id, start_number) index
+        first_start = query.with_entities(func.max(TokenRange.start_number)).filter(
+            TokenRange.start_number <= after
+        ).scalar()
+        query = query.filter(
+            TokenRange.start_number >= (first_start if first_start is not None else after),
+            TokenRange.end_number > after
+        )
+
+    tokens = []
+    for start_number, end_number, range_owner_id in query.order_by(TokenRange.start_number).limit(limit + 1):
+        if after is not None:
+            start_number = max(start_number, after + 1)
+        end_number = min(end_number, start_number + limit - len(tokens))
+        tokens.extend(
+            [token_number, property_id, range_owner_id, mint_price]
+            for token_number in range(start_number, end_number + 1)
+        )
+        if len(tokens) > limit:
+            break
+
+    has_next = len(tokens) > limit
+    tokens = tokens[:limit]
+    page = {
+        "property_id": property_id,
+        "next_after": tokens[-1][0] if has_next else None,
+        "has_next": has_next,
+        "limit": limit
+    }
+    if compact:
+        return {**page, "fields": TOKEN_FIELDS, "tokens": tokens}
+    return {**page, "tokens": [dict(zip(TOKEN_FIELDS, token)) for token in tokens]}
@@ -0,0 +1,260 @@
+import os
+import uuid
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.database import SessionLocal
+from app.models.property import Property
+from app.models.kyc import Investment, TokenReservation
+from app.services.portfolio_rollups import apply_investment
+from app.services.token_ownership import add_range
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_TTL = int(os.getenv("RESERVATION_TTL", "900"))  # Seconds a wallet has to sign
+SWEEP_INTERVAL = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "30"))
+SWEEP_BATCH_SIZE = int(os.getenv("RESERVATION_SWEEP_BATCH_SIZE", "500"))
+
+# Holds don't change anything the catalogue shows, so counter updates keep
+# updated_at (and with it the property ETags) unchanged
+_KEEP_UPDATED_AT = {"updated_at": Property.updated_at}
+
+# Expire a batch of lapsed holds and hand their tokens back in one statement
+_EXPIRE_SQL = text("""
+    WITH expired AS (
+        UPDATE token_reservations SET status = 'expired', released_at = now()
+        WHERE id IN (
+            SELECT id FROM token_reservations
+            WHERE status = 'held' AND expires_at <= now()
+            ORDER BY expires_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING property_id, quantity
+    ),
+    totals AS (
+        SELECT property_id, sum(quantity) AS quantity FROM expired GROUP BY property_id
+    )
+    UPDATE properties p SET tokens_reserved = p.tokens_reserved - totals.quantity
+    FROM totals
+    WHERE p.id = totals.property_id
+    RETURNING totals.quantity
+""")
+
+
+def serialize_reservation(reservation: TokenReservation) -> Dict[str, Any]:
+    return {
+        "reservation_id": reservation.reference,
+        "property_id": reservation.property_id,
+        "quantity": reservation.quantity,
+        "price_per_token": float(reservation.price_per_token),
+        "total_cost": float(reservation.price_per_token * reservation.quantity),
+        "status": reservation.status,
+        "expires_at": reservation.expires_at,
+        "transaction_hash": reservation.transaction_hash,
+        "investment_id": reservation.investment_id
+    }
+
+
+def create_investment(db: Session, user_id: int, property_id: int, quantity: int, token_price, transaction_hash: Optional[str]) -> Investment:
+    """Record a confirmed purchase and roll it into the user's portfolio; the caller commits"""
+    investment = Investment(
+        user_id=user_id,
+        property_id=property_id,
+        tokens_purchased=quantity,
+        token_price_at_purchase=token_price,
+        total_amount=quantity * token_price,
+        transaction_hash=transaction_hash,
+        status="confirmed",
+        confirmed_at=func.now()
+    )
+    db.add(investment)
+    db.flush()
+    apply_investment(db, user_id, property_id, quantity, quantity * token_price)
+    return investment
+
+
+def reserve_tokens(db: Session, user_id: int, property: Property, quantity: int, ttl: int = RESERVATION_TTL) -> TokenReservation:
+    """Hold ``quantity`` tokens for the user until the reservation is confirmed, released or expires"""
+    held = db.execute(
+        update(Property)
+        .where(
+            Property.id == property.id,
+            func.coalesce(Property.tokens_sold, 0) + Property.tokens_reserved + quantity <= Property.total_tokens
+        )
+        .values(tokens_reserved=Property.tokens_reserved + quantity, **_KEEP_UPDATED_AT)
+        .returning(Property.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if held is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Not enough tokens available")
+
+    reservation = TokenReservation(
+        reference=str(uuid.uuid4()),
+        user_id=user_id,
+        property_id=property.id,
+        quantity=quantity,
+        price_per_token=property.token_price,
+        status="held",
+        expires_at=func.now() + timedelta(seconds=ttl)
+    )
+    db.add(reservation)
+    db.flush()
+    db.refresh(reservation)
+    return reservation
+
+
+def _claim_reservation(db: Session, reference: str, user_id: int, new_status: str, **values):
+    """Move a live hold out of 'held'; returns (property_id, quantity, price) or raises"""
+    conditions = [
+        TokenReservation.reference == reference,
+        TokenReservation.user_id == user_id,
+        TokenReservation.status == "held",
+    ]
+    if new_status == "confirmed":
+        conditions.append(TokenReservation.expires_at > func.now())
+
+    claimed = db.execute(
+        update(TokenReservation)
+        .where(*conditions)
+        .values(status=new_status, **values)
+        .returning(TokenReservation.id, TokenReservation.property_id, TokenReservation.quantity, TokenReservation.price_per_token)
+        .execution_options(synchronize_session=False)
+    ).first()
+    if claimed:
+        return claimed
+
+    existing = db.query(TokenReservation.status).filter(
+        TokenReservation.reference == reference,
+        TokenReservation.user_id == user_id
+    ).first()
+    if not existing:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reservation not found")
+    if existing.status == "held":
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Reservation has expired")
+    if existing.status == "confirmed":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reservation is already confirmed")
+    raise HTTPException(status_code=status.HTTP_410_GONE, detail=f"Reservation was {existing.status}")
+
+
+def confirm_reservation(db: Session, reference: str, user_id: int, transaction_hash: Optional[str] = None) -> Dict[str, Any]:
+    """Turn a hold into a purchase: allocate token numbers and record the investment; the caller commits"""
+    reservation_id, property_id, quantity, price = _claim_reservation(
+        db, reference, user_id, "confirmed",
+        confirmed_at=func.now(),
+        transaction_hash=transaction_hash
+    )
+
+    # Reserved tokens become sold and get numbers in the same statement
+    last_number = db.execute(
+        update(Property)
+        .where(
+            Property.id == property_id,
+            Property.tokens_reserved >= quantity,
+            Property.tokens_minted + quantity <= Property.total_tokens
+        )
+        .values(
+            tokens_reserved=Property.tokens_reserved - quantity,
+            tokens_sold=func.coalesce(Property.tokens_sold, 0) + quantity,
+            tokens_minted=Property.tokens_minted + quantity
+        )
+        .returning(Property.tokens_minted)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if last_number is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Reserved tokens are no longer available")
+
+    first_number = last_number - quantity + 1
+    add_range(db, property_id, user_id, first_number, last_number)
+
+    investment = create_investment(db, user_id, property_id, quantity, price, transaction_hash)
+    db.execute(
+        update(TokenReservation)
+        .where(TokenReservation.id == reservation_id)
+        .values(investment_id=investment.id)
+        .execution_options(synchronize_session=False)
+    )
+
+    return {
+        "property_id": property_id,
+        "quantity": quantity,
+        "total_cost": float(price * quantity),
+        "investment_id": investment.id,
+        "token_range": [first_number, last_number]
+    }
+
+
+def release_reservation(db: Session, reference: str, user_id: int) -> int:
+    """Cancel a hold and return its tokens to inventory; the caller commits"""
+    _, property_id, quantity, _ = _claim_reservation(db, reference, user_id, "released", released_at=func.now())
+
+    db.execute(
+        update(Property)
+        .where(Property.id == property_id)
+        .values(tokens_reserved=Property.tokens_reserved - quantity, **_KEEP_UPDATED_AT)
+        .execution_options(synchronize_session=False)
+    )
+    return property_id
+
+
+def expire_reservations(db: Session, limit: int = SWEEP_BATCH_SIZE) -> int:
+    """Expire up to ``limit`` lapsed holds; returns the number of tokens returned to inventory"""
+    returned = db.execute(_EXPIRE_SQL, {"limit": limit}).scalars().all()
+    db.commit()
+    return sum(returned)
+
+
+class ReservationSweeper:
+    """Background task that returns abandoned holds to inventory"""
+
+    def __init__(self, interval: float = SWEEP_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def sweep(self) -> int:
+        """Expire every lapsed hold, a batch at a time (blocking)"""
+        total = 0
+        db = SessionLocal()
+        try:
+            while True:
+                returned = expire_reservations(db)
+                total += returned
+                if not returned:
+                    return total
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                returned = await asyncio.to_thread(self.sweep)
+                if returned:
+                    logger.info(f"Expired reservations returned {returned} tokens to inventory")
+            except Exception as e:
+                logger.error(f"Reservation sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global instance
+reservation_sweeper = ReservationSweeper()
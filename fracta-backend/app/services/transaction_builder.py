@@ -0,0 +1,185 @@
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Session
+from web3.exceptions import ContractLogicError
+
+from app.models.dividend import DividendAccount
+from app.models.property import Property
+from app.models.user import User
+from app.services.blockchain import blockchain_service
+from app.services.compliance_mirror import check_can_invest
+
+load_dotenv()
+
+TX_FEE_CACHE_TTL = float(os.getenv("TX_FEE_CACHE_TTL", "2"))  # Seconds; one block on Base
+TX_GAS_CACHE_TTL = int(os.getenv("TX_GAS_CACHE_TTL", "600"))  # Seconds a gas estimate is reused
+TX_GAS_MARGIN = float(os.getenv("TX_GAS_MARGIN", "1.2"))  # Gas limit headroom over the estimate
+TX_BASE_FEE_MULTIPLIER = int(os.getenv("TX_BASE_FEE_MULTIPLIER", "2"))  # Covers six full blocks of base fee rises
+
+
+class FeeQuote(NamedTuple):
+    block_number: int
+    timestamp: int
+    base_fee: int
+    priority_fee: int
+
+    @property
+    def max_fee(self) -> int:
+        return self.base_fee * TX_BASE_FEE_MULTIPLIER + self.priority_fee
+
+
+def _quantity(value: int) -> str:
+    return hex(value)
+
+
+class TransactionBuilder:
+    """Unsigned PropertyToken transactions, ready for the wallet to sign and send
+
+    Fee data is read once per block and shared by every payload built in
+    that block. Gas limits come from eth_estimateGas, cached per contract,
+    function and argument shape: the byte width of the token amount, which
+    sets the calldata cost, and whether the call writes a storage slot for
+    the first time (a new holder or a first claim). The wallet assigns the
+    nonce when it sends.
+    """
+
+    def __init__(self):
+        self._fees: Optional[FeeQuote] = None
+        self._fees_expire_at = 0.0
+        self._fee_lock = threading.Lock()
+        # contract address -> (block number, getSaleInfo terms)
+        self._sale_terms: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        # (contract address, function, shape...) -> (expires at, gas limit)
+        self._gas_limits: Dict[Tuple, Tuple[float, int]] = {}
+
+    # Cached chain reads (blocking)
+    def fee_quote(self) -> FeeQuote:
+        """Fee data for the latest block; concurrent callers share one refresh"""
+        with self._fee_lock:
+            if self._fees is None or time.monotonic() >= self._fees_expire_at:
+                self._fees = FeeQuote(**blockchain_service.get_fee_data())
+                self._fees_expire_at = time.monotonic() + TX_FEE_CACHE_TTL
+            return self._fees
+
+    def sale_terms(self, contract_address: str, block_number: int) -> Dict[str, Any]:
+        cached = self._sale_terms.get(contract_address)
+        if cached is not None and cached[0] == block_number:
+            return cached[1]
+        terms = blockchain_service.get_sale_terms(contract_address)
+        self._sale_terms[contract_address] = (block_number, terms)
+        return terms
+
+    def gas_limit(self, key: Tuple, transaction: Dict[str, Any]) -> Tuple[int, bool]:
+        """Gas limit for a call shape; returns (gas, whether it came from the cache)"""
+        cached = self._gas_limits.get(key)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1], True
+
+        try:
+            estimate = blockchain_service.estimate_gas(transaction)
+        except ContractLogicError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Transaction would revert: {e.message or e}"
+            )
+        gas = int(estimate * TX_GAS_MARGIN)
+        self._gas_limits[key] = (time.monotonic() + TX_GAS_CACHE_TTL, gas)
+        return gas, False
+
+    def clear(self):
+        self._fees = None
+        self._sale_terms.clear()
+        self._gas_limits.clear()
+
+    # Payloads (blocking)
+    def _payload(self, sender: str, contract_address: str, data: str, value: int, key: Tuple, fees: FeeQuote) -> Dict[str, Any]:
+        transaction = {"from": sender, "to": contract_address, "data": data, "value": value}
+        gas, cached = self.gas_limit(key, transaction)
+
+        return {
+            "chain_id": blockchain_service.chain_id,
+            "block_number": fees.block_number,
+            "gas_estimate_cached": cached,
+            "max_cost_wei": str(value + gas * fees.max_fee),
+            # Hex quantities, as eth_sendTransaction takes them
+            "transaction": {
+                "from": sender,
+                "to": contract_address,
+                "data": data,
+                "value": _quantity(value),
+                "gas": _quantity(gas),
+                "maxFeePerGas": _quantity(fees.max_fee),
+                "maxPriorityFeePerGas": _quantity(fees.priority_fee),
+                "type": "0x2",
+                "chainId": _quantity(blockchain_service.chain_id)
+            }
+        }
+
+    def build_purchase(self, sender: str, contract_address: str, token_amount: int) -> Dict[str, Any]:
+        """purchaseTokens(token_amount) with the exact value, checked against the sale's requires first"""
+        fees = self.fee_quote()
+        terms = self.sale_terms(contract_address, fees.block_number)
+        if not terms["sale_active"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Sale is not active")
+        if not terms["sale_start_time"] <= fees.timestamp <= terms["sale_end_time"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Sale period invalid")
+        if terms["tokens_remaining"] < token_amount:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Not enough tokens available")
+
+        # A zero on-chain balance means the purchase writes the sender's balance slot for the
+        # first time, which costs more gas; the app's own ownership records cannot tell
+        new_holder = blockchain_service.get_balance_of(contract_address, sender, fees.block_number) == 0
+        value = token_amount * terms["token_price_wei"]
+        data = blockchain_service.encode_property_call(contract_address, "purchaseTokens", [token_amount])
+        key = (contract_address, "purchaseTokens", (token_amount.bit_length() + 7) // 8, new_holder)
+        payload = self._payload(sender, contract_address, data, value, key, fees)
+        payload["token_amount"] = token_amount
+        payload["token_price_wei"] = str(terms["token_price_wei"])
+        return payload
+
+    def build_dividend_claim(self, sender: str, contract_address: str, first_claim: bool) -> Dict[str, Any]:
+        fees = self.fee_quote()
+        data = blockchain_service.encode_property_call(contract_address, "claimDividends", [])
+        key = (contract_address, "claimDividends", first_claim)
+        return self._payload(sender, contract_address, data, 0, key, fees)
+
+    # Request entry points
+    async def prepare_purchase(self, user: User, property: Property, token_amount: int) -> Dict[str, Any]:
+        contract_address = _contract_address(property)
+        sender = blockchain_service.w3.to_checksum_address(user.wallet_address)
+
+        allowed, reason = await check_can_invest(sender, contract_address, token_amount)
+        if not allowed:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=reason)
+
+        return await asyncio.to_thread(self.build_purchase, sender, contract_address, token_amount)
+
+    async def prepare_dividend_claim(self, db: Session, user: User, property: Property) -> Dict[str, Any]:
+        contract_address = _contract_address(property)
+        sender = blockchain_service.w3.to_checksum_address(user.wallet_address)
+
+        account = db.query(DividendAccount).filter(
+            DividendAccount.user_id == user.id,
+            DividendAccount.property_id == property.id
+        ).first()
+        if not account or account.earned <= account.claimed:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No dividends to claim")
+
+        payload = await asyncio.to_thread(self.build_dividend_claim, sender, contract_address, account.claimed == 0)
+        payload["claimable_wei"] = str(account.earned - account.claimed)
+        return payload
+
+
+def _contract_address(property: Property) -> str:
+    if not property.contract_address:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Property has no token contract")
+    return blockchain_service.w3.to_checksum_address(property.contract_address)
+
+# Global instance
+transaction_builder = TransactionBuilder()
@@ -0,0 +1,136 @@
+import io
+import os
+import csv
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.kyc import Investment
+from app.models.property import Property
+from app.services.cache import render_json
+
+STREAM_BATCH_SIZE = int(os.getenv("TRANSACTION_STREAM_BATCH_SIZE", "1000"))
+
+# Columns of one history row, read without loading Investment entities
+HISTORY_COLUMNS = (
+    Investment.id,
+    Investment.property_id,
+    Property.name.label("property_name"),
+    Investment.tokens_purchased,
+    Investment.token_price_at_purchase,
+    Investment.total_amount,
+    Investment.transaction_hash,
+    Investment.created_at,
+)
+
+CSV_FIELDS = (
+    "id", "property_id", "property_name", "tokens_purchased", "token_price_at_purchase",
+    "total_cost", "transaction_hash", "purchase_date", "status",
+)
+
+
+def encode_cursor(created_at: datetime, investment_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{investment_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, investment_id = raw.split("|")
+        return datetime.fromisoformat(created_at), int(investment_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def history_query(user_id: int):
+    """User's investments newest first; (created_at, id) is the keyset"""
+    return select(*HISTORY_COLUMNS).join(
+        Property, Investment.property_id == Property.id
+    ).where(
+        Investment.user_id == user_id
+    ).order_by(
+        Investment.created_at.desc(),
+        Investment.id.desc()
+    )
+
+
+def serialize_transaction(row) -> Dict[str, Any]:
+    return {
+        "id": row.id,
+        "property_id": row.property_id,
+        "property_name": row.property_name,
+        "tokens_purchased": row.tokens_purchased,
+        "token_price_at_purchase": float(row.token_price_at_purchase),
+        "total_cost": float(row.total_amount),
+        "transaction_hash": row.transaction_hash,
+        "purchase_date": row.created_at,
+        "status": "completed"  # Simulated
+    }
+
+
+def get_transaction_page(db: Session, user_id: int, cursor: Optional[str], limit: int) -> Dict[str, Any]:
+    """One page of history after ``cursor``; fetches one extra row to know if more follow"""
+    query = history_query(user_id)
+    if cursor:
+        query = query.where(tuple_(Investment.created_at, Investment.id) < decode_cursor(cursor))
+
+    rows = db.execute(query.limit(limit + 1)).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    return {
+        "transactions": [serialize_transaction(row) for row in rows],
+        "next_cursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_next else None,
+        "has_next": has_next,
+        "limit": limit
+    }
+
+
+def _stream_rows(user_id: int):
+    # Own session: the request's session is closed before a streamed body is sent.
+    # yield_per makes psycopg2 use a server-side cursor, so rows arrive in batches.
+    db = SessionLocal()
+    try:
+        query = history_query(user_id).execution_options(yield_per=STREAM_BATCH_SIZE)
+        yield from db.execute(query).partitions()
+    finally:
+        db.close()
+
+
+def iter_transactions_ndjson(user_id: int) -> Iterator[bytes]:
+    """Full history as newline-delimited JSON, one chunk per fetched batch"""
+    for rows in _stream_rows(user_id):
+        yield b"".join(render_json(serialize_transaction(row)) + b"\n" for row in rows)
+
+
+def iter_transactions_csv(user_id: int) -> Iterator[bytes]:
+    """Full history as CSV with a header row, one chunk per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for rows in _stream_rows(user_id):
+        for row in rows:
+            writer.writerow((
+                row.id,
+                row.property_id,
+                row.property_name,
+                row.tokens_purchased,
+                row.token_price_at_purchase,
+                row.total_amount,
+                row.transaction_hash or "",
+                row.created_at.isoformat() if row.created_at else "",
+                "completed",
+            ))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there is no history
+    if buffer.tell():
+        yield buffer.getvalue().encode()
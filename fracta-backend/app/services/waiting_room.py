@@ -0,0 +1,343 @@
+import os
+import math
+import time
+import secrets
+import logging
+from collections import deque
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+WAITING_ROOM_CAPACITY = int(os.getenv("WAITING_ROOM_CAPACITY", "100"))  # Admitted buyers per property
+WAITING_ROOM_PASS_TTL = int(os.getenv("WAITING_ROOM_PASS_TTL", "300"))  # Seconds an admission pass lasts
+WAITING_ROOM_KEY_TTL = 7 * 24 * 3600
+
+TICKET_HEADER = "X-Waiting-Room-Ticket"
+
+# Drop lapsed passes and admit the head of the queue into the freed slots
+_ADVANCE = """
+local room, queue, active = KEYS[1], KEYS[2], KEYS[3]
+if redis.call('HGET', room, 'status') ~= 'open' then
+    return 0
+end
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', active, '-inf', now)
+local capacity = tonumber(redis.call('HGET', room, 'capacity'))
+local free = capacity - redis.call('ZCARD', active)
+if free <= 0 then
+    return 0
+end
+local admitted = redis.call('ZPOPMIN', queue, free)
+for i = 1, #admitted, 2 do
+    redis.call('ZADD', active, now + tonumber(ARGV[2]), admitted[i])
+    redis.call('HSET', room, 'served', admitted[i + 1])
+end
+local count = #admitted / 2
+if count > 0 then
+    redis.call('HINCRBY', room, 'admitted_total', count)
+end
+return count
+"""
+
+# Issue a FIFO ticket, reusing the user's ticket if it is still waiting or admitted
+_JOIN = """
+local room, queue, active, owners, users = KEYS[1], KEYS[2], KEYS[3], KEYS[4], KEYS[5]
+if redis.call('HGET', room, 'status') ~= 'open' then
+    return false
+end
+local existing = redis.call('HGET', users, ARGV[1])
+if existing and (redis.call('ZSCORE', queue, existing) or redis.call('ZSCORE', active, existing)) then
+    return existing
+end
+local seq = redis.call('HINCRBY', room, 'seq', 1)
+redis.call('ZADD', queue, seq, ARGV[2])
+redis.call('HSET', owners, ARGV[2], ARGV[1])
+redis.call('HSET', users, ARGV[1], ARGV[2])
+for i = 1, #KEYS do
+    redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return ARGV[2]
+"""
+
+
+class _MemoryRooms:
+    """Single-process backend used when REDIS_URL is not configured"""
+
+    def __init__(self):
+        self.rooms: Dict[int, Dict[str, Any]] = {}
+
+    async def open(self, property_id: int, capacity: int):
+        room = self.rooms.get(property_id)
+        if room and room["status"] == "open":
+            room["capacity"] = capacity
+            return
+        self.rooms[property_id] = {
+            "status": "open",
+            "capacity": capacity,
+            "opened_at": time.time(),
+            "seq": 0,
+            "served": 0,
+            "admitted_total": 0,
+            "queue": deque(),  # (seq, ticket)
+            "active": {},  # ticket -> pass expiry
+            "tickets": {},  # ticket -> (seq, user_id)
+            "users": {},  # user_id -> ticket
+        }
+
+    async def set_status(self, property_id: int, room_status: Optional[str]):
+        room = self.rooms.get(property_id)
+        if room_status is None:
+            self.rooms.pop(property_id, None)
+        elif room:
+            room["status"] = room_status
+            room["queue"].clear()
+            room["active"].clear()
+
+    async def advance(self, property_id: int, now: float, pass_ttl: int):
+        room = self.rooms.get(property_id)
+        if not room or room["status"] != "open":
+            return
+        active = room["active"]
+        for ticket in [ticket for ticket, expires_at in active.items() if expires_at <= now]:
+            del active[ticket]
+        while room["queue"] and len(active) < room["capacity"]:
+            seq, ticket = room["queue"].popleft()
+            active[ticket] = now + pass_ttl
+            room["served"] = seq
+            room["admitted_total"] += 1
+
+    async def join(self, property_id: int, user_id: int, ticket: str, key_ttl: int) -> Optional[str]:
+        room = self.rooms.get(property_id)
+        if not room or room["status"] != "open":
+            return None
+        existing = room["users"].get(user_id)
+        if existing and (existing in room["active"] or room["tickets"][existing][0] > room["served"]):
+            return existing
+        room["seq"] += 1
+        room["queue"].append((room["seq"], ticket))
+        room["tickets"][ticket] = (room["seq"], user_id)
+        room["users"][user_id] = ticket
+        return ticket
+
+    async def snapshot(self, property_id: int, ticket: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        room = self.rooms.get(property_id)
+        if not room:
+            return None
+        info = room["tickets"].get(ticket) if ticket else None
+        return {
+            "status": room["status"],
+            "capacity": room["capacity"],
+            "opened_at": room["opened_at"],
+            "served": room["served"],
+            "admitted_total": room["admitted_total"],
+            "waiting": len(room["queue"]),
+            "active": len(room["active"]),
+            "ticket_seq": info[0] if info else None,
+            "ticket_user": info[1] if info else None,
+            "pass_expires_at": room["active"].get(ticket) if ticket else None,
+        }
+
+    async def complete(self, property_id: int, ticket: str):
+        room = self.rooms.get(property_id)
+        if room:
+            room["active"].pop(ticket, None)
+
+
+class _RedisRooms:
+    """Redis backend shared by every worker; queue updates run as Lua scripts"""
+
+    def __init__(self, client, prefix: str):
+        self.redis = client
+        self.prefix = prefix
+        self._advance = client.register_script(_ADVANCE)
+        self._join = client.register_script(_JOIN)
+
+    def _keys(self, property_id: int):
+        base = f"{self.prefix}:{property_id}"
+        return [base, f"{base}:queue", f"{base}:active", f"{base}:owners", f"{base}:users"]
+
+    async def open(self, property_id: int, capacity: int):
+        room = self._keys(property_id)[0]
+        if await self.redis.hget(room, "status") == b"open":
+            await self.redis.hset(room, "capacity", capacity)
+            return
+        await self.redis.delete(*self._keys(property_id))
+        await self.redis.hset(room, mapping={
+            "status": "open",
+            "capacity": capacity,
+            "opened_at": time.time(),
+            "seq": 0,
+            "served": 0,
+            "admitted_total": 0
+        })
+        await self.redis.expire(room, WAITING_ROOM_KEY_TTL)
+
+    async def set_status(self, property_id: int, room_status: Optional[str]):
+        keys = self._keys(property_id)
+        if room_status is None:
+            await self.redis.delete(*keys)
+            return
+        if not await self.redis.exists(keys[0]):
+            return
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(keys[0], "status", room_status)
+            pipe.delete(keys[1], keys[2])
+            await pipe.execute()
+
+    async def advance(self, property_id: int, now: float, pass_ttl: int):
+        await self._advance(keys=self._keys(property_id)[:3], args=[now, pass_ttl])
+
+    async def join(self, property_id: int, user_id: int, ticket: str, key_ttl: int) -> Optional[str]:
+        result = await self._join(keys=self._keys(property_id), args=[user_id, ticket, key_ttl])
+        return result.decode() if result else None
+
+    async def snapshot(self, property_id: int, ticket: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        room, queue, active, owners, _ = self._keys(property_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hgetall(room)
+            pipe.zcard(queue)
+            pipe.zcard(active)
+            if ticket:
+                pipe.zscore(queue, ticket)
+                pipe.zscore(active, ticket)
+                pipe.hget(owners, ticket)
+            results = await pipe.execute()
+
+        state = {key.decode(): value.decode() for key, value in results[0].items()}
+        if not state:
+            return None
+        queued_seq, pass_expires_at, owner = results[3:6] if ticket else (None, None, None)
+        return {
+            "status": state["status"],
+            "capacity": int(state["capacity"]),
+            "opened_at": float(state["opened_at"]),
+            "served": int(state["served"]),
+            "admitted_total": int(state["admitted_total"]),
+            "waiting": results[1],
+            "active": results[2],
+            "ticket_seq": int(queued_seq) if queued_seq is not None else (0 if owner else None),
+            "ticket_user": int(owner) if owner else None,
+            "pass_expires_at": pass_expires_at,
+        }
+
+    async def complete(self, property_id: int, ticket: str):
+        await self.redis.zrem(self._keys(property_id)[2], ticket)
+
+
+class WaitingRoom:
+    """Admission queue in front of the purchase paths of a launching property
+
+    Buyers take FIFO tickets and poll their position; at most ``capacity``
+    holders per property have a valid admission pass at a time. Passes are
+    handed out lazily whenever anyone polls, so no background worker is
+    needed. Nothing here touches the database.
+    """
+
+    def __init__(self):
+        self.capacity = WAITING_ROOM_CAPACITY
+        self.pass_ttl = WAITING_ROOM_PASS_TTL
+        redis_url = os.getenv("REDIS_URL")
+        prefix = os.getenv("WAITING_ROOM_PREFIX", "fracta:waiting-room")
+        self.backend = _RedisRooms(redis.from_url(redis_url), prefix) if redis_url else _MemoryRooms()
+
+    async def open(self, property_id: int, capacity: Optional[int] = None):
+        """Open (or resize) the room for a property"""
+        await self.backend.open(property_id, capacity or self.capacity)
+        logger.info(f"Waiting room opened for property {property_id}")
+
+    async def close(self, property_id: int):
+        """Remove the room; purchases are no longer gated"""
+        await self.backend.set_status(property_id, None)
+
+    async def drain(self, property_id: int):
+        """Mark the room sold out and send everyone waiting away"""
+        await self.backend.set_status(property_id, "drained")
+        logger.info(f"Waiting room drained for property {property_id}")
+
+    async def join(self, property_id: int, user_id: int) -> Dict[str, Any]:
+        ticket = await self.backend.join(property_id, user_id, secrets.token_urlsafe(16), WAITING_ROOM_KEY_TTL)
+        if ticket is None:
+            room = await self.backend.snapshot(property_id)
+            if room and room["status"] == "drained":
+                raise HTTPException(status_code=status.HTTP_410_GONE, detail="Property is sold out")
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Waiting room is not open")
+        return await self.ticket_status(property_id, ticket)
+
+    async def ticket_status(self, property_id: int, ticket: str) -> Dict[str, Any]:
+        """Position, ETA or admission pass for a ticket"""
+        now = time.time()
+        await self.backend.advance(property_id, now, self.pass_ttl)
+        room = await self.backend.snapshot(property_id, ticket)
+        if room is None or room["ticket_user"] is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Ticket not found")
+
+        result = {"ticket": ticket, "property_id": property_id}
+        if room["status"] == "drained":
+            return {**result, "status": "sold_out"}
+        if room["pass_expires_at"] is not None:
+            return {**result, "status": "admitted", "pass_expires_at": room["pass_expires_at"]}
+        if room["ticket_seq"] and room["ticket_seq"] > room["served"]:
+            position = room["ticket_seq"] - room["served"]
+            return {**result, "status": "waiting", "position": position, "eta_seconds": self._eta(room, position, now)}
+        return {**result, "status": "expired"}
+
+    @staticmethod
+    def _eta(room: Dict[str, Any], position: int, now: float) -> Optional[int]:
+        # Observed admission rate since the room opened
+        elapsed = now - room["opened_at"]
+        if not room["admitted_total"] or elapsed <= 0:
+            return None
+        return math.ceil(position / (room["admitted_total"] / elapsed))
+
+    async def stats(self, property_id: int) -> Dict[str, Any]:
+        await self.backend.advance(property_id, time.time(), self.pass_ttl)
+        room = await self.backend.snapshot(property_id)
+        if room is None:
+            return {"property_id": property_id, "status": "closed"}
+        return {
+            "property_id": property_id,
+            "status": room["status"],
+            "capacity": room["capacity"],
+            "waiting": room["waiting"],
+            "admitted": room["active"],
+            "admitted_total": room["admitted_total"]
+        }
+
+    async def require_admission(self, property_id: int, user_id: int, ticket: Optional[str]):
+        """Raise 429 unless the room is closed or the ticket holds a valid pass for this user"""
+        room = await self.backend.snapshot(property_id, ticket)
+        if room is None:
+            return
+        if room["status"] == "drained":
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Property is sold out")
+        if (
+            ticket
+            and room["ticket_user"] == user_id
+            and room["pass_expires_at"] is not None
+            and float(room["pass_expires_at"]) > time.time()
+        ):
+            return
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Waiting room admission required",
+            headers={"Retry-After": "5"}
+        )
+
+    async def complete(self, property_id: int, ticket: Optional[str], tokens_remaining: Optional[int] = None):
+        """Free the ticket's admission slot after a successful purchase
+
+        Drains the room once the sale has no tokens left.
+        """
+        if ticket:
+            await self.backend.complete(property_id, ticket)
+        if tokens_remaining is not None and tokens_remaining <= 0:
+            await self.drain(property_id)
+
+# Global instance
+waiting_room = WaitingRoom()
@@ -0,0 +1,267 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from app.models.property import Property
+
+load_dotenv()
+
+MONTHS_PER_YEAR = 12
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Model assumptions, annual unless noted
+YIELD_SIM_SEED = int(os.getenv("YIELD_SIM_SEED", "2024"))
+YIELD_SIM_RENT_GROWTH = float(os.getenv("YIELD_SIM_RENT_GROWTH", "0.03"))  # Mean rent growth
+YIELD_SIM_RENT_VOLATILITY = float(os.getenv("YIELD_SIM_RENT_VOLATILITY", "0.05"))  # Std dev of rent growth
+YIELD_SIM_OCCUPANCY_PERSISTENCE = float(os.getenv("YIELD_SIM_OCCUPANCY_PERSISTENCE", "0.85"))  # Monthly; share of a gap kept
+YIELD_SIM_OCCUPANCY_VOLATILITY = float(os.getenv("YIELD_SIM_OCCUPANCY_VOLATILITY", "0.04"))  # Monthly occupancy shock
+YIELD_SIM_VACANCY_RATE = float(os.getenv("YIELD_SIM_VACANCY_RATE", "0.15"))  # Expected vacancy events per year
+YIELD_SIM_VACANCY_DEPTH = float(os.getenv("YIELD_SIM_VACANCY_DEPTH", "0.5"))  # Occupancy lost to one event
+YIELD_SIM_DEFAULT_OCCUPANCY = float(os.getenv("YIELD_SIM_DEFAULT_OCCUPANCY", "0.9"))  # When none is reported
+YIELD_SIM_CACHE_ENTRIES = int(os.getenv("YIELD_SIM_CACHE_ENTRIES", "1024"))
+YIELD_SIM_CHUNK_CELLS = int(os.getenv("YIELD_SIM_CHUNK_CELLS", "4000000"))  # Path-months simulated per chunk of properties
+YIELD_SIM_CONCURRENCY = int(os.getenv("YIELD_SIM_CONCURRENCY", "2"))  # Simulations running at once per process
+YIELD_SIM_MAX_PATH_YEARS = int(os.getenv("YIELD_SIM_MAX_PATH_YEARS", "2000000"))  # properties x paths x years per request
+
+DEFAULT_PATHS = 10000
+MAX_PATHS = 50000
+DEFAULT_YEARS = 5
+MAX_YEARS = 30
+
+# Simulation inputs; a change to any of them is a new version of the property
+SIMULATION_COLUMNS = (
+    Property.id,
+    Property.token_price,
+    Property.expected_yield,
+    Property.monthly_rent,
+    Property.occupancy_rate,
+    Property.total_tokens,
+)
+
+
+def _float(value) -> float:
+    return float(value) if value is not None else np.nan
+
+
+def _bands(values: np.ndarray) -> List[Dict[str, float]]:
+    """Percentiles over paths (axis 0) for each remaining column"""
+    quantiles = np.percentile(values, PERCENTILES, axis=0)
+    return [
+        {f"p{percentile}": round(float(quantiles[i, column]), 4) for i, percentile in enumerate(PERCENTILES)}
+        for column in range(values.shape[1])
+    ]
+
+
+def simulate(inputs: Dict[str, np.ndarray], paths: int, years: int) -> Dict[str, np.ndarray]:
+    """Monte Carlo rental income for several properties at once
+
+    Each property's occupancy mean-reverts to its reported rate (AR(1)
+    monthly) and takes random vacancy events; rent per token follows a
+    log random walk with drift. Shocks are drawn per property from a
+    generator seeded by its id, so a property gets the same paths alone
+    or in a batch. Returns (properties, paths, years) float32 arrays of
+    the yield on the token price and of average occupancy, both in percent.
+    """
+    count = len(inputs["property_ids"])
+    token_price = inputs["token_price"]
+
+    # Reported occupancy is the long-run level; unreported (0 or NULL) uses the default
+    occupancy_rate = np.nan_to_num(inputs["occupancy_rate"]) / 100
+    center = np.where(occupancy_rate > 0, np.clip(occupancy_rate, 0, 1), YIELD_SIM_DEFAULT_OCCUPANCY)
+
+    # Monthly rent per token at full occupancy: the reported rent when there is one,
+    # otherwise the advertised yield, taken as earned at the long-run occupancy
+    total_tokens = np.where(inputs["total_tokens"] > 0, inputs["total_tokens"], np.nan)
+    reported_rent = inputs["monthly_rent"] / total_tokens
+    advertised_rent = token_price * np.nan_to_num(inputs["expected_yield"]) / 100 / MONTHS_PER_YEAR / center
+    full_rent = np.where(np.isnan(reported_rent), advertised_rent, reported_rent)
+
+    annual_yield = np.empty((count, paths, years), dtype=np.float32)
+    occupancy = np.empty((count, paths, years), dtype=np.float32)
+    # A chunk of properties at a time bounds the memory a large batch needs
+    chunk = _chunk_size(paths, years)
+    for start in range(0, count, chunk):
+        batch = slice(start, min(start + chunk, count))
+        income, occupancy_sum = _simulate_batch(
+            inputs["property_ids"][batch], center[batch], full_rent[batch], paths, years
+        )
+        annual_yield[batch] = income / token_price[batch, None, None] * 100
+        occupancy[batch] = occupancy_sum / MONTHS_PER_YEAR * 100
+
+    return {"annual_yield": annual_yield, "occupancy": occupancy}
+
+
+def _chunk_size(paths: int, years: int) -> int:
+    return max(1, YIELD_SIM_CHUNK_CELLS // (paths * years * MONTHS_PER_YEAR))
+
+
+def _antithetic_normals(rng: np.random.Generator, out: np.ndarray):
+    """Standard normals in pairs z, -z along the path axis
+
+    Halves the draws, the bulk of a run's cost, and lowers the variance of
+    the bands; each path on its own is still a correctly distributed walk.
+    """
+    half = (out.shape[-1] + 1) // 2
+    draws = rng.standard_normal((*out.shape[:-1], half), dtype=np.float32)
+    out[..., :half] = draws
+    np.negative(draws[..., :out.shape[-1] - half], out=out[..., half:])
+
+
+def _simulate_batch(property_ids: np.ndarray, center: np.ndarray, full_rent: np.ndarray, paths: int, years: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Income per token and summed occupancy per (property, path, year)"""
+    count = len(property_ids)
+    generators = [np.random.default_rng([YIELD_SIM_SEED, int(property_id)]) for property_id in property_ids]
+
+    # Occupancy is path dependent and clipped, so everything steps month by month.
+    # float32 throughout: the bands are rounded far coarser than its precision
+    persistence = np.float32(YIELD_SIM_OCCUPANCY_PERSISTENCE)
+    center = center[:, None].astype(np.float32)
+    reversion = center * (1 - persistence)
+    level = np.broadcast_to(center, (count, paths)).copy()
+    rent = np.broadcast_to(full_rent[:, None], (count, paths)).astype(np.float32)
+    month_income = np.empty((count, paths), dtype=np.float32)
+    income = np.zeros((count, years, paths), dtype=np.float32)
+    occupancy_sum = np.zeros((count, years, paths), dtype=np.float32)
+
+    # Shocks are drawn a year at a time, (property, month, path) so each month's
+    # slice is contiguous rows of paths; memory does not grow with the horizon
+    occupancy_shocks = np.empty((count, MONTHS_PER_YEAR, paths), dtype=np.float32)
+    vacancies = np.empty((count, MONTHS_PER_YEAR, paths), dtype=bool)
+    rent_growth = np.empty((count, MONTHS_PER_YEAR, paths), dtype=np.float32)
+    drift = (YIELD_SIM_RENT_GROWTH - YIELD_SIM_RENT_VOLATILITY ** 2 / 2) / MONTHS_PER_YEAR
+    for year in range(years):
+        for index, rng in enumerate(generators):
+            _antithetic_normals(rng, occupancy_shocks[index])
+            vacancies[index] = rng.random((MONTHS_PER_YEAR, paths), dtype=np.float32) < YIELD_SIM_VACANCY_RATE / MONTHS_PER_YEAR
+            _antithetic_normals(rng, rent_growth[index])
+
+        # Monthly rent growth factors of a log random walk with drift
+        rent_growth *= np.float32(YIELD_SIM_RENT_VOLATILITY / np.sqrt(MONTHS_PER_YEAR))
+        rent_growth += np.float32(drift)
+        np.exp(rent_growth, out=rent_growth)
+
+        # Each month's occupancy change apart from mean reversion: the shock less any vacancy
+        occupancy_shocks *= np.float32(YIELD_SIM_OCCUPANCY_VOLATILITY)
+        occupancy_shocks -= np.float32(YIELD_SIM_VACANCY_DEPTH) * vacancies
+
+        for month in range(MONTHS_PER_YEAR):
+            level *= persistence
+            level += reversion
+            level += occupancy_shocks[:, month]
+            np.clip(level, 0, 1, out=level)
+            rent *= rent_growth[:, month]
+
+            np.multiply(rent, level, out=month_income)
+            income[:, year] += month_income
+            occupancy_sum[:, year] += level
+
+    return income.transpose(0, 2, 1), occupancy_sum.transpose(0, 2, 1)
+
+
+def summarize(property_id: int, expected_yield: float, results: Dict[str, np.ndarray], index: int, paths: int, years: int) -> Dict[str, Any]:
+    annual_yield = results["annual_yield"][index]
+    annualized = annual_yield.mean(axis=1, dtype=np.float64)
+    yield_bands = _bands(annual_yield)
+    occupancy_bands = _bands(results["occupancy"][index])
+
+    return {
+        "property_id": property_id,
+        "paths": paths,
+        "years": years,
+        "expected_yield": None if np.isnan(expected_yield) else float(expected_yield),
+        "annualized_yield": {
+            **_bands(annualized[:, None])[0],
+            "mean": round(float(annualized.mean()), 4)
+        },
+        "probability_below_expected": None if np.isnan(expected_yield) else round(float((annualized < expected_yield).mean()), 4),
+        "bands": [
+            {"year": year + 1, "yield": yield_bands[year], "occupancy": occupancy_bands[year]}
+            for year in range(years)
+        ]
+    }
+
+
+def simulate_summaries(inputs: Dict[str, np.ndarray], paths: int, years: int) -> List[Dict[str, Any]]:
+    """summarize() for every property, simulating a chunk at a time so only one chunk's paths are held"""
+    summaries = []
+    chunk = _chunk_size(paths, years)
+    for start in range(0, len(inputs["property_ids"]), chunk):
+        batch = {name: values[start:start + chunk] for name, values in inputs.items()}
+        results = simulate(batch, paths, years)
+        for index, property_id in enumerate(batch["property_ids"]):
+            summaries.append(summarize(int(property_id), batch["expected_yield"][index], results, index, paths, years))
+    return summaries
+
+
+class YieldSimulator:
+    """Percentile bands of simulated yield, cached per property version
+
+    Results are keyed by a property's simulation inputs plus the path and
+    year counts. Paths are seeded by property id, so every process computes
+    the same bands for the same version and a local LRU is enough.
+    """
+
+    def __init__(self):
+        self._cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Runs are CPU bound; more at once only adds memory, so the rest wait their turn
+        self._slots = threading.BoundedSemaphore(YIELD_SIM_CONCURRENCY)
+
+    def _get(self, key: Tuple):
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+            return result
+
+    def _set(self, key: Tuple, result: Dict[str, Any]):
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > YIELD_SIM_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def simulate_many(self, db: Session, property_ids: Sequence[int], paths: int = DEFAULT_PATHS, years: int = DEFAULT_YEARS) -> Dict[int, Dict[str, Any]]:
+        """Bands for each existing property id; cache misses are simulated together in one batch
+
+        Blocking and CPU bound: call it from a worker thread, not the event loop.
+        """
+        rows = db.query(*SIMULATION_COLUMNS).filter(
+            Property.id.in_(property_ids),
+            Property.is_active == True
+        ).order_by(Property.id).all()
+
+        results: Dict[int, Dict[str, Any]] = {}
+        misses = []
+        for row in rows:
+            key = (*row, paths, years)
+            cached = self._get(key)
+            if cached is not None:
+                results[row.id] = cached
+            else:
+                misses.append((key, row))
+
+        if misses:
+            inputs = {
+                name: np.array([_float(row[i]) for _, row in misses], dtype=np.float64)
+                for i, name in enumerate(("property_ids", "token_price", "expected_yield", "monthly_rent", "occupancy_rate", "total_tokens"))
+            }
+            with self._slots:
+                summaries = simulate_summaries(inputs, paths, years)
+            for (key, row), result in zip(misses, summaries):
+                self._set(key, result)
+                results[row.id] = result
+
+        return results
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+# Global instance
+yield_simulator = YieldSimulator()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for token number allocation
+Hammers one property with parallel mints and verifies that no token number
+is handed out twice. Writes to the database in DATABASE_URL - use a scratch one.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+# Make the app package importable when run from anywhere
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.database import SessionLocal, create_database, engine
+from app.models.user import User
+from app.models.property import Property
+from app.models.kyc import TokenRange
+from app.services.token_allocation import allocate_owned_range
+
+
+def setup(total_tokens: int):
+    db = SessionLocal()
+    try:
+        user = User(wallet_address=f"0x{int(time.time() * 1000):040x}", kyc_status="approved", kyc_jurisdiction="prospera")
+        property = Property(
+            name="Mint benchmark",
+            location="Benchmark",
+            jurisdiction="prospera",
+            kyc_required="prospera-permit",
+            full_price=total_tokens,
+            token_price=1,
+            total_tokens=total_tokens,
+            expected_yield=0,
+            status="live",
+            is_active=False
+        )
+        db.add_all([user, property])
+        db.commit()
+        return user.id, property.id
+    finally:
+        db.close()
+
+
+def worker(property_id: int, owner_id: int, quantity: int, deadline: float, counts: list, index: int):
+    db = SessionLocal()
+    try:
+        property = db.get(Property, property_id)
+        while time.perf_counter() < deadline:
+            try:
+                allocate_owned_range(db, property.id, owner_id, quantity)
+                db.commit()
+                counts[index] += quantity
+            except Exception as e:
+                db.rollback()
+                if getattr(e, "detail", None) != "All tokens have been minted":
+                    print(f"  mint failed: {str(e)[:200]}")
+                return
+    finally:
+        db.close()
+
+
+def run(threads: int, quantity: int, seconds: float, total_tokens: int):
+    owner_id, property_id = setup(total_tokens)
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    started = time.perf_counter()
+    pool = [
+        threading.Thread(target=worker, args=(property_id, owner_id, quantity, deadline, counts, i))
+        for i in range(threads)
+    ]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    try:
+        ranges = db.query(TokenRange.start_number, TokenRange.end_number).filter(
+            TokenRange.property_id == property_id
+        ).order_by(TokenRange.start_number).all()
+        minted = sum(end_number - start_number + 1 for start_number, end_number in ranges)
+        highest = ranges[-1].end_number if ranges else 0
+        # A token number handed out twice shows up as ranges that overlap
+        duplicates = sum(
+            max(0, previous.end_number - current.start_number + 1)
+            for previous, current in zip(ranges, ranges[1:])
+        )
+        property = db.get(Property, property_id)
+
+        print(f"threads={threads} quantity={quantity}: {sum(counts)} tokens in {elapsed:.2f}s "
+              f"({sum(counts) / elapsed:,.0f} tokens/s, {sum(counts) / quantity / elapsed:,.0f} requests/s)")
+        print(f"  tokens={minted} ranges={len(ranges)} max_number={highest} "
+              f"tokens_minted={property.tokens_minted} duplicates={duplicates}")
+
+        ok = duplicates == 0 and minted == property.tokens_minted == highest
+
+        # Clean up the benchmark rows
+        db.query(TokenRange).filter(TokenRange.property_id == property_id).delete()
+        db.query(Property).filter(Property.id == property_id).delete()
+        db.query(User).filter(User.id == owner_id).delete()
+        db.commit()
+        return ok
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--total-tokens", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    create_database()
+    engine.pool.dispose()
+
+    ok = True
+    for quantity in (1, 10, 100):
+        ok = run(args.threads, quantity, args.seconds, args.total_tokens) and ok
+
+    print("✅ No duplicate token numbers" if ok else "❌ Allocation inconsistency detected")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
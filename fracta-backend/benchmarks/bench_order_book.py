@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Throughput of the in-memory order book with settlement
+Threads place a random mix of buy and sell limit orders around a drifting
+mid price and cancel some resting ones, spread over several properties,
+with every operation appended to an order log. Each placement goes through
+a settle callback that stands in for the database settlement (a short
+sleep) and checks that the fills it was shown are the fills the book
+applies. The log is then replayed, and compacted and replayed again, into
+fresh services whose books must match the original exactly.
+Needs no database; the log goes to a temporary directory.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+# Make the app package importable when run from anywhere
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.order_book import BUY, SELL, OrderBookService
+
+
+def fills(trades) -> list:
+    return [(trade.buy_order_id, trade.sell_order_id, trade.price, trade.quantity) for trade in trades]
+
+
+def run(service: OrderBookService, operations: int, properties: int, users: int, cancel_ratio: float,
+        settle_seconds: float, seed: int) -> dict:
+    rng = random.Random(seed)
+    counts = {"placed": 0, "cancelled": 0, "trades": 0, "traded_quantity": 0, "mismatched": 0}
+    open_ids = []
+    mid = 10_000  # Cents
+    settled = []
+
+    def settle(order, trades):
+        settled.append(fills(trades))
+        if settle_seconds:
+            time.sleep(settle_seconds)
+
+    for _ in range(operations):
+        if open_ids and rng.random() < cancel_ratio:
+            # Cancel a random earlier order; it may have filled since
+            index = rng.randrange(len(open_ids))
+            open_ids[index], open_ids[-1] = open_ids[-1], open_ids[index]
+            order_id = open_ids.pop()
+            if service.get_order(order_id):
+                try:
+                    service.cancel(order_id)
+                    counts["cancelled"] += 1
+                except Exception:
+                    pass  # Filled by another thread in the meantime
+            continue
+
+        mid = max(100, mid + rng.randint(-5, 5))
+        side = BUY if rng.random() < 0.5 else SELL
+        # Mostly passive orders, some crossing the spread
+        offset = rng.randint(-20, 100)
+        price = mid - offset if side == BUY else mid + offset
+        property_id = rng.randrange(properties) + 1
+        order, trades = service.place(
+            property_id, rng.randrange(users), side, max(1, price), rng.randint(1, 50), settle=settle
+        )
+        if fills(trades) != settled.pop():
+            counts["mismatched"] += 1
+        counts["placed"] += 1
+        counts["trades"] += len(trades)
+        counts["traded_quantity"] += sum(trade.quantity for trade in trades)
+        if order.status == "open":
+            open_ids.append(order.order_id)
+
+    return counts
+
+
+def state(service: OrderBookService):
+    """Everything replay must reproduce: open orders with their fills and the aggregated depth, per book"""
+    books = {}
+    for property_id, book in sorted(service.books.items()):
+        orders = sorted(
+            (order.order_id, order.user_id, order.side, order.price, order.remaining, order.created_at)
+            for order in book.orders.values()
+        )
+        books[property_id] = (orders, book.depth(1_000_000), dict(book.open_sell_quantity))
+    return books
+
+
+def replayed(log_path: str) -> OrderBookService:
+    service = OrderBookService(log_path)
+    started = time.perf_counter()
+    service.open()
+    elapsed = time.perf_counter() - started
+    print(f"  replayed {os.path.getsize(log_path) / 1e6:.1f} MB log in {elapsed:.2f}s")
+    service.close()  # Release the log lock for the next replay; the books stay in memory
+    return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--operations", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--properties", type=int, default=4)
+    parser.add_argument("--settle-ms", type=float, default=0.0, help="Simulated settlement time per placement")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--cancel-ratio", type=float, default=0.3)
+    parser.add_argument("--fsync", action="store_true", help="fsync every log record")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, "order_book.log")
+        service = OrderBookService(log_path, fsync=args.fsync)
+        service.open()
+
+        results = [None] * args.threads
+        per_thread = args.operations // args.threads
+
+        def worker(index: int):
+            results[index] = run(
+                service, per_thread, args.properties, args.users, args.cancel_ratio,
+                args.settle_ms / 1000, args.seed + index
+            )
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        service.close()
+
+        counts = {key: sum(result[key] for result in results) for key in results[0]}
+        operations = per_thread * args.threads
+        print(f"threads={args.threads} properties={args.properties} settle={args.settle_ms}ms: "
+              f"{operations:,} operations in {elapsed:.2f}s: {operations / elapsed:,.0f} ops/s")
+        print(f"  {counts}")
+        for property_id, book in sorted(service.books.items()):
+            depth = book.depth(1_000_000)
+            print(f"  property {property_id}: open orders={len(book.orders)} "
+                  f"bid levels={len(depth['bids'])} ask levels={len(depth['asks'])}")
+
+        expected = state(service)
+        ok = counts["mismatched"] == 0
+        print("Replay:")
+        ok = state(replayed(log_path)) == expected and ok
+
+        service.compact()
+        print("Replay after compaction:")
+        ok = state(replayed(log_path)) == expected and ok
+
+    print("✅ Settled fills and replayed books match" if ok else "❌ Settled fills or replayed books differ")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Load test for token reservations at sale launch
+Many buyers reserve, confirm, release or abandon holds on one property while
+the expiry sweeper runs, then the inventory counters are checked against
+the reservation, investment and ownership records.
+Writes to the database in DATABASE_URL - use a scratch one.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+# Make the app package importable when run from anywhere
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, func, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import DATABASE_URL, create_database
+from app.models.user import User
+from app.models.property import Property
+from app.models.kyc import Investment, TokenRange, TokenReservation
+from app.services.token_reservations import (
+    confirm_reservation,
+    expire_reservations,
+    release_reservation,
+    reserve_tokens,
+)
+
+
+def setup(Session, total_tokens: int, buyers: int):
+    db = Session()
+    try:
+        stamp = int(time.time() * 1000)
+        users = [
+            User(wallet_address=f"0x{stamp:028x}{i:012x}", kyc_status="approved", kyc_jurisdiction="prospera")
+            for i in range(buyers)
+        ]
+        property = Property(
+            name="Reservation load test",
+            location="Benchmark",
+            jurisdiction="prospera",
+            kyc_required="prospera-permit",
+            full_price=total_tokens * 100,
+            token_price=100,
+            total_tokens=total_tokens,
+            expected_yield=0,
+            status="live",
+            is_active=False
+        )
+        db.add_all(users + [property])
+        db.commit()
+        return [user.id for user in users], property.id
+    finally:
+        db.close()
+
+
+def buyer(Session, property_id: int, user_id: int, ttl: int, deadline: float, stats: dict, lock: threading.Lock):
+    db = Session()
+    rng = random.Random(user_id)
+    counts = {"reserved": 0, "confirmed": 0, "released": 0, "abandoned": 0, "rejected": 0, "lost": 0}
+    try:
+        property = db.get(Property, property_id)
+        while time.perf_counter() < deadline:
+            try:
+                reservation = reserve_tokens(db, user_id, property, rng.randint(1, 5), ttl=ttl)
+                db.commit()
+                counts["reserved"] += 1
+            except HTTPException:
+                # Sold out or fully held; wait for holds to lapse
+                db.rollback()
+                counts["rejected"] += 1
+                time.sleep(0.01)
+                continue
+
+            # Time spent signing in the wallet
+            time.sleep(rng.uniform(0, 0.05))
+            action = rng.random()
+            try:
+                if action < 0.6:
+                    confirm_reservation(db, reservation.reference, user_id, transaction_hash=None)
+                    counts["confirmed"] += 1
+                elif action < 0.8:
+                    release_reservation(db, reservation.reference, user_id)
+                    counts["released"] += 1
+                else:
+                    counts["abandoned"] += 1
+                db.commit()
+            except HTTPException:
+                # The sweeper expired the hold first
+                db.rollback()
+                counts["lost"] += 1
+    finally:
+        db.close()
+        with lock:
+            for key, value in counts.items():
+                stats[key] = stats.get(key, 0) + value
+
+
+def sweeper(Session, stop: threading.Event, interval: float):
+    db = Session()
+    try:
+        while not stop.is_set():
+            expire_reservations(db)
+            stop.wait(interval)
+    finally:
+        db.close()
+
+
+def verify(Session, property_id: int) -> bool:
+    db = Session()
+    try:
+        property = db.get(Property, property_id)
+        by_status = dict(db.query(TokenReservation.status, func.sum(TokenReservation.quantity)).filter(
+            TokenReservation.property_id == property_id
+        ).group_by(TokenReservation.status).all())
+        invested = db.query(func.coalesce(func.sum(Investment.tokens_purchased), 0)).filter(
+            Investment.property_id == property_id
+        ).scalar()
+        owned = db.query(func.coalesce(func.sum(TokenRange.end_number - TokenRange.start_number + 1), 0)).filter(
+            TokenRange.property_id == property_id
+        ).scalar()
+        overlaps = db.execute(text("""
+            SELECT count(*) FROM (
+                SELECT start_number, lag(end_number) OVER (ORDER BY start_number) AS previous_end
+                FROM token_ranges WHERE property_id = :id
+            ) r WHERE start_number <= previous_end
+        """), {"id": property_id}).scalar()
+
+        confirmed = by_status.get("confirmed", 0)
+        held = by_status.get("held", 0)
+        print(f"  total={property.total_tokens} sold={property.tokens_sold} reserved={property.tokens_reserved} "
+              f"minted={property.tokens_minted}")
+        print(f"  reservations by status: {by_status}")
+        print(f"  invested={invested} owned={owned} overlapping_ranges={overlaps}")
+
+        return (
+            property.tokens_sold <= property.total_tokens
+            and property.tokens_sold == confirmed == invested == owned == property.tokens_minted
+            and property.tokens_reserved == held
+            and overlaps == 0
+        )
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--total-tokens", type=int, default=2000)
+    parser.add_argument("--ttl", type=int, default=1)
+    args = parser.parse_args()
+
+    create_database()
+
+    # One connection per buyer plus the sweeper and checks
+    engine = create_engine(DATABASE_URL, pool_size=args.buyers + 2, max_overflow=0)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    user_ids, property_id = setup(Session, args.total_tokens, args.buyers)
+    stats, lock, stop = {}, threading.Lock(), threading.Event()
+    deadline = time.perf_counter() + args.seconds
+
+    sweep_thread = threading.Thread(target=sweeper, args=(Session, stop, 0.2))
+    sweep_thread.start()
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=buyer, args=(Session, property_id, user_id, args.ttl, deadline, stats, lock))
+        for user_id in user_ids
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"buyers={args.buyers} in {elapsed:.1f}s: {stats}")
+    print(f"  {stats.get('reserved', 0) / elapsed:,.0f} reservations/s")
+    print("During the sale:")
+    ok = verify(Session, property_id)
+
+    # Let abandoned holds lapse and sweep them
+    time.sleep(args.ttl + 0.5)
+    stop.set()
+    sweep_thread.join()
+    db = Session()
+    try:
+        expire_reservations(db)
+    finally:
+        db.close()
+    print("After expiry:")
+    ok = verify(Session, property_id) and ok
+
+    print("✅ Inventory consistent" if ok else "❌ Inventory inconsistency detected")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Bulk import properties from a CSV or NDJSON file
+Usage: python import_properties.py inventory.csv [--format csv|ndjson] [--chunk-size 1000]
+"""
+
+import sys
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import SessionLocal
+from app.api.properties import PropertyCreate
+from app.services.property_import import CHUNK_SIZE, PropertyImporter, detect_format, iter_records
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import properties into Fracta.city")
+    parser.add_argument("path", help="CSV or NDJSON file ('-' for stdin)")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="File format (detected from the extension by default)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows validated and loaded per transaction")
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    stream = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+
+    db = SessionLocal()
+    try:
+        report = PropertyImporter(PropertyCreate, chunk_size=args.chunk_size).run(db, iter_records(stream, fmt))
+    finally:
+        db.close()
+        if stream is not sys.stdin:
+            stream.close()
+
+    print(f"📦 Rows read: {report['total_rows']}")
+    print(f"✅ Imported: {report['imported']}")
+    print(f"⏭️  Skipped (already listed): {report['skipped']}")
+    print(f"❌ Failed: {report['failed']}")
+    for error in report["errors"]:
+        messages = "; ".join(
+            f"{item['field']}: {item['message']}" if item["field"] else item["message"]
+            for item in error["errors"]
+        )
+        print(f"   row {error['row']}: {messages}")
+
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
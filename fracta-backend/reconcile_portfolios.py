@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Rebuild portfolio rollups from investment and token transfer rows
+Usage: python reconcile_portfolios.py [--user-id 42]
+"""
+
+import sys
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.database import SessionLocal
+from app.services.portfolio_rollups import reconcile_portfolios
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rebuild Fracta.city portfolio rollups from investments and token transfers")
+    parser.add_argument("--user-id", type=int, help="Only reconcile this user (all users by default)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        report = reconcile_portfolios(db, args.user_id)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    print(f"👤 Users rebuilt: {report['users']}")
+    print(f"🏠 Positions rebuilt: {report['positions']}")
+    print(f"{'⚠️ ' if report['drifted'] else '✅'} Users that had drifted: {report['drifted']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Differential test of the ComplianceManager mirror against the contract
+Deploys ComplianceManager to a local chain (e.g. `npx hardhat node`), drives
+it with random KYC approvals and revocations, permits, property jurisdiction
+flags, investment limits, recorded investments and clock jumps, and after
+each batch checks that the mirror's canInvest, canTransfer and
+getUserComplianceStatus answers equal eth_call results.
+
+The mirror follows contracts/ComplianceManager.sol; pass --artifact a
+Hardhat artifact (abi and bytecode) built from that file.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+from web3 import Web3
+
+# Make the app package importable when run from anywhere
+sys.path.insert(0, os.path.dirname(__file__))
+
+ARTIFACT = os.path.join(
+    os.path.dirname(__file__), '..', 'fracta-contracts', 'artifacts',
+    'contracts', 'ComplianceManager.sol', 'ComplianceManager.json'
+)
+JURISDICTIONS = ["prospera", "international", "honduras"]
+LIMITS = [0, 0, 250000, 1000000, 2000000]
+# Expiries relative to the chain clock; kept clear of the current second,
+# since eth_call may run at the latest or the pending block's timestamp
+EXPIRY_OFFSETS = [-86400, -3600, -60, 60, 3600, 86400, 365 * 86400]
+
+
+def deploy(w3: Web3, owner: str, path: str):
+    with open(path) as f:
+        artifact = json.load(f)
+    if not any(item.get("name") == "revokeKYC" for item in artifact["abi"]):
+        raise SystemExit(f"❌ {path} is not built from contracts/ComplianceManager.sol (no revokeKYC)")
+    factory = w3.eth.contract(abi=artifact["abi"], bytecode=artifact["bytecode"])
+    receipt = w3.eth.wait_for_transaction_receipt(factory.constructor().transact({"from": owner}))
+    return w3.eth.contract(address=receipt["contractAddress"], abi=artifact["abi"])
+
+
+def random_address(rng: random.Random) -> str:
+    return Web3.to_checksum_address(f"0x{rng.getrandbits(160):040x}")
+
+
+def chain_time(w3: Web3) -> int:
+    return w3.eth.get_block("latest")["timestamp"]
+
+
+def drive(w3: Web3, contract, owner: str, rng: random.Random, users, properties, approved: dict, registered: set, steps: int) -> dict:
+    """Send a batch of random state changes; returns counts per kind"""
+    counts = {"approve": 0, "revoke": 0, "permit": 0, "jurisdiction": 0, "limit": 0, "investment": 0, "clock": 0}
+    for _ in range(steps):
+        action = rng.random()
+        if action < 0.35:
+            user, jurisdiction = rng.choice(users), rng.choice(JURISDICTIONS)
+            expiry = max(0, chain_time(w3) + rng.choice(EXPIRY_OFFSETS))
+            contract.functions.approveKYC(user, jurisdiction, expiry).transact({"from": owner})
+            approved[user] = jurisdiction
+            counts["approve"] += 1
+        elif action < 0.42 and approved:
+            user = rng.choice(sorted(approved))
+            contract.functions.revokeKYC(user).transact({"from": owner})
+            del approved[user]
+            counts["revoke"] += 1
+        elif action < 0.55 and any(jurisdiction == "prospera" for jurisdiction in approved.values()):
+            # Permits need an approved Prospera user
+            user = rng.choice(sorted(user for user, jurisdiction in approved.items() if jurisdiction == "prospera"))
+            contract.functions.registerProspectsPermit(user, f"PERMIT-{rng.randrange(10**6)}").transact({"from": owner})
+            counts["permit"] += 1
+        elif action < 0.67:
+            property, requires_prospera, allows_international = rng.choice(properties), rng.random() < 0.5, rng.random() < 0.5
+            contract.functions.setPropertyJurisdiction(property, requires_prospera, allows_international).transact({"from": owner})
+            if requires_prospera or allows_international:
+                registered.add(property)
+            else:
+                registered.discard(property)
+            counts["jurisdiction"] += 1
+        elif action < 0.74:
+            contract.functions.setMaxInvestment(rng.choice(JURISDICTIONS), rng.choice(LIMITS)).transact({"from": owner})
+            counts["limit"] += 1
+        elif action < 0.88 and registered:
+            # recordInvestment requires a registered property
+            contract.functions.recordInvestment(
+                rng.choice(users), rng.choice(sorted(registered)), rng.randint(1, 600000)
+            ).transact({"from": owner})
+            counts["investment"] += 1
+        else:
+            # Let some approvals lapse
+            w3.provider.make_request("evm_increaseTime", [rng.choice([30, 600, 7200, 90000])])
+            w3.provider.make_request("evm_mine", [])
+            counts["clock"] += 1
+    return counts
+
+
+def compare(contract, mirror, users, properties, now: int, rng: random.Random, pairs: int) -> dict:
+    """Check every user and a sample of transfer pairs; returns counts and timings"""
+    stats = {"checks": 0, "mismatches": 0, "chain_seconds": 0.0, "mirror_seconds": 0.0}
+
+    def check(label, on_chain, mirrored):
+        stats["checks"] += 1
+        if tuple(on_chain) != tuple(mirrored):
+            stats["mismatches"] += 1
+            print(f"   ❌ {label}: chain={on_chain} mirror={mirrored}")
+
+    def timed(key, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        stats[key] += time.perf_counter() - started
+        return result
+
+    for user in users:
+        status = timed("chain_seconds", contract.functions.getUserComplianceStatus(user).call)
+        mirrored = timed("mirror_seconds", mirror.compliance_status, user, now)
+        check(f"getUserComplianceStatus({user})", status, (
+            mirrored["kyc_valid"], mirrored["jurisdiction"], mirrored["expiry"],
+            mirrored["has_prospera_permit"], mirrored["permit_id"]
+        ))
+        for property in properties:
+            amount = rng.randint(0, 10**6)
+            # userInvestments has no event; the app reads it by eth_call when a limit applies
+            invested = contract.functions.userInvestments(user, property).call()
+            check(
+                f"canInvest({user}, {property}, {amount})",
+                timed("chain_seconds", contract.functions.canInvest(user, property, amount).call),
+                timed("mirror_seconds", mirror.can_invest, user, property, amount, invested, now)
+            )
+
+    for _ in range(pairs):
+        sender, recipient = rng.choice(users), rng.choice(users)
+        property, amount = rng.choice(properties), rng.randint(0, 10**6)
+        invested = contract.functions.userInvestments(recipient, property).call()
+        check(
+            f"canTransfer({sender}, {recipient}, {property}, {amount})",
+            timed("chain_seconds", contract.functions.canTransfer(sender, recipient, property, amount).call),
+            timed("mirror_seconds", mirror.can_transfer, sender, recipient, property, amount, invested, now)
+        )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rpc-url", default="http://127.0.0.1:8545", help="Local chain JSON-RPC endpoint")
+    parser.add_argument("--artifact", default=ARTIFACT, help="ComplianceManager artifact built from contracts/ComplianceManager.sol")
+    parser.add_argument("--users", type=int, default=25)
+    parser.add_argument("--properties", type=int, default=3)
+    parser.add_argument("--batches", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=15, help="State changes per batch")
+    parser.add_argument("--pairs", type=int, default=200, help="canTransfer pairs checked per batch")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print("🧪 Differential test: ComplianceManager mirror vs eth_call")
+    w3 = Web3(Web3.HTTPProvider(args.rpc_url))
+    if not w3.is_connected():
+        print(f"❌ No chain at {args.rpc_url}; start one with `npx hardhat node`")
+        return 1
+    owner = w3.eth.accounts[0]
+    contract = deploy(w3, owner, args.artifact)
+    print(f"   📋 ComplianceManager deployed at {contract.address} (chain {w3.eth.chain_id})")
+
+    # The app's blockchain service reads its configuration on import
+    os.environ["WEB3_PROVIDER_URL"] = args.rpc_url
+    os.environ["COMPLIANCE_MANAGER_ADDRESS"] = contract.address
+    from app.services.compliance_mirror import ComplianceMirror
+
+    rng = random.Random(args.seed)
+    users = [random_address(rng) for _ in range(args.users)]
+    properties = [random_address(rng) for _ in range(args.properties)]
+    mirror = ComplianceMirror()
+    approved: dict = {}  # user -> jurisdiction
+    registered: set = set()
+    totals = {"checks": 0, "mismatches": 0, "chain_seconds": 0.0, "mirror_seconds": 0.0}
+
+    for batch in range(args.batches):
+        counts = drive(w3, contract, owner, rng, users, properties, approved, registered, args.steps)
+        w3.provider.make_request("evm_mine", [])
+        applied = mirror.sync()
+        stats = compare(contract, mirror, users, properties, chain_time(w3), rng, args.pairs)
+        for key in totals:
+            totals[key] += stats[key]
+        print(f"   batch {batch + 1}: {counts}, {applied} events mirrored, "
+              f"{stats['checks']} checks, {stats['mismatches']} mismatches")
+
+    calls = totals["checks"]
+    print(f"   eth_call: {totals['chain_seconds'] / calls * 1e6:,.0f} µs/check, "
+          f"mirror: {totals['mirror_seconds'] / calls * 1e6:,.2f} µs/check")
+    if totals["mismatches"]:
+        print(f"❌ {totals['mismatches']} of {calls} checks differ")
+        return 1
+    print(f"✅ All {calls} checks match")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
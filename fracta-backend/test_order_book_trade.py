@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of one order book trade
+A seller mints tokens and offers some of them; the API's test user (id 1)
+deposits cash through POST /transactions/deposits and bids at the ask
+through POST /transactions/orders. The bid must fill, and the tokens, cash,
+order fill, portfolio rollups and book must all agree afterwards.
+Writes to the database in DATABASE_URL - use a scratch one. The order log
+goes to a temporary file.
+"""
+
+import os
+import sys
+import time
+import tempfile
+from decimal import Decimal
+
+# Make the app package importable when run from anywhere
+sys.path.insert(0, os.path.dirname(__file__))
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from fastapi.testclient import TestClient
+
+from app.database import SessionLocal, create_database
+from app.main import app
+from app.models.user import User
+from app.models.property import Property
+from app.models.kyc import OrderFill
+from app.models.portfolio import PortfolioPosition
+from app.services.order_book import SELL, order_book_service
+from app.services.portfolio_rollups import reconcile_portfolios, record_transfer
+from app.services.token_allocation import allocate_owned_range
+from app.services.token_ownership import get_holdings
+
+API = "/api/v1/transactions"
+TEST_USER_WALLET = "0x1234567890123456789012345678901234567890"  # The mock user the endpoints act as
+MINTED = 10
+LISTED = 6
+BOUGHT = 4
+PRICE = Decimal("12.50")
+MINT_PRICE = Decimal("10.00")
+
+
+def setup(db):
+    buyer = db.get(User, 1)
+    if buyer is None:
+        buyer = User(id=1, wallet_address=TEST_USER_WALLET, kyc_status="approved", kyc_jurisdiction="prospera")
+        db.add(buyer)
+    seller = User(
+        wallet_address=f"0x{int(time.time() * 1000):040x}",
+        kyc_status="approved",
+        kyc_jurisdiction="prospera",
+        prospera_permit_id="TRADE-CHECK"
+    )
+    property = Property(
+        name="Order book trade check",
+        location="Test",
+        jurisdiction="prospera",
+        kyc_required="prospera-permit",
+        full_price=MINTED * 1000,
+        token_price=MINT_PRICE,
+        total_tokens=MINTED * 100,
+        expected_yield=0,
+        status="live",
+        is_active=False
+    )
+    db.add_all([seller, property])
+    db.flush()
+
+    # The seller mints, as the mint endpoint would for them
+    allocate_owned_range(db, property.id, seller.id, MINTED)
+    record_transfer(db, property.id, None, seller.id, MINTED, MINT_PRICE * MINTED)
+    db.commit()
+    return seller.id, property.id
+
+
+def held(db, user_id: int, property_id: int) -> int:
+    holdings = get_holdings(db, user_id, property_id=property_id)
+    return holdings[0]["token_count"] if holdings else 0
+
+
+def cash(db, user_id: int) -> Decimal:
+    return db.query(User.cash_balance).filter(User.id == user_id).scalar()
+
+
+def main() -> int:
+    create_database()
+    order_book_service.log_path = os.path.join(tempfile.mkdtemp(), "order_book.log")
+    order_book_service.open()
+    client = TestClient(app)
+    db = SessionLocal()
+    checks = []
+
+    def check(name: str, ok: bool, detail=""):
+        checks.append(ok)
+        print(f"   {'✅' if ok else '❌'} {name}{f' ({detail})' if detail and not ok else ''}")
+
+    try:
+        print("🧪 Order book trade, end to end")
+        print("=" * 50)
+        seller_id, property_id = setup(db)
+        buyer_before = held(db, 1, property_id)
+
+        print("1️⃣ Seller offers tokens")
+        ask = order_book_service.place(property_id, seller_id, SELL, int(PRICE * 100), LISTED)[0]
+        check("ask rests in the book", ask.status == "open")
+
+        print("2️⃣ Buyer deposits cash")
+        amount = PRICE * BOUGHT
+        response = client.post(f"{API}/deposits", json={"amount": float(amount), "payment_method": "bank_transfer"})
+        check("deposit accepted", response.status_code == 200, response.text)
+        buyer_cash = cash(db, 1)
+        seller_cash = cash(db, seller_id)
+        balance = client.get(f"{API}/user/balance").json()
+        check("balance includes the deposit", Decimal(str(balance["cash_balance"])) == buyer_cash, balance)
+
+        print("3️⃣ Bid meets the ask")
+        response = client.post(
+            f"{API}/orders",
+            json={"property_id": property_id, "side": "buy", "price": float(PRICE), "quantity": BOUGHT}
+        )
+        check("bid accepted", response.status_code == 200, response.text)
+        result = response.json() if response.status_code == 200 else {"order": {}, "trades": []}
+        check("bid filled", result["order"].get("status") == "filled", result["order"])
+        check("one fill at the ask price", [(t["quantity"], t["price"]) for t in result["trades"]] == [(BOUGHT, float(PRICE))], result["trades"])
+
+        print("4️⃣ Settlement")
+        db.expire_all()
+        check("tokens moved to the buyer", held(db, 1, property_id) - buyer_before == BOUGHT)
+        check("seller keeps the rest", held(db, seller_id, property_id) == MINTED - BOUGHT)
+        check("buyer paid", buyer_cash - cash(db, 1) == amount, cash(db, 1))
+        check("seller was paid", cash(db, seller_id) - seller_cash == amount, cash(db, seller_id))
+        fill = db.query(OrderFill).filter(OrderFill.property_id == property_id).one_or_none()
+        check("fill recorded at the seller's cost", fill is not None and fill.seller_cost_basis == MINT_PRICE * BOUGHT, fill)
+        position = db.get(PortfolioPosition, (seller_id, property_id))
+        check(
+            "seller position reduced at cost",
+            position is not None and (position.tokens_purchased, position.total_invested) == (MINTED - BOUGHT, MINT_PRICE * (MINTED - BOUGHT)),
+            position and (position.tokens_purchased, position.total_invested)
+        )
+        depth = order_book_service.depth(property_id)
+        check("ask remainder still offered", depth["asks"] == [{"price": float(PRICE), "quantity": LISTED - BOUGHT}], depth)
+        for user_id in (1, seller_id):
+            report = reconcile_portfolios(db, user_id)
+            db.rollback()
+            check(f"user {user_id} rollups match their sources", report["drifted"] == 0, report)
+    finally:
+        db.close()
+        order_book_service.close()
+
+    print("\n" + "=" * 50)
+    print(f"{'🎉 Trade settled end to end' if all(checks) else '❌ Trade check failed'} ({sum(checks)}/{len(checks)} checks)")
+    return 0 if all(checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())